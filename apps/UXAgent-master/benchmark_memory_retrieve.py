@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark Memory.retrieve ranking latency versus memory count.
+Uses random embeddings, so no LLM or embedding calls are made.
+Run from the UXAgent-master directory:
+
+    python benchmark_memory_retrieve.py
+    pip install hnswlib  # to include the HNSW backend
+"""
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.simulated_web_agent.agent.memory import Memory, Thought
+from src.simulated_web_agent.agent.memory_index import HNSWLIB_AVAILABLE, create_index
+
+DIM = int(os.getenv("BENCH_DIM", "1536"))
+SIZES = [100, 500, 1_000, 5_000, 20_000]
+QUERIES = 50
+KIND_WEIGHT = {"observation": 1.0, "action": 1.0, "plan": 1.0, "thought": 1.0}
+
+
+def build_memory(size: int, backend: str, rng: np.random.Generator) -> Memory:
+    memory = Memory(agent=None)
+    memory.index = create_index(backend)
+    steps_per_memory = 4
+
+    async def fill():
+        for i in range(size):
+            memory.timestamp = i // steps_per_memory
+            await memory.add_memory_piece(Thought(f"memory {i}", memory))
+
+    asyncio.run(fill())
+    vectors = rng.standard_normal((size, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    memory.index.add(vectors)
+    memory._importance.extend(rng.random(size))
+    return memory
+
+
+def bench(memory: Memory, queries: np.ndarray) -> float:
+    start = time.perf_counter()
+    for q in queries:
+        memory._rank(q, 20, KIND_WEIGHT)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    backends = ["exact"] + (["hnsw"] if HNSWLIB_AVAILABLE else [])
+    if not HNSWLIB_AVAILABLE:
+        print("hnswlib not installed; benchmarking the exact backend only")
+
+    print(f"{'memories':>10} " + " ".join(f"{b + ' (ms)':>12}" for b in backends))
+    for size in SIZES:
+        queries = rng.standard_normal((QUERIES, DIM)).astype(np.float32)
+        row = []
+        for backend in backends:
+            memory = build_memory(size, backend, rng)
+            bench(memory, queries[:5])  # warm up
+            row.append(bench(memory, queries))
+        print(f"{size:>10} " + " ".join(f"{ms:>12.3f}" for ms in row))
+
+
+if __name__ == "__main__":
+    main()
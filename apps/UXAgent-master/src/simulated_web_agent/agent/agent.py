@@ -3,10 +3,13 @@ import inspect
 import json
 import logging
 import os
+import pathlib
 import time
-from typing import Optional, Union
+from typing import Any, Optional, Union
 
 from . import context, gpt
+from .budget import PromptBudget, Section
+from .cache import TieredCache, content_key
 from .gpt import async_chat, load_prompt
 from .memory import Action, Memory, MemoryPiece, Observation, Plan, Reflection, Thought
 
@@ -15,10 +18,33 @@ REFLECT_PROMPT = load_prompt("reflect")
 WONDER_PROMPT = load_prompt("wonder")
 PLANNING_PROMPT = load_prompt("planning")
 ACTION_PROMPT = load_prompt("action")
+# action prompt for the compact payload (target table instead of the page HTML)
+ACTION_COMPACT_PROMPT = ACTION_PROMPT + "\n\n" + load_prompt("action_compact")
 STAGEHAND_ACTION_PROMPT = load_prompt("stagehand_action")
 FEEDBACK_PROMPT = load_prompt("feedback")
+# perceive prompt followed by the combined-mode instructions
+PERCEIVE_FEEDBACK_PROMPT = PERCEIVE_PROMPT + "\n\n" + load_prompt("perceive_feedback")
+# perceive prompt for a page that only changed since the last observation
+PERCEIVE_DELTA_PROMPT = PERCEIVE_PROMPT + "\n\n" + load_prompt("perceive_delta")
+PERCEIVE_DELTA_FEEDBACK_PROMPT = (
+    PERCEIVE_DELTA_PROMPT + "\n\n" + load_prompt("perceive_feedback")
+)
 logger = logging.getLogger(__name__)
 
+# Trim order of act() payload sections when over budget (highest first, 0 = never)
+ACT_SECTION_PRIORITIES = {
+    "recent_memories": 3,
+    "environment": 2,
+    "observation": 2,
+    "targets": 1,
+    "valid_targets": 1,
+}
+
+# Observations of page states seen by any agent in this process (PERCEPTION_CACHE=off|memory|disk)
+perception_cache: TieredCache | None = TieredCache.from_env(
+    "PERCEPTION_CACHE", table="perceptions", default_mode="memory"
+)
+
 
 # context manager to log api calls
 class LogApiCall:
@@ -29,27 +55,27 @@ class LogApiCall:
         self.retrieve_result = []
         self.request = []
         self.response = []
+        self.token_breakdown = []
         self.start_time = time.time()
         context.api_call_manager.set(self)
 
     def __exit__(self, exc_type, exc_value, traceback):
         context.api_call_manager.set(None)
-        with open(
-            context.run_path.get()
-            / "api_trace"
-            / f"api_trace_{Agent.api_call_count}.json",
-            "w",
-        ) as f:
-            json.dump(
-                {
-                    "request": self.request,
-                    "response": self.response,
-                    "method_name": self.method_name,
-                    "retrieve_result": self.retrieve_result,
-                    "time": time.time() - self.start_time,
-                },
-                f,
-            )
+        trace = {
+            "request": self.request,
+            "response": self.response,
+            "method_name": self.method_name,
+            "retrieve_result": self.retrieve_result,
+            "token_breakdown": self.token_breakdown,
+            "time": time.time() - self.start_time,
+        }
+        relative = pathlib.Path("api_trace") / f"api_trace_{Agent.api_call_count}.json"
+        writer = context.trace_writer.get()
+        if writer is not None:
+            writer.write_json(relative, trace)
+        else:
+            with open(context.run_path.get() / relative, "w") as f:
+                json.dump(trace, f)
         logger.info(f"API Call time: {time.time() - self.start_time}")
 
 
@@ -67,6 +93,11 @@ class Agent:
         self.persona = persona
         self.intent = intent
         self.current_plan = None
+        # set when the last perceive returned no observation and self.observation is a placeholder
+        self.perception_failed = False
+        # observations of this run by page-state key, see perceive()
+        self.perceived_states: dict[str, Any] = {}
+        self.perception_hits = {"run": 0, "shared": 0, "misses": 0}
 
     @staticmethod
     def _read_float_env(key: str, default: float) -> float:
@@ -162,38 +193,197 @@ class Agent:
 
         return planned_action
 
-    async def perceive(self, environment):
-        environment_full = json.dumps(environment)
+    def _perceived_observation(self):
+        """The last observation the model produced; None before the first perceive or after a failed one."""
+        if self.perception_failed:
+            return None
+        return self.observation or None
 
-        for denied_word in self.deny_list:
-            environment_full = environment_full.replace(denied_word, "***")
-        # print(environment_full)
+    def _delta_input(self, delta: Optional[dict]) -> Optional[dict]:
+        """Model input for an incremental perceive, None if the full page must be sent."""
+        previous = self._perceived_observation()
+        if delta is None or previous is None:
+            return None
+        return {"previous_observation": previous, "changes": delta}
+
+    @staticmethod
+    def _delta_is_empty(delta: dict) -> bool:
+        return not (delta.get("added") or delta.get("changed") or delta.get("removed_ids"))
+
+    def _shared_perception_key(self, state_key: str) -> str:
+        # the deny list rewrites the model input, so agents only share with identical lists
+        return content_key("perceive", state_key, self.deny_list, PERCEIVE_PROMPT)
+
+    async def _cached_perception(self, state_key: Optional[str]) -> Optional[dict]:
+        """Observation stored for this page state in this run or by another agent."""
+        if state_key is None or perception_cache is None:
+            return None
+        observation = self.perceived_states.get(state_key)
+        if observation is not None:
+            self.perception_hits["run"] += 1
+            return observation
+        cached = await perception_cache.get(self._shared_perception_key(state_key))
+        if cached is not None:
+            self.perception_hits["shared"] += 1
+            observation = json.loads(cached.decode("utf-8"))
+            self.perceived_states[state_key] = observation
+            return observation
+        self.perception_hits["misses"] += 1
+        return None
+
+    async def _remember_perception(self, state_key: Optional[str], result: dict) -> None:
+        observations = result.get("observations")
+        if state_key is None or perception_cache is None:
+            return
+        # never remember the placeholder stored for a failed perceive
+        if not observations or not observations[0] or self.perception_failed:
+            return
+        self.perceived_states[state_key] = observations[0]
+        await perception_cache.set(
+            self._shared_perception_key(state_key),
+            json.dumps(observations[0]).encode("utf-8"),
+        )
+
+    def perception_cache_stats(self) -> dict:
+        """Per-run perception reuse counters for the timing metrics."""
+        lookups = sum(self.perception_hits.values())
+        hits = self.perception_hits["run"] + self.perception_hits["shared"]
+        return {
+            "run_hits": self.perception_hits["run"],
+            "shared_hits": self.perception_hits["shared"],
+            "misses": self.perception_hits["misses"],
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    async def perceive(
+        self, environment, delta: Optional[dict] = None, state_key: Optional[str] = None
+    ):
+        """
+        Perceive the page. `delta` (see executor.dom_diff.DomDelta.to_prompt) holds
+        what changed since the last perceive on the same page; when given, only the
+        previous observation and the changes are sent, and a page that did not
+        change at all reuses the previous observation without an LLM call.
+
+        `state_key` identifies the page state (URL and normalized DOM hash); a state
+        already perceived in this run or by another agent reuses that observation.
+        """
+        cached = await self._cached_perception(state_key)
+        if cached is not None:
+            logger.info("page state perceived before, reusing its observation")
+            await self._store_observation({"observations": [cached]}, environment)
+            return
+        delta_input = self._delta_input(delta)
+        if delta_input is not None and self._delta_is_empty(delta):
+            logger.info("page unchanged since the last observation, reusing it")
+            await self._store_observation(
+                {"observations": [delta_input["previous_observation"]]}, environment
+            )
+            return
         logger.info("agent perceiving environment...")
         with LogApiCall():
+            if delta_input is None:
+                environment_full = json.dumps(
+                    PromptBudget("perceive", fixed=PERCEIVE_PROMPT).fit(
+                        [Section("html", environment, priority=1)]
+                    )["html"]
+                )
+            else:
+                environment_full = json.dumps(delta_input)
+            for denied_word in self.deny_list:
+                environment_full = environment_full.replace(denied_word, "***")
             request = [
-                {"role": "system", "content": PERCEIVE_PROMPT},
+                {
+                    "role": "system",
+                    "content": PERCEIVE_DELTA_PROMPT
+                    if delta_input is not None
+                    else PERCEIVE_PROMPT,
+                },
                 {"role": "user", "content": environment_full},
             ]
             result = await async_chat(request, json_mode=True, max_tokens=64000)
             result = json.loads(result)
             print(result)
-            if not result.get("observations"):
-                logger.warning("No observations returned from LLM")
-                # Create a dummy observation or retry
-                self.observation = {"page": "Error loading page", "url": "", "clickables": []}
-                # Convert dict to JSON string for embedding compatibility
-                obs_content = json.dumps(self.observation) if isinstance(self.observation, dict) else str(self.observation)
-                await self.memory.add_memory_piece(
-                    Observation(obs_content, self.memory, environment)
-                )
-                return
-
-            self.observation = result["observations"][0]
-            # Convert observation to string for embedding compatibility
+            await self._store_observation(result, environment)
+            await self._remember_perception(state_key, result)
+
+    async def _store_observation(self, result: dict, environment):
+        if not result.get("observations"):
+            logger.warning("No observations returned from LLM")
+            # Create a dummy observation or retry
+            self.observation = {"page": "Error loading page", "url": "", "clickables": []}
+            self.perception_failed = True
+            # Convert dict to JSON string for embedding compatibility
             obs_content = json.dumps(self.observation) if isinstance(self.observation, dict) else str(self.observation)
             await self.memory.add_memory_piece(
                 Observation(obs_content, self.memory, environment)
             )
+            return
+
+        self.observation = result["observations"][0]
+        self.perception_failed = False
+        # Convert observation to string for embedding compatibility
+        obs_content = json.dumps(self.observation) if isinstance(self.observation, dict) else str(self.observation)
+        await self.memory.add_memory_piece(
+            Observation(obs_content, self.memory, environment)
+        )
+
+    async def perceive_with_feedback(
+        self, environment, delta: Optional[dict] = None, state_key: Optional[str] = None
+    ):
+        """
+        Perceive the page and give feedback on the last action in one LLM call,
+        so the page is sent once per step instead of twice. Falls back to
+        perceive() on the first step, when there is no action to evaluate.
+        `delta` and `state_key` work as in perceive(); on a cached page state only
+        the feedback call is made.
+        """
+        last_action = next(
+            (m for m in self.memory.memories[::-1] if isinstance(m, Action)), None
+        )
+        if last_action is None or self.current_plan is None:
+            await self.perceive(environment, delta, state_key)
+            return
+        cached = await self._cached_perception(state_key)
+        if cached is not None:
+            logger.info("page state perceived before, reusing its observation")
+            await self._store_observation({"observations": [cached]}, environment)
+            await self.feedback(environment)
+            return
+
+        delta_input = self._delta_input(delta)
+        logger.info("agent perceiving environment with feedback...")
+        with LogApiCall():
+            system_prompt = (
+                PERCEIVE_DELTA_FEEDBACK_PROMPT
+                if delta_input is not None
+                else PERCEIVE_FEEDBACK_PROMPT
+            )
+            model_input = PromptBudget("perceive_with_feedback", fixed=system_prompt).fit(
+                [
+                    Section("persona", self.persona),
+                    Section("last_plan", self.current_plan.content),
+                    Section("last_action", last_action.raw_action),
+                    Section(
+                        "environment",
+                        delta_input if delta_input is not None else environment,
+                        priority=1,
+                    ),
+                ]
+            )
+            model_input = json.dumps(model_input)
+            for denied_word in self.deny_list:
+                model_input = model_input.replace(denied_word, "***")
+            request = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": model_input},
+            ]
+            result = await async_chat(request, json_mode=True, max_tokens=64000)
+            result = json.loads(result)
+            await self._store_observation(result, environment)
+            await self._remember_perception(state_key, result)
+        logger.info("feedback: %s", result.get("thoughts"))
+        for thought in result.get("thoughts") or []:
+            await self.memory.add_memory_piece(Thought(thought, self.memory))
 
     @staticmethod
     def format_memories(memories: list[MemoryPiece], sort_by_kind=True) -> list[str]:
@@ -209,6 +399,24 @@ class Agent:
         ]
         return memories_str
 
+    def _fit_memories(
+        self, call: str, system_prompt: str, memories: list[MemoryPiece]
+    ) -> list[str]:
+        """Format `memories` for a prompt, dropping the oldest ones beyond the call's budget."""
+        fitted = PromptBudget(call, fixed=system_prompt).fit(
+            [
+                Section("persona", self.persona),
+                Section("intent", self.intent),
+                Section(
+                    "memories",
+                    sorted(memories, key=lambda m: m.timestamp),
+                    priority=1,
+                    render=lambda m: self.format_memories([m])[0],
+                ),
+            ]
+        )
+        return self.format_memories(fitted["memories"])
+
     async def feedback(self, obs):
         last_action = None
         last_plan = self.current_plan
@@ -220,20 +428,18 @@ class Agent:
         assert last_action is not None
         assert last_plan is not None
         with LogApiCall():
+            model_input = PromptBudget("feedback", fixed=FEEDBACK_PROMPT).fit(
+                [
+                    Section("persona", self.persona),
+                    Section("last_action", last_action.raw_action),
+                    Section("last_plan", last_plan.content),
+                    Section("observation", obs, priority=1),
+                ]
+            )
             resp = await async_chat(
                 [
                     {"role": "system", "content": FEEDBACK_PROMPT},
-                    {
-                        "role": "user",
-                        "content": json.dumps(
-                            {
-                                "persona": self.persona,
-                                "last_action": last_action.raw_action,
-                                "last_plan": last_plan.content,
-                                "observation": obs,
-                            }
-                        ),
-                    },
+                    {"role": "user", "content": json.dumps(model_input)},
                 ],
                 json_mode=True,
             )
@@ -251,7 +457,7 @@ class Agent:
         # ]
         memories = self.memory.memories[self.last_reflect_index :]
         self.last_reflect_index = len(self.memory.memories)
-        memories = self.format_memories(memories)
+        memories = self._fit_memories("reflect", REFLECT_PROMPT, memories)
         model_input = {
             "current_timestamp": self.memory.timestamp,
             "memories": memories,
@@ -265,6 +471,7 @@ class Agent:
             ],
             log=False,
             json_mode=True,
+            priority="reflect",
             model="large",
         )
         try:
@@ -338,7 +545,7 @@ class Agent:
     async def wonder(self):
         logger.info("wondering ...")
         memories = self.memory.memories[-50:]  # get the last 50 memories
-        memories = self.format_memories(memories)
+        memories = self._fit_memories("wonder", WONDER_PROMPT, memories)
         # with LogApiCall():
         resp = await async_chat(
             [
@@ -357,6 +564,7 @@ class Agent:
             log=False,
             json_mode=True,
             model="large",
+            priority="wonder",
         )
         resp = json.loads(resp)
         logger.info("wondering: %s", resp)
@@ -375,7 +583,7 @@ class Agent:
                 trigger_update=False,
                 kind_weight={"action": 10, "plan": 10, "thought": 10, "reflection": 10},
             )
-            memories = self.format_memories(memories)
+            memories = self._fit_memories("plan", PLANNING_PROMPT, memories)
             new_plan = ""
             rationale = ""
             while True:
@@ -429,7 +637,7 @@ class Agent:
     async def act_cua(self, env, playwright_env):
         import base64
         import json
-        from .gpt import chat_gemini_computer_use
+        from .gpt import async_chat_gemini_computer_use
         
         try:
             # screenshot_base64 = await playwright_env.screenshot()
@@ -499,7 +707,7 @@ Output the next action to take to achieve the goal.
             except Exception:
                 pass
 
-            response = chat_gemini_computer_use(
+            response = await async_chat_gemini_computer_use(
                 messages,
                 system_prompt=system_prompt,
                 screen_width=screen_width,
@@ -592,6 +800,56 @@ Output the next action to take to achieve the goal.
             )
             return fallback_action
 
+    @staticmethod
+    def _compact_action_payload() -> bool:
+        """ACTION_PAYLOAD=compact sends a target table and the perceived page instead of the HTML."""
+        return os.getenv("ACTION_PAYLOAD", "full").strip().lower() == "compact"
+
+    @staticmethod
+    def _valid_targets(env: dict) -> dict:
+        """
+        Target ids by type from the parser's per-type lists. Labels, values and
+        state are already in the page HTML, so only the ids are repeated here.
+        """
+        clickable = [e for e in env.get("clickable_elements", []) if e is not None]
+        seen = {e for e in clickable if isinstance(e, str)}
+        return {
+            "inputs": [
+                e["id"]
+                for e in env.get("input_elements", [])
+                if e and e.get("id") and not e.get("disabled")
+            ],
+            "clickable": clickable,
+            "selects": [e["id"] for e in env.get("select_elements", []) if e and e.get("id")],
+            "hoverable": [
+                e for e in env.get("hoverable_elements", []) if e is not None and e not in seen
+            ],
+        }
+
+    @classmethod
+    def _target_table(cls, env: dict) -> str:
+        """`id | role | label` lines for the compact action payload."""
+        rows = env.get("targets")
+        if rows:
+            return "\n".join(
+                f"{r['id']} | {r.get('role', '')} | {r.get('label', '')}"
+                for r in rows
+                if r and r.get("id")
+            )
+        # observations from parsers without a target table only have ids
+        targets = cls._valid_targets(env)
+        roles = {
+            "inputs": "input",
+            "clickable": "clickable",
+            "selects": "select",
+            "hoverable": "hoverable",
+        }
+        return "\n".join(
+            f"{target_id} | {roles[kind]} |"
+            for kind, ids in targets.items()
+            for target_id in ids
+        )
+
     async def act(self, env, playwright_env=None):
         import os
         use_cua = os.getenv("USE_CUA", "false").lower() == "true"
@@ -621,11 +879,9 @@ Output the next action to take to achieve the goal.
                 trigger_update=False,
                 kind_weight={"observation": 0, "action": 10, "thought": 10},
             )
-            memories = self.format_memories(memories)
+            # oldest first, so the budget drops the oldest memories
+            memories = sorted(memories, key=lambda m: m.timestamp)
             assert self.current_plan is not None
-            clickables = [e for e in env["clickable_elements"] if e is not None]
-            inputs = [e for e in env["clickable_elements"] if e is not None]
-            selects = [e for e in env["clickable_elements"] if e is not None]
             if supports_stagehand_nl:
                 action_prompt = STAGEHAND_ACTION_PROMPT
                 action_payload = {
@@ -638,14 +894,21 @@ Output the next action to take to achieve the goal.
                     "last_action": last_action,
                     "current_url": env.get("url", ""),
                 }
+            elif self._compact_action_payload() and self._perceived_observation() is not None:
+                action_prompt = ACTION_COMPACT_PROMPT
+                action_payload = {
+                    "targets": self._target_table(env),
+                    "persona": self.persona,
+                    "intent": self.intent,
+                    "plan": self.current_plan.content,
+                    "next_step": self.current_plan.next_step,
+                    "observation": self._perceived_observation(),
+                    "recent_memories": memories,
+                }
             else:
                 action_prompt = ACTION_PROMPT
                 action_payload = {
-                    "valid_targets": {
-                        "inputs": inputs,
-                        "clickable": clickables,
-                        "selects": selects,
-                    },
+                    "valid_targets": self._valid_targets(env),
                     "persona": self.persona,
                     "intent": self.intent,
                     "plan": self.current_plan.content,
@@ -653,6 +916,23 @@ Output the next action to take to achieve the goal.
                     "environment": env["html"],
                     "recent_memories": memories,
                 }
+            # memories go first, then the page, then the target list
+            action_payload = PromptBudget("act", fixed=action_prompt).fit(
+                [
+                    Section(
+                        name,
+                        value,
+                        priority=ACT_SECTION_PRIORITIES.get(name, 0),
+                        render=(lambda m: self.format_memories([m])[0])
+                        if name == "recent_memories"
+                        else None,
+                    )
+                    for name, value in action_payload.items()
+                ]
+            )
+            action_payload["recent_memories"] = self.format_memories(
+                action_payload["recent_memories"]
+            )
             action = await async_chat(
                 [
                     {"role": "system", "content": action_prompt},
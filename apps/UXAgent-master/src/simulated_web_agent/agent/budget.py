@@ -0,0 +1,199 @@
+"""
+Token budgets for agent prompts.
+
+Every prompt is assembled from named sections (persona, plan, memories, page HTML,
+targets, ...). A PromptBudget counts each section with one shared tokenizer and, when
+the prompt would exceed the call's budget, trims the lowest-priority sections first:
+list sections (memories) lose their oldest items, text sections (HTML) are cut at the
+end. The per-section token breakdown is recorded in the api_trace of the call.
+
+Usage:
+    budget = PromptBudget("act", fixed=ACTION_PROMPT)
+    fitted = budget.fit([
+        Section("persona", persona),
+        Section("targets", targets, priority=1),
+        Section("html", html, priority=2),
+        Section("memories", memories, priority=3, render=str),
+    ])
+    html = fitted["html"]
+"""
+import functools
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from . import context
+
+try:
+    import tiktoken
+
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# One encoding for every provider; exact counts differ per model, but the budget
+# only needs to be consistent
+TOKENIZER_ENCODING = "o200k_base"
+
+TRUNCATION_MARKER = "\n...[truncated]"
+
+# Input-token budget per call; PROMPT_BUDGET_<CALL> or PROMPT_BUDGET override, 0 = unlimited
+DEFAULT_BUDGETS = {
+    "perceive": 48000,
+    "perceive_with_feedback": 48000,
+    "feedback": 48000,
+    "act": 48000,
+    "plan": 24000,
+    "reflect": 16000,
+    "wonder": 16000,
+    "ux_evaluation": 16000,
+}
+
+
+@functools.lru_cache(maxsize=1)
+def get_encoding():
+    """The shared tiktoken encoding, or None when tiktoken is unavailable."""
+    if not TIKTOKEN_AVAILABLE:
+        logger.warning("tiktoken is not installed; estimating prompt tokens from length")
+        return None
+    try:
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer {TOKENIZER_ENCODING}: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Keep the first `max_tokens` tokens of `text`."""
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding()
+    if encoding is None:
+        return text[: max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def budget_for(call: str) -> int:
+    for key in (f"PROMPT_BUDGET_{call.upper()}", "PROMPT_BUDGET"):
+        value = os.getenv(key)
+        if value:
+            try:
+                return max(0, int(value))
+            except ValueError:
+                logger.warning(f"Ignoring invalid {key}={value!r}")
+    return DEFAULT_BUDGETS.get(call, 32000)
+
+
+@dataclass
+class Section:
+    """
+    One part of a prompt.
+
+    priority 0 sections are never trimmed; among the others, the highest priority
+    value is trimmed first. `content` is a string (cut at the end), a list (oldest
+    items dropped first, each counted through `render`) or any other JSON value
+    (counted but never trimmed).
+    """
+
+    name: str
+    content: Any
+    priority: int = 0
+    render: Optional[Callable[[Any], str]] = None
+    min_tokens: int = 0
+
+    def _text(self, value: Any) -> str:
+        if self.render is not None:
+            return self.render(value)
+        return value if isinstance(value, str) else json.dumps(value)
+
+
+class PromptBudget:
+    def __init__(self, call: str, fixed: str = "", budget: Optional[int] = None):
+        """
+        Args:
+            call: Name of the agent call, selects the budget and labels the breakdown
+            fixed: Text sent with every request that cannot be trimmed (system prompt)
+            budget: Input-token budget; defaults to budget_for(call)
+        """
+        self.call = call
+        self.budget = budget_for(call) if budget is None else budget
+        self.fixed_tokens = count_tokens(fixed) if fixed else 0
+
+    def fit(self, sections: list[Section]) -> dict[str, Any]:
+        """Trim `sections` to the budget and return their contents by name."""
+        fitted: dict[str, Any] = {}
+        tokens: dict[str, int] = {}
+        item_tokens: dict[str, list[int]] = {}
+        for s in sections:
+            fitted[s.name] = s.content
+            if isinstance(s.content, list):
+                item_tokens[s.name] = [count_tokens(s._text(i)) for i in s.content]
+                tokens[s.name] = sum(item_tokens[s.name])
+            else:
+                tokens[s.name] = count_tokens(s._text(s.content))
+        original = dict(tokens)
+
+        overflow = self.fixed_tokens + sum(tokens.values()) - self.budget
+        trimmable = sorted(
+            (s for s in sections if s.priority > 0), key=lambda s: -s.priority
+        )
+        for s in trimmable:
+            if self.budget <= 0 or overflow <= 0:
+                break
+            room = tokens[s.name] - s.min_tokens
+            if room <= 0:
+                continue
+            cut = min(overflow, room)
+            if isinstance(s.content, list):
+                counts = item_tokens[s.name]
+                dropped = removed = 0
+                while dropped < len(counts) and removed < cut:
+                    removed += counts[dropped]
+                    dropped += 1
+                fitted[s.name] = s.content[dropped:]
+                tokens[s.name] -= removed
+                overflow -= removed
+            elif isinstance(s.content, str):
+                keep = tokens[s.name] - cut
+                fitted[s.name] = truncate_tokens(s.content, keep) + TRUNCATION_MARKER
+                tokens[s.name] = keep
+                overflow -= cut
+
+        self._record(original, tokens)
+        return fitted
+
+    def _record(self, original: dict[str, int], tokens: dict[str, int]) -> None:
+        trimmed = [name for name in tokens if tokens[name] < original[name]]
+        breakdown = {
+            "call": self.call,
+            "budget": self.budget,
+            "fixed_tokens": self.fixed_tokens,
+            "total_tokens": self.fixed_tokens + sum(tokens.values()),
+            "sections": {
+                name: {"tokens": tokens[name], "original_tokens": original[name]}
+                for name in tokens
+            },
+            "trimmed": trimmed,
+        }
+        if trimmed:
+            logger.info(
+                f"{self.call} prompt over its {self.budget}-token budget, trimmed {trimmed}: "
+                f"{self.fixed_tokens + sum(original.values())} -> {breakdown['total_tokens']} tokens"
+            )
+        api_call = context.api_call_manager.get()
+        if api_call is not None and hasattr(api_call, "token_breakdown"):
+            api_call.token_breakdown.append(breakdown)
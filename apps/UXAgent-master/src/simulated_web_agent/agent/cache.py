@@ -0,0 +1,243 @@
+"""
+Content-addressed caches for LLM calls.
+
+A TieredCache combines an in-process LRU with an optional SQLite store on disk.
+Values are raw bytes so the same cache works for chat responses (utf-8 text) and
+embeddings (float32 vectors). Keys are built by the caller, usually a sha256 over
+everything that determines the result.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(*parts: Any) -> str:
+    """Stable sha256 key over JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU mapping keys to bytes."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max(1, max_entries)
+        self._data: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    Persistent key/value store with TTL and size-based eviction.
+
+    Entries older than `ttl_seconds` are ignored and purged; when the stored bytes
+    exceed `max_bytes`, the least recently accessed entries are evicted first.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        table: str = "cache",
+        ttl_seconds: float = 0,
+        max_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed)"
+        )
+        self._conn.commit()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created > self.ttl_seconds
+
+    def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        if not keys:
+            return {}
+        now = time.time()
+        found: dict[str, bytes] = {}
+        expired: list[str] = []
+        with self._lock:
+            # stay well below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i : i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value, created FROM {self.table} WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, value, created in rows:
+                    if self._expired(created, now):
+                        expired.append(key)
+                    else:
+                        found[key] = value
+            if found:
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET accessed = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+            if expired:
+                self._conn.executemany(
+                    f"DELETE FROM {self.table} WHERE key = ?", [(k,) for k in expired]
+                )
+            self._conn.commit()
+        return found
+
+    def set_many(self, items: dict[str, bytes]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(k, v, len(v), now, now) for k, v in items.items()],
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        if self.ttl_seconds > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created < ?", (now - self.ttl_seconds,)
+            )
+        total = self._conn.execute(
+            f"SELECT COALESCE(SUM(size), 0) FROM {self.table}"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # evict least recently accessed entries until we are back under the limit
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute(
+            f"SELECT key, size FROM {self.table} ORDER BY accessed ASC"
+        ):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", victims)
+        logger.info(f"Evicted {len(victims)} entries from {self.path}:{self.table}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    """
+    In-process LRU in front of an optional SQLite store, with hit/miss counters.
+
+    Disk lookups run in a worker thread so they never block the event loop.
+    """
+
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(
+        cls, prefix: str, table: str, default_mode: str = "off"
+    ) -> Optional["TieredCache"]:
+        """
+        Build a cache from `<prefix>` ("off" | "memory" | "disk") and related env vars:
+        `<prefix>_PATH`, `<prefix>_TTL_SECONDS`, `<prefix>_MAX_ENTRIES`, `<prefix>_MAX_MB`.
+        Returns None when the cache is off.
+        """
+        mode = os.getenv(prefix, default_mode).strip().lower()
+        if mode in ("", "0", "off", "false", "no"):
+            return None
+        memory = LRUCache(int(os.getenv(f"{prefix}_MAX_ENTRIES", "1024")))
+        disk = None
+        if mode == "disk":
+            disk = SQLiteCache(
+                os.getenv(f"{prefix}_PATH", "./llm_cache.sqlite"),
+                table=table,
+                ttl_seconds=float(os.getenv(f"{prefix}_TTL_SECONDS", str(7 * 24 * 3600))),
+                max_bytes=int(float(os.getenv(f"{prefix}_MAX_MB", "512")) * 1024 * 1024),
+            )
+        logger.info(f"{prefix} enabled (mode={mode}, table={table})")
+        return cls(memory, disk)
+
+    async def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        found: dict[str, bytes] = {}
+        missing: list[str] = []
+        for key in keys:
+            value = self.memory.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        self.memory_hits += len(found)
+        if missing and self.disk is not None:
+            from_disk = await asyncio.to_thread(self.disk.get_many, missing)
+            for key, value in from_disk.items():
+                self.memory.set(key, value)
+            found.update(from_disk)
+            self.disk_hits += len(from_disk)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return (await self.get_many([key])).get(key)
+
+    async def set_many(self, items: dict[str, bytes]) -> None:
+        for key, value in items.items():
+            self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set_many, items)
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self.set_many({key: value})
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
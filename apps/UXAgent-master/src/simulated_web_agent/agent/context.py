@@ -4,9 +4,13 @@ from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
     from simulated_web_agent.agent import LogApiCall
+    from simulated_web_agent.main.trace_writer import TraceWriter
 
 run_path = ContextVar("run_path", default=None)
 api_call_manager: ContextVar[Optional["LogApiCall"]] = ContextVar(
     "api_call_manager", default=None
 )
 browser_context = ContextVar("browser_context", default=None)
+trace_writer: ContextVar[Optional["TraceWriter"]] = ContextVar(
+    "trace_writer", default=None
+)
@@ -1,4 +1,5 @@
 import asyncio
+import hashlib
 import json
 import time
 from pathlib import Path
@@ -6,6 +7,7 @@ from typing import Any, Dict, cast
 
 # anthropic import for claude computer use
 import anthropic
+import numpy as np
 import yaml
 from anthropic.types.beta import (
     BetaContentBlockParam,
@@ -60,6 +62,9 @@ except Exception:
     pass  # Continue even if litellm config fails
 
 from . import context
+from .cache import TieredCache, content_key
+from .llm_loop import llm_loop, shared_loop_enabled
+from .rate_limit import RateLimiter, backoff_delay, estimate_tokens
 
 provider = "gemini"  # "openai" or "aws" or "anthropic" or "gemini"
 
@@ -67,9 +72,30 @@ prompt_dir = Path(__file__).parent.absolute() / "shop_prompts"
 
 import threading
 
-# Thread-local storage for routers
+# Routers and async clients are process-wide and only awaited on the shared LLM loop
+# (see llm_loop.py); with LLM_SHARED_LOOP=false they fall back to one per thread.
+_shared: dict[str, Any] = {}
+_shared_lock = threading.Lock()
 _local = threading.local()
 
+
+def _client(name: str, factory):
+    if shared_loop_enabled():
+        with _shared_lock:
+            if name not in _shared:
+                _shared[name] = factory()
+            return _shared[name]
+    if not hasattr(_local, name):
+        setattr(_local, name, factory())
+    return getattr(_local, name)
+
+
+async def _llm_call(fn, *args, **kwargs):
+    """Await a provider call on the shared LLM loop (or the caller's loop if disabled)."""
+    if shared_loop_enabled():
+        return await llm_loop.run(fn, *args, **kwargs)
+    return await fn(*args, **kwargs)
+
 CHAT_MODEL_LIST = [
     {
         "model_name": "openai",
@@ -220,44 +246,86 @@ EMBED_MODEL_LIST = [
 
 
 def get_chat_router():
-    if not hasattr(_local, "chat_router"):
-        _local.chat_router = Router(model_list=CHAT_MODEL_LIST)
-    return _local.chat_router
+    return _client("chat_router", lambda: Router(model_list=CHAT_MODEL_LIST))
 
 
 def get_slow_chat_router():
-    if not hasattr(_local, "slow_chat_router"):
-        _local.slow_chat_router = Router(model_list=SLOW_CHAT_MODEL_LIST)
-    return _local.slow_chat_router
+    return _client("slow_chat_router", lambda: Router(model_list=SLOW_CHAT_MODEL_LIST))
+
+
+def _deployment_params(model: str, router_model: str) -> Dict[str, Any]:
+    """Model id and reasoning settings of the deployment a chat call is routed to."""
+    model_list = CHAT_MODEL_LIST if model == "small" else SLOW_CHAT_MODEL_LIST
+    for deployment in model_list:
+        if deployment["model_name"] == router_model:
+            params = deployment["litellm_params"]
+            return {
+                k: params[k] for k in ("model", "reasoning_effort", "thinking") if k in params
+            }
+    return {}
 
 
 def get_embed_router():
-    if not hasattr(_local, "embed_router"):
-        _local.embed_router = Router(model_list=EMBED_MODEL_LIST)
-    return _local.embed_router
+    return _client("embed_router", lambda: Router(model_list=EMBED_MODEL_LIST))
 
 
 load_dotenv()  # load anthropic api key from .env
 anthropic_client = anthropic.Anthropic()
 anthropic_model = "claude-sonnet-4-20250514"
 
+# Opt-in response cache for async_chat, configured by LLM_CACHE ("off" | "memory" | "disk")
+# and LLM_CACHE_PATH / LLM_CACHE_TTL_SECONDS / LLM_CACHE_MAX_ENTRIES / LLM_CACHE_MAX_MB.
+# Identical requests return the stored response, which makes replays deterministic.
+response_cache: TieredCache | None = TieredCache.from_env("LLM_CACHE", table="chat")
+
+# Embedding cache for embed_text, keyed by (embedding model, sha256(text)) and storing float32
+# vectors. Embeddings are deterministic, so the in-memory tier is on by default; set
+# EMBED_CACHE=disk (with EMBED_CACHE_PATH etc.) to persist across runs or EMBED_CACHE=off to disable.
+embedding_cache: TieredCache | None = TieredCache.from_env(
+    "EMBED_CACHE", table="embeddings", default_mode="memory"
+)
+
+
+# Shared by every agent in the process; limits are configured with LLM_RPM / LLM_TPM /
+# LLM_MAX_IN_FLIGHT (optionally suffixed with _<PROVIDER> or _<PROVIDER>_<TIER>).
+rate_limiter = RateLimiter()
+
+
+def limiter_stats() -> dict:
+    """Queue depth, in-flight requests and wait times of the LLM rate limiter."""
+    return rate_limiter.stats()
+
+
+def _call_priority(priority):
+    # default to the agent method making the call (act, plan, perceive, ...)
+    if priority is None and context.api_call_manager.get() is not None:
+        return getattr(context.api_call_manager.get(), "method_name", None)
+    return priority
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters of the LLM caches that are enabled."""
+    stats = {}
+    if response_cache is not None:
+        stats["responses"] = response_cache.stats()
+    if embedding_cache is not None:
+        stats["embeddings"] = embedding_cache.stats()
+    return stats
+
 
 def async_retry(times=10):
     def func_wrapper(f):
         async def wrapper(*args, **kwargs):
-            wait = 1
-            max_wait = 5
             last_exc = None
-            for _ in range(times):
+            for attempt in range(times):
                 # noinspection PyBroadException
                 try:
                     return await f(*args, **kwargs)
                 except Exception as exc:
                     last_exc = exc
                     print("got exc", exc)
-                    await asyncio.sleep(wait)
-                    wait = min(wait * 2, max_wait)
-                    pass
+                    # jittered so agents do not retry in lockstep; honors Retry-After
+                    await asyncio.sleep(backoff_delay(attempt, exc))
             if last_exc:
                 raise last_exc
 
@@ -269,20 +337,15 @@ def async_retry(times=10):
 def retry(times=10):
     def func_wrapper(f):
         def wrapper(*args, **kwargs):
-            wait = 1
-            max_wait = 5
             last_exc = None
-            for _ in range(times):
+            for attempt in range(times):
                 # noinspection PyBroadException
                 try:
                     return f(*args, **kwargs)
                 except Exception as exc:
                     print("got exc", exc)
                     last_exc = exc
-                    # await asyncio.sleep(wait)
-                    time.sleep(wait)
-                    wait = min(wait * 2, max_wait)
-                    pass
+                    time.sleep(backoff_delay(attempt, exc))
             if last_exc:
                 raise last_exc
 
@@ -311,6 +374,8 @@ async def async_chat(
     log=True,
     max_tokens=64000,
     enable_thinking=None,
+    cache=True,
+    priority=None,
     **kwargs,
 ):
     """
@@ -327,6 +392,9 @@ async def async_chat(
         log: whether to log the output
         max_tokens: the maximum number of tokens
         enable_thinking: whether to enable thinking, if supported (supported by bedrock and anthropic, not supported by openai)
+        cache: whether this call may use the response cache (only when LLM_CACHE is enabled)
+        priority: rate-limiter class ("act", "plan", "reflect", "wonder", "importance", ...);
+            defaults to the agent method inside LogApiCall
 
     Returns:
         A single string object outputted by the LLM.
@@ -335,22 +403,51 @@ async def async_chat(
     if context.api_call_manager.get() and log:
         context.api_call_manager.get().request.append(messages)
 
-    router = get_chat_router() if model == "small" else get_slow_chat_router()
-    call_kwargs: Dict[str, Any] = dict(**kwargs)
     if enable_thinking:
         router_model = provider + "_thinking"
     else:
         router_model = provider
+
+    cache_key = None
+    if response_cache is not None and cache:
+        # keyed on the model actually called, so editing the model lists invalidates entries
+        cache_key = content_key(
+            "chat",
+            provider,
+            model,
+            _deployment_params(model, router_model),
+            bool(enable_thinking),
+            json_mode,
+            max_tokens,
+            kwargs,
+            messages,
+        )
+        cached = await response_cache.get(cache_key)
+        if cached is not None:
+            content = cached.decode("utf-8")
+            if context.api_call_manager.get() and log:
+                context.api_call_manager.get().response.append(content)
+            return content
+
+    router = get_chat_router() if model == "small" else get_slow_chat_router()
+    call_kwargs: Dict[str, Any] = dict(**kwargs)
     if json_mode and provider == "openai":
         call_kwargs["response_format"] = {"type": "json_object"}
-    response = await router.acompletion(
-        model=router_model,
-        messages=messages,
-        max_tokens=max_tokens,
-        drop_params=True,  # do not forward unused params, such as thinking for openai
-        **call_kwargs,
-        tools=None,
-    )
+    tier = "small" if model == "small" else "large"
+    reserved = estimate_tokens(messages) + min(max_tokens, 1024)
+    async with rate_limiter.slot(
+        (provider, tier), reserved, _call_priority(priority)
+    ) as usage:
+        response = await _llm_call(
+            router.acompletion,
+            model=router_model,
+            messages=messages,
+            max_tokens=max_tokens,
+            drop_params=True,  # do not forward unused params, such as thinking for openai
+            **call_kwargs,
+            tools=None,
+        )
+        usage["tokens"] = getattr(getattr(response, "usage", None), "total_tokens", None)
     if not response.choices:
         raise Exception(f"No choices returned from LLM. Response: {response}")
     content = response.choices[0].message.get("content", "")
@@ -371,11 +468,15 @@ async def async_chat(
         try:
             json_str = _extract_json_string(content)
             _ = json.loads(json_str)
-            return json_str
         except Exception as e:
             print(e)
             print(content)
             raise Exception("Invalid JSON in response") from e
+        content = json_str
+
+    # only valid responses are cached; failed attempts are retried by async_retry
+    if cache_key is not None:
+        await response_cache.set(cache_key, content.encode("utf-8"))
     return content
 
 
@@ -424,15 +525,22 @@ def chat(
         raise e
 
 
-async def embed_text(texts: list[str]) -> list[list[float]]:
-    """
-    Embed a list of texts using the provider configured in /src/simulated_web_agent/agent/gpt.py
+def _embed_model_name() -> str:
+    for m in EMBED_MODEL_LIST:
+        if m["model_name"] == provider:
+            return m["litellm_params"]["model"]
+    return provider
 
-    Returns:
-        List of list[float] representing each of the embedded texts
-    """
+
+async def _embed_uncached(texts: list[str]) -> list[list[float]]:
     try:
-        response = await get_embed_router().aembedding(model=provider, input=texts)
+        async with rate_limiter.slot(
+            (provider, "embed"), estimate_tokens(texts), "embed"
+        ) as usage:
+            response = await _llm_call(
+                get_embed_router().aembedding, model=provider, input=texts
+            )
+            usage["tokens"] = getattr(getattr(response, "usage", None), "total_tokens", None)
         return [e["embedding"] for e in response.data]
     except Exception as e:
         print(texts)
@@ -440,17 +548,128 @@ async def embed_text(texts: list[str]) -> list[list[float]]:
         raise e
 
 
-def chat_anthropic_computer_use(
-    messages,
-    system: BetaTextBlockParam,
-    model=anthropic_model,
-    screen_width: int = 1024,
-    screen_height: int = 768,
-) -> (list[BetaToolUseBlockParam], list[Dict, Any]):
+async def embed_text(texts: list[str]) -> list[list[float]]:
     """
-    Given a system block and JSON messages, return the tool use block generated by the computer use tool
+    Embed a list of texts using the provider configured in /src/simulated_web_agent/agent/gpt.py
+
+    Texts already in the embedding cache are served from it; only the distinct misses are
+    sent to the provider, in a single batched request.
+
+    Returns:
+        List of list[float] representing each of the embedded texts
     """
-    response = anthropic_client.beta.messages.create(
+    if embedding_cache is None or not texts:
+        return await _embed_uncached(texts)
+
+    model_name = _embed_model_name()
+    keys = [
+        f"{model_name}:{hashlib.sha256(t.encode('utf-8')).hexdigest()}" for t in texts
+    ]
+    found = await embedding_cache.get_many(list(dict.fromkeys(keys)))
+
+    missing = {}  # key -> text, deduplicated and in order
+    for key, text in zip(keys, texts):
+        if key not in found:
+            missing.setdefault(key, text)
+    if missing:
+        embeds = await _embed_uncached(list(missing.values()))
+        new_items = {
+            key: np.asarray(e, dtype=np.float32).tobytes()
+            for key, e in zip(missing.keys(), embeds)
+        }
+        await embedding_cache.set_many(new_items)
+        found.update(new_items)
+
+    return [np.frombuffer(found[key], dtype=np.float32).tolist() for key in keys]
+
+
+WEB_BROWSER_ACTIONS = [
+    "switch_tab",
+    "forward",
+    "back",
+    "new_tab",
+    "goto_url",
+    "close_tab",
+    "terminate",
+]
+
+WEB_BROWSER_TOOL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "action": {
+            "type": "string",
+            "enum": WEB_BROWSER_ACTIONS,
+        },
+        "tab_index": {
+            "type": "integer",
+            "minimum": 0,
+            "description": "Zero-based index for switch_tab and close_tab",
+        },
+        "url": {
+            "type": "string",
+            "description": "URL input, only required for goto_url and new_tab",
+        },
+    },
+    "required": ["action"],
+}
+
+# Tool definitions for Gemini (function calling through litellm)
+GEMINI_CUA_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "computer",
+            "description": "Control the computer mouse and keyboard",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "action": {
+                        "type": "string",
+                        "enum": [
+                            "mouse_move",
+                            "left_click",
+                            "left_click_drag",
+                            "right_click",
+                            "middle_click",
+                            "double_click",
+                            "screenshot",
+                            "type",
+                            "key",
+                            "cursor_position",
+                        ],
+                    },
+                    "coordinate": {
+                        "type": "array",
+                        "items": {"type": "integer"},
+                        "description": "(x, y) coordinates for mouse actions",
+                    },
+                    "text": {"type": "string", "description": "Text to type"},
+                    "key": {"type": "string", "description": "Key sequence to press (e.g. 'Enter', 'Ctrl+c')"},
+                },
+                "required": ["action"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "web_browser",
+            "description": "High-level browser controls",
+            "parameters": WEB_BROWSER_TOOL_SCHEMA,
+        },
+    },
+]
+
+
+def _anthropic_cua_request(
+    messages,
+    system: BetaTextBlockParam,
+    model: str,
+    screen_width: int,
+    screen_height: int,
+) -> dict:
+    """Keyword arguments for beta.messages.create with the computer use tools."""
+    return dict(
         model=model,
         max_tokens=1024,
         tools=[
@@ -464,33 +683,7 @@ def chat_anthropic_computer_use(
             {
                 "name": "web_browser",
                 "description": "High-level browser controls",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "action": {
-                            "type": "string",
-                            "enum": [
-                                "switch_tab",
-                                "forward",
-                                "back",
-                                "new_tab",
-                                "goto_url",
-                                "close_tab",
-                                "terminate",
-                            ],
-                        },
-                        "tab_index": {
-                            "type": "integer",
-                            "minimum": 0,
-                            "description": "Zero-based index for switch_tab and close_tab",
-                        },
-                        "url": {
-                            "type": "string",
-                            "description": "URL input, only required for goto_url and new_tab",
-                        },
-                    },
-                    "required": ["action"],
-                },
+                "input_schema": WEB_BROWSER_TOOL_SCHEMA,
             },
         ],
         system=[system],
@@ -498,97 +691,47 @@ def chat_anthropic_computer_use(
         betas=["computer-use-2025-01-24"],
     )
 
+
+def get_async_anthropic_client() -> anthropic.AsyncAnthropic:
+    # shared like the routers: its HTTP pool lives on the shared LLM loop
+    return _client("async_anthropic_client", anthropic.AsyncAnthropic)
+
+
+def chat_anthropic_computer_use(
+    messages,
+    system: BetaTextBlockParam,
+    model=anthropic_model,
+    screen_width: int = 1024,
+    screen_height: int = 768,
+) -> (list[BetaToolUseBlockParam], list[Dict, Any]):
+    """
+    Given a system block and JSON messages, return the tool use block generated by the computer use tool
+    """
+    response = anthropic_client.beta.messages.create(
+        **_anthropic_cua_request(messages, system, model, screen_width, screen_height)
+    )
+
     return response
 
 
-def chat_gemini_computer_use(
+async def async_chat_anthropic_computer_use(
     messages,
-    system_prompt: str,
-    model="gemini/gemini-2.0-flash",
+    system: BetaTextBlockParam,
+    model=anthropic_model,
     screen_width: int = 1024,
     screen_height: int = 768,
 ):
     """
-    Send messages (including images) to Gemini to simulate computer use.
-    Returns a dict compatible with what the Agent expects (CUA format).
+    Async version of chat_anthropic_computer_use; does not block the event loop.
     """
-    import base64
-    from litellm import completion
+    return await _llm_call(
+        get_async_anthropic_client().beta.messages.create,
+        **_anthropic_cua_request(messages, system, model, screen_width, screen_height),
+    )
 
-    # Define the tool definitions for Gemini
-    # Note: Gemini 2.0 Flash supports function calling
-    tools = [
-        {
-            "type": "function",
-            "function": {
-                "name": "computer",
-                "description": "Control the computer mouse and keyboard",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "action": {
-                            "type": "string",
-                            "enum": [
-                                "mouse_move",
-                                "left_click",
-                                "left_click_drag",
-                                "right_click",
-                                "middle_click",
-                                "double_click",
-                                "screenshot",
-                                "type",
-                                "key",
-                                "cursor_position",
-                            ],
-                        },
-                        "coordinate": {
-                            "type": "array",
-                            "items": {"type": "integer"},
-                            "description": "(x, y) coordinates for mouse actions",
-                        },
-                        "text": {"type": "string", "description": "Text to type"},
-                        "key": {"type": "string", "description": "Key sequence to press (e.g. 'Enter', 'Ctrl+c')"},
-                    },
-                    "required": ["action"],
-                },
-            },
-        },
-         {
-            "type": "function",
-            "function": {
-                "name": "web_browser",
-                "description": "High-level browser controls",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "action": {
-                            "type": "string",
-                            "enum": [
-                                "switch_tab",
-                                "forward",
-                                "back",
-                                "new_tab",
-                                "goto_url",
-                                "close_tab",
-                                "terminate",
-                            ],
-                        },
-                        "tab_index": {
-                            "type": "integer",
-                            "minimum": 0,
-                            "description": "Zero-based index for switch_tab and close_tab",
-                        },
-                        "url": {
-                            "type": "string",
-                            "description": "URL input, only required for goto_url and new_tab",
-                        },
-                    },
-                    "required": ["action"],
-                },
-            },
-        },
-    ]
 
+def _gemini_cua_messages(messages, system_prompt: str) -> list[dict]:
+    """Convert Anthropic-style message blocks (text / base64 image) to litellm format."""
     # Prepend system prompt to messages if needed, or rely on 'system' role
     formatted_messages = []
     if system_prompt:
@@ -614,24 +757,27 @@ def chat_gemini_computer_use(
              new_content.append({"type": "text", "text": msg["content"]})
         
         formatted_messages.append({"role": msg["role"], "content": new_content})
+    return formatted_messages
 
-    # Debug: Print structure of first user message
-    # try:
-    #     for m in formatted_messages:
-    #         if m["role"] == "user":
-    #             print(f"User message content types: {[c.get('type') for c in m['content']]}")
-    #             for c in m['content']:
-    #                 if c.get("type") == "image_url":
-    #                     url = c['image_url']['url']
-    #                     print(f"Image URL start: {url[:50]}...")
-    # except Exception:
-    #     pass
+
+def chat_gemini_computer_use(
+    messages,
+    system_prompt: str,
+    model="gemini/gemini-2.0-flash",
+    screen_width: int = 1024,
+    screen_height: int = 768,
+):
+    """
+    Send messages (including images) to Gemini to simulate computer use.
+    Returns a dict compatible with what the Agent expects (CUA format).
+    """
+    from litellm import completion
 
     try:
         response = completion(
             model=model,
-            messages=formatted_messages,
-            tools=tools,
+            messages=_gemini_cua_messages(messages, system_prompt),
+            tools=GEMINI_CUA_TOOLS,
             tool_choice="auto",
         )
         return response
@@ -641,6 +787,31 @@ def chat_gemini_computer_use(
         raise e
 
 
+async def async_chat_gemini_computer_use(
+    messages,
+    system_prompt: str,
+    model="gemini/gemini-2.0-flash",
+    screen_width: int = 1024,
+    screen_height: int = 768,
+):
+    """
+    Async version of chat_gemini_computer_use (litellm acompletion); does not
+    block the event loop, so concurrent agents keep running during the call.
+    """
+    from litellm import acompletion
+
+    try:
+        return await _llm_call(
+            acompletion,
+            model=model,
+            messages=_gemini_cua_messages(messages, system_prompt),
+            tools=GEMINI_CUA_TOOLS,
+            tool_choice="auto",
+        )
+    except Exception as e:
+        print(f"Gemini CUA Error: {e}")
+        raise e
+
 
 def load_prompt(prompt_name):
     p = prompt_dir / f"{prompt_name}.txt"
@@ -0,0 +1,91 @@
+"""
+Process-wide event loop for LLM I/O.
+
+Agents run on several event loops (one per Flask background thread, one per
+asyncio.run in scripts). litellm Routers and async provider clients bind their
+connection pools and logging worker to the loop they first run on, which is why they
+used to be created per thread. Instead, every provider call is now executed on one
+long-lived loop in a daemon thread, so all runs in the process share the same Routers,
+warm keep-alive connections and rate-limit view.
+
+Usage:
+    response = await llm_loop.run(router.acompletion, model=..., messages=...)
+    future = llm_loop.submit(router.acompletion, model=..., messages=...)  # from sync code
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LLMLoop:
+    """A daemon thread running one asyncio loop, with a thread-safe submit API."""
+
+    def __init__(self, name: str = "llm-io"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                ready = threading.Event()
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._serve, args=(self._loop, ready), name=self.name, daemon=True
+                )
+                self._thread.start()
+                ready.wait()
+                logger.info(f"Started shared LLM event loop thread '{self.name}'")
+            return self._loop
+
+    @staticmethod
+    def _serve(loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(
+        self, fn: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> concurrent.futures.Future:
+        """Schedule `fn(*args, **kwargs)` on the shared loop; safe to call from any thread."""
+
+        async def call():
+            return await fn(*args, **kwargs)
+
+        return asyncio.run_coroutine_threadsafe(call(), self.loop)
+
+    async def run(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Await `fn(*args, **kwargs)` executed on the shared loop from any event loop.
+        Cancelling the caller cancels the call on the shared loop.
+        """
+        if self.in_loop_thread():
+            return await fn(*args, **kwargs)
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                if self._thread is not None:
+                    self._thread.join(timeout=5)
+
+
+def shared_loop_enabled() -> bool:
+    """LLM_SHARED_LOOP=false restores per-thread routers called on the caller's loop."""
+    return os.getenv("LLM_SHARED_LOOP", "true").lower() not in ("0", "false", "no")
+
+
+llm_loop = LLMLoop()
+atexit.register(llm_loop.stop)
@@ -1,6 +1,7 @@
 import asyncio
 import json
 import logging
+import os
 from abc import ABC, abstractmethod
 from math import exp
 
@@ -10,21 +11,44 @@ import openai
 
 from . import context, gpt
 from .gpt import async_chat, embed_text, load_prompt
+from .memory_index import GrowableArray, create_index, top_k
 
 MEMORY_IMPORTANCE_PROMPT = load_prompt("memory_importance")
+MEMORY_IMPORTANCE_BATCH_PROMPT = load_prompt("memory_importance_batch")
 logger = logging.getLogger(__name__)
 
+# Memories older than this many steps get a recency boost below exp(-10) and are only
+# retrieved through similarity; newer ones are always re-scored alongside ANN candidates.
+RECENCY_HORIZON = 10
+
+# Codes for the kind column; kinds not listed here get a code on first use
+MEMORY_KINDS = ("observation", "action", "plan", "thought", "reflection")
+
+
+def _importance_batch_size() -> int:
+    """Memories scored per importance request; 1 restores one request per memory."""
+    try:
+        return max(1, int(os.getenv("MEMORY_IMPORTANCE_BATCH_SIZE", "16")))
+    except ValueError:
+        return 16
+
 
 class Memory:
+    """
+    Memory stream of an agent.
+
+    Besides the MemoryPiece objects, Memory keeps columnar NumPy copies of what
+    retrieve() scores on (embeddings in the index, importance, timestamp and kind
+    code per memory, in insertion order), so ranking never loops over Python objects.
+    """
+
     memories: list["MemoryPiece"] = []
-    embeddings: np.ndarray
-    importance: np.ndarray
     timestamp: int
 
     def __init__(self, agent):
         self.memories = []
-        self.embeddings = np.array([])
-        self.importance = np.array([])
+        self.index = create_index()
+        self._init_columns()
         self.timestamp = 0
         self.agent = agent
         self.read_lock = asyncio.Lock()
@@ -34,10 +58,40 @@ class Memory:
         self.added_since_last_update: int = 0
         self.add_count_history: list[int] = []
 
+    def _init_columns(self):
+        self._importance = GrowableArray(np.float32)
+        self._timestamps = GrowableArray(np.int64)
+        self._kinds = GrowableArray(np.int16)
+        self.kind_codes = {kind: i for i, kind in enumerate(MEMORY_KINDS)}
+        # positions in self.memories per kind, in timestamp order
+        self.kind_positions: dict[str, list[int]] = {}
+
+    def _kind_code(self, kind: str) -> int:
+        if kind not in self.kind_codes:
+            self.kind_codes[kind] = len(self.kind_codes)
+        return self.kind_codes[kind]
+
+    @property
+    def importance(self) -> np.ndarray:
+        return self._importance.view
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps.view
+
+    @property
+    def kinds(self) -> np.ndarray:
+        return self._kinds.view
+
     async def add_memory_piece(self, memory_piece):
         # async with self.update_lock:
         memory_piece.timestamp = self.timestamp
         self.memories.append(memory_piece)
+        self._timestamps.append(memory_piece.timestamp)
+        self._kinds.append(self._kind_code(memory_piece.kind))
+        self.kind_positions.setdefault(memory_piece.kind, []).append(
+            len(self.memories) - 1
+        )
         # NEW: increment and log
         self.added_since_last_update += 1
         logger.debug(
@@ -52,15 +106,45 @@ class Memory:
         return state
 
     def __setstate__(self, state):
+        if "index" not in state:
+            # traces pickled before the index existed
+            embeddings = state.pop("embeddings", np.array([]))
+            state["index"] = create_index()
+            state["index"].add(embeddings)
+        legacy_importance = state.pop("importance", None)
         self.__dict__ = state
+        if "_importance" not in state:
+            # traces pickled before the columnar store existed
+            self._init_columns()
+            if legacy_importance is not None:
+                self._importance.extend(legacy_importance)
+            self._timestamps.extend([m.timestamp for m in self.memories])
+            self._kinds.extend([self._kind_code(m.kind) for m in self.memories])
+            for i, m in enumerate(self.memories):
+                self.kind_positions.setdefault(m.kind, []).append(i)
         self.read_lock = asyncio.Lock()
         self.write_lock = asyncio.Lock()
 
+    @property
+    def embeddings(self) -> np.ndarray:
+        return self.index.vectors
+
+    def recent_indices(self, kind: str, steps: int) -> list[int]:
+        """
+        Positions of memories of `kind` from the last `steps` steps, oldest first.
+        Walks back from the newest memory of that kind, so the cost is O(result).
+        """
+        positions = self.kind_positions.get(kind, [])
+        timestamps = self.timestamps
+        since = self.timestamp - steps
+        start = len(positions)
+        while start > 0 and timestamps[positions[start - 1]] >= since:
+            start -= 1
+        return positions[start:]
+
     async def update(self):
         async with self.write_lock:
-            if self.embeddings is not None and len(self.memories) == len(
-                self.embeddings
-            ):
+            if len(self.memories) == len(self.index):
                 # nothing new to process
                 return
 
@@ -70,7 +154,7 @@ class Memory:
 
             async def get_embeddings():
                 # first get memories with no embeddings
-                start_idx = len(self.embeddings) if self.embeddings is not None else 0
+                start_idx = len(self.index)
                 memory_to_embed = self.memories[start_idx:]
                 if not memory_to_embed:
                     return np.array([]), 0
@@ -83,37 +167,19 @@ class Memory:
 
             async def update_importance():
                 # update importance for new items
-                start_idx = (
-                    len(self.importance)
-                    if isinstance(self.importance, np.ndarray)
-                    else 0
-                )
+                start_idx = len(self._importance)
                 memory_to_update = self.memories[start_idx:]
                 if not memory_to_update:
                     return np.array([]), 0
-                requests = [
-                    [
-                        {"role": "system", "content": MEMORY_IMPORTANCE_PROMPT},
-                        {
-                            "role": "user",
-                            "content": json.dumps(
-                                {
-                                    "persona": self.agent.persona,
-                                    "intent": self.agent.intent,
-                                    "memory": m.content,
-                                    "plan": self.agent.current_plan.content
-                                    if self.agent.current_plan
-                                    else None,
-                                }
-                            ),
-                        },
-                    ]
-                    for m in memory_to_update
+                batch_size = _importance_batch_size()
+                batches = [
+                    memory_to_update[i : i + batch_size]
+                    for i in range(0, len(memory_to_update), batch_size)
                 ]
-                responses = await asyncio.gather(
-                    *[async_chat(r, json_mode=True, log=False) for r in requests]
+                scores = await asyncio.gather(
+                    *[self._score_importance(batch) for batch in batches]
                 )
-                new_importance = [json.loads(r)["score"] for r in responses]
+                new_importance = [s for batch_scores in scores for s in batch_scores]
                 new_importance = np.array(new_importance) / 10
                 for i, m in enumerate(memory_to_update):
                     m.importance = new_importance[i]
@@ -125,19 +191,10 @@ class Memory:
 
             async with self.read_lock:
                 # merge embeddings
-                if self.embeddings.size == 0:
-                    self.embeddings = embeds
-                elif embeds.size > 0:
-                    self.embeddings = np.concatenate([self.embeddings, embeds])
+                self.index.add(embeds)
 
                 # merge importance
-                if (
-                    not isinstance(self.importance, np.ndarray)
-                    or self.importance.size == 0
-                ):
-                    self.importance = new_importance
-                elif new_importance.size > 0:
-                    self.importance = np.concatenate([self.importance, new_importance])
+                self._importance.extend(new_importance)
 
             # NEW: summary logging and bookkeeping
             processed = max(n_embeds, n_imps)
@@ -146,12 +203,79 @@ class Memory:
                 f"Updated memory: +{processed} new piece(s) this cycle "
                 f"(embeddings: +{n_embeds}, importance: +{n_imps}). "
                 f"Totals — pieces={len(self.memories)}, "
-                f"embedded={self.embeddings.shape[0] if self.embeddings.size else 0}, "
-                f"with_importance={self.importance.shape[0] if isinstance(self.importance, np.ndarray) else 0}"
+                f"embedded={len(self.index)}, "
+                f"with_importance={len(self._importance)}"
             )
             # reset the counter now that we've processed the batch
             self.added_since_last_update = 0
 
+    def _importance_context(self) -> dict:
+        return {
+            "persona": self.agent.persona,
+            "intent": self.agent.intent,
+            "plan": self.agent.current_plan.content
+            if self.agent.current_plan
+            else None,
+        }
+
+    async def _score_importance_single(self, memory_piece) -> float:
+        request = [
+            {"role": "system", "content": MEMORY_IMPORTANCE_PROMPT},
+            {
+                "role": "user",
+                "content": json.dumps(
+                    {**self._importance_context(), "memory": memory_piece.content}
+                ),
+            },
+        ]
+        response = await async_chat(
+            request, json_mode=True, log=False, priority="importance"
+        )
+        return json.loads(response)["score"]
+
+    async def _score_importance(self, batch: list["MemoryPiece"]) -> list[float]:
+        """
+        Score a batch of memories with a single request, falling back to one
+        request per memory if the response cannot be matched to the batch.
+        """
+        if len(batch) == 1:
+            return [await self._score_importance_single(batch[0])]
+        request = [
+            {"role": "system", "content": MEMORY_IMPORTANCE_BATCH_PROMPT},
+            {
+                "role": "user",
+                "content": json.dumps(
+                    {
+                        **self._importance_context(),
+                        "memories": [
+                            {"id": i, "memory": m.content} for i, m in enumerate(batch)
+                        ],
+                    }
+                ),
+            },
+        ]
+        try:
+            response = await async_chat(
+                request, json_mode=True, log=False, priority="importance"
+            )
+            by_id = {
+                int(item["id"]): float(item["score"])
+                for item in json.loads(response)["scores"]
+            }
+            if sorted(by_id) != list(range(len(batch))):
+                raise ValueError(
+                    f"expected ids 0..{len(batch) - 1}, got {sorted(by_id)}"
+                )
+            return [by_id[i] for i in range(len(batch))]
+        except Exception as e:
+            logger.warning(
+                f"Batched importance scoring failed for {len(batch)} memories ({e}); "
+                "falling back to per-memory requests"
+            )
+            return await asyncio.gather(
+                *[self._score_importance_single(m) for m in batch]
+            )
+
     async def retrieve(
         self,
         query,
@@ -166,61 +290,70 @@ class Memory:
         if trigger_update:
             await self.update()
         async with self.read_lock:
-            results = []
+            recent = []
             if include_recent_observation:
                 # must include the most recent observation
-                results += [
-                    m
-                    for m in self.memories
-                    if m.kind == "observation" and m.timestamp >= self.timestamp - 3
-                ]
+                recent += self.recent_indices("observation", 3)
             if include_recent_action:
                 # must include the most recent action
-                results += [
-                    m
-                    for m in self.memories
-                    if m.kind == "action" and m.timestamp >= self.timestamp - 5
-                ]
+                recent += self.recent_indices("action", 5)
             if include_recent_plan:
-                results += [
-                    m
-                    for m in self.memories
-                    if m.kind == "plan" and m.timestamp >= self.timestamp - 5
-                ]
+                recent += self.recent_indices("plan", 5)
             if include_recent_thought:
-                results += [
-                    m
-                    for m in self.memories
-                    if m.kind == "thought" and m.timestamp >= self.timestamp - 5
-                ]
+                recent += self.recent_indices("thought", 5)
+            results = [self.memories[i] for i in recent]
             # make a copy for read
             # embedding = self.embeddings.copy()
             # importance = self.importance.copy()
             # memories = [m for m in self.memories]
-            if self.embeddings.size == 0:
+            if len(self.index) == 0:
                 if context.api_call_manager.get():
                     context.api_call_manager.get().retrieve_result.append(results)
                 return results
 
-            query_embedding = (await embed_text([query]))[0]
-            similarities = np.dot(self.embeddings, query_embedding)
-            recencies = np.array([m.timestamp - self.timestamp for m in self.memories])
-            recencies = np.exp(recencies)
-            kind_weights = np.array([kind_weight.get(m.kind, 1) for m in self.memories])
-            # print(similarities.size, recencies.size, self.importance.size)
-            smallest_size = min(similarities.size, recencies.size, self.importance.size)
-            scores = (
-                similarities[:smallest_size]
-                + recencies[:smallest_size]
-                + self.importance[:smallest_size]
-            ) * kind_weights[:smallest_size]
-            # scores = (similarities + recencies + self.importance) * kind_weights
-            top_indices = np.argsort(-scores)[:n]
-            results += [self.memories[i] for i in top_indices]
+            query_embedding = np.asarray(
+                (await embed_text([query]))[0], dtype=np.float32
+            )
+            top_indices = self._rank(query_embedding, n, kind_weight)
+            # memories already included as recent are not repeated in the prompt
+            included = set(recent)
+            results += [self.memories[i] for i in top_indices if i not in included]
             if context.api_call_manager.get():
                 context.api_call_manager.get().retrieve_result.append(results)
             return results
 
+    def _rank(self, query_embedding: np.ndarray, n: int, kind_weight: dict) -> np.ndarray:
+        """
+        Indices of the n best memories by (similarity + recency + importance) * kind weight.
+
+        With an ANN index only its candidates plus the memories within RECENCY_HORIZON
+        steps are scored; otherwise every embedded memory is.
+        """
+        size = min(len(self.index), len(self._importance), len(self._timestamps))
+        if size == 0:
+            return np.array([], dtype=np.int64)
+        timestamps = self.timestamps[:size]
+        candidates = self.index.candidates(query_embedding, max(4 * n, 64))
+        if candidates is None:
+            indices = np.arange(size)
+            similarities = self.index.similarities(query_embedding)[:size]
+        else:
+            # memories are appended in timestamp order, so the recent ones are a suffix
+            start = np.searchsorted(
+                timestamps, self.timestamp - RECENCY_HORIZON, side="left"
+            )
+            indices = np.union1d(candidates[candidates < size], np.arange(start, size))
+            similarities = self.index.similarities(query_embedding, indices)
+
+        weights_by_code = np.ones(len(self.kind_codes), dtype=np.float32)
+        for kind, weight in kind_weight.items():
+            if kind in self.kind_codes:
+                weights_by_code[self.kind_codes[kind]] = weight
+        kind_weights = weights_by_code[self.kinds[indices]]
+        recencies = np.exp((timestamps[indices] - self.timestamp).astype(np.float32))
+        scores = (similarities + recencies + self.importance[indices]) * kind_weights
+        return indices[top_k(scores, n)]
+
 
 class MemoryPiece(ABC):
     kind: str
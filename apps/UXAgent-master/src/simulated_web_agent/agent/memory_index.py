@@ -0,0 +1,198 @@
+"""
+Vector indexes behind Memory.retrieve.
+
+ExactIndex scores every stored embedding with one matrix-vector product. HNSWIndex
+keeps an HNSW graph (via the optional `hnswlib` extra) and only returns approximate
+nearest-neighbour candidates, which Memory then re-scores exactly. Select the backend
+with MEMORY_INDEX=exact|hnsw.
+"""
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import hnswlib
+
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+
+class GrowableArray:
+    """
+    Append-only NumPy array with capacity doubling, so appending n rows costs
+    amortized O(n) instead of copying the whole array on every append.
+    `view` returns the filled rows without copying.
+    """
+
+    def __init__(self, dtype, row_shape: tuple = (), capacity: int = 64):
+        self.dtype = np.dtype(dtype)
+        self.row_shape = tuple(row_shape)
+        self._data = np.empty((capacity, *self.row_shape), dtype=self.dtype)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def view(self) -> np.ndarray:
+        return self._data[: self._size]
+
+    def extend(self, values) -> None:
+        values = np.asarray(values, dtype=self.dtype).reshape(-1, *self.row_shape)
+        needed = self._size + values.shape[0]
+        if needed > self._data.shape[0]:
+            capacity = max(needed, 2 * self._data.shape[0])
+            data = np.empty((capacity, *self.row_shape), dtype=self.dtype)
+            data[: self._size] = self._data[: self._size]
+            self._data = data
+        self._data[self._size : needed] = values
+        self._size = needed
+
+    def append(self, value) -> None:
+        self.extend([value])
+
+    def __getstate__(self):
+        # pickle only the filled rows
+        state = self.__dict__.copy()
+        state["_data"] = self.view.copy()
+        return state
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, without a full sort."""
+    if k <= 0 or scores.size == 0:
+        return np.array([], dtype=np.int64)
+    if k >= scores.size:
+        return np.argsort(-scores)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part])]
+
+
+class MemoryIndex(ABC):
+    """Stores memory embeddings in insertion order and answers similarity queries."""
+
+    def __init__(self):
+        # created on the first add(), once the embedding dimension is known
+        self._store: Optional[GrowableArray] = None
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._store is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._store.view
+
+    def __len__(self) -> int:
+        return 0 if self._store is None else len(self._store)
+
+    def add(self, vectors: np.ndarray) -> None:
+        """Append embeddings; row i belongs to the i-th embedded memory."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.size == 0:
+            return
+        if self._store is None:
+            self._store = GrowableArray(np.float32, row_shape=(vectors.shape[1],))
+        start = len(self)
+        self._store.extend(vectors)
+        self._on_add(vectors, start)
+
+    def _on_add(self, vectors: np.ndarray, start: int) -> None:
+        pass
+
+    def similarities(
+        self, query: np.ndarray, indices: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Exact dot-product similarity to all rows, or only to `indices`."""
+        query = np.asarray(query, dtype=np.float32)
+        if indices is None:
+            return self.vectors @ query
+        return self.vectors[indices] @ query
+
+    @abstractmethod
+    def candidates(self, query: np.ndarray, k: int) -> Optional[np.ndarray]:
+        """
+        Indices of (approximately) the k most similar rows, or None when every
+        row should be scored.
+        """
+
+
+class ExactIndex(MemoryIndex):
+    """Brute-force index; every retrieve scores every memory."""
+
+    def candidates(self, query: np.ndarray, k: int) -> Optional[np.ndarray]:
+        return None
+
+
+class HNSWIndex(MemoryIndex):
+    """
+    HNSW graph over inner-product similarity.
+
+    Below `min_size` memories the graph is skipped and all rows are scored, since
+    a matrix-vector product is faster than a graph walk at that size.
+    """
+
+    def __init__(
+        self,
+        m: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        min_size: int = 512,
+    ):
+        super().__init__()
+        if not HNSWLIB_AVAILABLE:
+            raise ImportError("hnswlib is required for HNSWIndex (pip install hnswlib)")
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.min_size = min_size
+        self._graph = None
+
+    def _on_add(self, vectors: np.ndarray, start: int) -> None:
+        if self._graph is None:
+            self._graph = hnswlib.Index(space="ip", dim=vectors.shape[1])
+            self._graph.init_index(
+                max_elements=max(1024, 2 * len(self)),
+                ef_construction=self.ef_construction,
+                M=self.m,
+            )
+        if len(self) > self._graph.get_max_elements():
+            self._graph.resize_index(2 * len(self))
+        self._graph.add_items(vectors, np.arange(start, start + vectors.shape[0]))
+
+    def candidates(self, query: np.ndarray, k: int) -> Optional[np.ndarray]:
+        if self._graph is None or len(self) < self.min_size or k >= len(self):
+            return None
+        self._graph.set_ef(max(self.ef_search, k))
+        labels, _ = self._graph.knn_query(np.asarray(query, dtype=np.float32), k=k)
+        return labels[0].astype(np.int64)
+
+    def __getstate__(self):
+        # The graph is rebuilt from the stored vectors after unpickling
+        state = self.__dict__.copy()
+        state["_graph"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__ = state
+        if len(self) > 0:
+            self._on_add(self.vectors, 0)
+
+
+def create_index(kind: Optional[str] = None) -> MemoryIndex:
+    """Build the index selected by `kind` or the MEMORY_INDEX env var (default exact)."""
+    kind = (kind or os.getenv("MEMORY_INDEX", "exact")).strip().lower()
+    if kind == "hnsw":
+        if HNSWLIB_AVAILABLE:
+            return HNSWIndex()
+        logger.warning(
+            "MEMORY_INDEX=hnsw but hnswlib is not installed; using exact index. "
+            "Install with: pip install 'simulated-web-agent[ann]'"
+        )
+    elif kind != "exact":
+        logger.warning(f"Unknown MEMORY_INDEX '{kind}'; using exact index")
+    return ExactIndex()
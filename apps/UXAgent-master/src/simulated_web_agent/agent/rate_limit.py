@@ -0,0 +1,272 @@
+"""
+Client-side rate limiting for LLM calls.
+
+A RateLimiter keeps a requests-per-minute and a tokens-per-minute bucket plus an
+in-flight cap for every (provider, tier) key. Callers wait for a slot in priority
+order, so the agent's act/plan calls are served before background reflect, wonder
+and importance scoring when a provider limit is tight. When the provider still
+answers 429, the whole key is paused for the server's Retry-After instead of every
+agent retrying on its own schedule.
+
+State is protected by a threading.Lock and waiters poll with asyncio.sleep, so one
+limiter can be shared by agents running on different event loops and threads.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lower value = served first
+PRIORITY_CLASSES = {
+    "act": 0,
+    "plan": 0,
+    "perceive": 1,
+    "feedback": 1,
+    "default": 1,
+    "embed": 1,
+    "reflect": 2,
+    "wonder": 2,
+    "importance": 2,
+}
+
+# Waiters re-check their bucket at most this often
+_MAX_POLL_SECONDS = 0.25
+
+
+def priority_value(priority: Optional[str | int]) -> int:
+    if isinstance(priority, int):
+        return priority
+    return PRIORITY_CLASSES.get(priority or "default", PRIORITY_CLASSES["default"])
+
+
+def estimate_tokens(messages: Any) -> int:
+    """Cheap token estimate (~4 characters per token) used to reserve TPM budget."""
+    if isinstance(messages, str):
+        return len(messages) // 4 + 1
+    if isinstance(messages, list):
+        return sum(estimate_tokens(m) for m in messages)
+    if isinstance(messages, dict):
+        return sum(estimate_tokens(v) for v in messages.values())
+    return 1
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Server back-off hint (Retry-After / retry-after-ms) carried by a provider exception."""
+    value = getattr(exc, "retry_after", None)
+    if value is not None:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            pass
+    headers = getattr(exc, "litellm_response_headers", None)
+    response = getattr(exc, "response", None)
+    if headers is None and response is not None:
+        headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers.get("retry-after-ms")) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        # HTTP-date form of Retry-After is not worth parsing here
+        return None
+    return None
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429 or "RateLimit" in type(exc).__name__
+
+
+def backoff_delay(attempt: int, exc: Optional[BaseException] = None, base: float = 1.0, cap: float = 30.0) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(cap, base * 2**attempt))
+    hint = retry_after_seconds(exc) if exc is not None else None
+    if hint is not None:
+        delay = max(delay, hint + random.uniform(0, 0.25 * hint + 0.1))
+    return delay
+
+
+@dataclass
+class _Bucket:
+    rpm: float
+    tpm: float
+    max_in_flight: int
+    requests: float = 0.0
+    tokens: float = 0.0
+    updated: float = field(default_factory=time.monotonic)
+    paused_until: float = 0.0
+    in_flight: int = 0
+    waiting: dict[int, int] = field(default_factory=dict)
+    # metrics
+    granted: int = 0
+    throttled: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def __post_init__(self):
+        self.requests = self.rpm
+        self.tokens = self.tpm
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        self.updated = now
+        if self.rpm:
+            self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+
+    def blocked_by_priority(self, priority: int) -> bool:
+        return any(n > 0 for p, n in self.waiting.items() if p < priority)
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        """Seconds until this request could be granted, 0 if it can go now."""
+        waits = [self.paused_until - now]
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            waits.append(_MAX_POLL_SECONDS)
+        if self.rpm and self.requests < 1:
+            waits.append((1 - self.requests) * 60 / self.rpm)
+        if self.tpm:
+            # a request larger than the whole bucket goes through once the bucket is full
+            needed = min(tokens, self.tpm)
+            if self.tokens < needed:
+                waits.append((needed - self.tokens) * 60 / self.tpm)
+        return max(0.0, *waits)
+
+
+class RateLimiter:
+    """
+    Per-(provider, tier) RPM/TPM buckets with priority-ordered waiting.
+
+    Limits come from env vars, most specific first:
+        LLM_RPM_<PROVIDER>_<TIER>, LLM_RPM_<PROVIDER>, LLM_RPM   (requests per minute)
+        LLM_TPM_<PROVIDER>_<TIER>, LLM_TPM_<PROVIDER>, LLM_TPM   (tokens per minute)
+        LLM_MAX_IN_FLIGHT_<PROVIDER>..., LLM_MAX_IN_FLIGHT         (concurrent requests)
+    0 or unset means unlimited.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: dict[tuple[str, str], _Bucket] = {}
+
+    @staticmethod
+    def _limit(name: str, provider: str, tier: str) -> float:
+        for key in (
+            f"{name}_{provider}_{tier}".upper(),
+            f"{name}_{provider}".upper(),
+            name,
+        ):
+            value = os.getenv(key)
+            if value:
+                try:
+                    return max(0.0, float(value))
+                except ValueError:
+                    logger.warning(f"Ignoring invalid {key}={value!r}")
+        return 0.0
+
+    def _bucket(self, key: tuple[str, str]) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            provider, tier = key
+            bucket = _Bucket(
+                rpm=self._limit("LLM_RPM", provider, tier),
+                tpm=self._limit("LLM_TPM", provider, tier),
+                max_in_flight=int(self._limit("LLM_MAX_IN_FLIGHT", provider, tier)),
+            )
+            self._buckets[key] = bucket
+        return bucket
+
+    async def acquire(self, key: tuple[str, str], tokens: int, priority: Optional[str | int] = None) -> None:
+        """Wait until a request of `tokens` estimated tokens may be sent for `key`."""
+        prio = priority_value(priority)
+        start = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(key)
+            bucket.waiting[prio] = bucket.waiting.get(prio, 0) + 1
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    bucket.refill(now)
+                    wait = bucket.wait_time(tokens, now)
+                    if wait <= 0 and not bucket.blocked_by_priority(prio):
+                        if bucket.rpm:
+                            bucket.requests -= 1
+                        if bucket.tpm:
+                            bucket.tokens -= tokens
+                        bucket.in_flight += 1
+                        waited = now - start
+                        bucket.granted += 1
+                        bucket.total_wait += waited
+                        bucket.max_wait = max(bucket.max_wait, waited)
+                        if waited > 5:
+                            logger.info(
+                                f"LLM rate limiter: {key} request (priority {prio}) waited {waited:.1f}s"
+                            )
+                        return
+                await asyncio.sleep(min(max(wait, 0.01), _MAX_POLL_SECONDS))
+        finally:
+            with self._lock:
+                bucket.waiting[prio] -= 1
+
+    def release(self, key: tuple[str, str], reserved_tokens: int, used_tokens: Optional[int] = None) -> None:
+        """Finish a request; corrects the TPM reservation once actual usage is known."""
+        with self._lock:
+            bucket = self._bucket(key)
+            bucket.in_flight = max(0, bucket.in_flight - 1)
+            if bucket.tpm and used_tokens is not None:
+                bucket.tokens = min(bucket.tpm, bucket.tokens + reserved_tokens - used_tokens)
+
+    def pause(self, key: tuple[str, str], seconds: float) -> None:
+        """Hold back every request for `key` (e.g. after a 429 with Retry-After)."""
+        with self._lock:
+            bucket = self._bucket(key)
+            bucket.throttled += 1
+            bucket.paused_until = max(bucket.paused_until, time.monotonic() + seconds)
+        logger.warning(f"LLM rate limiter: provider throttled {key}, pausing {seconds:.1f}s")
+
+    @asynccontextmanager
+    async def slot(self, key: tuple[str, str], tokens: int, priority: Optional[str | int] = None):
+        """
+        Hold a request slot for the duration of the block. Set `usage["tokens"]` on
+        the yielded dict to report the actual token count.
+        """
+        await self.acquire(key, tokens, priority)
+        usage: dict[str, Optional[int]] = {"tokens": None}
+        try:
+            yield usage
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.pause(key, retry_after_seconds(e) or backoff_delay(2))
+            raise
+        finally:
+            self.release(key, tokens, usage["tokens"])
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Live per-key metrics: queue depth, in-flight requests, wait times, 429 count."""
+        with self._lock:
+            return {
+                f"{provider}/{tier}": {
+                    "queued": sum(b.waiting.values()),
+                    "queued_by_priority": {p: n for p, n in b.waiting.items() if n},
+                    "in_flight": b.in_flight,
+                    "granted": b.granted,
+                    "throttled": b.throttled,
+                    "avg_wait_ms": int(1000 * b.total_wait / b.granted) if b.granted else 0,
+                    "max_wait_ms": int(1000 * b.max_wait),
+                    "rpm_limit": b.rpm,
+                    "tpm_limit": b.tpm,
+                }
+                for (provider, tier), b in self._buckets.items()
+            }
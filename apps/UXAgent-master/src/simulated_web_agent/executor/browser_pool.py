@@ -0,0 +1,117 @@
+"""
+Pool of warm local Chromium processes shared by concurrent WebAgentEnv instances.
+Each agent gets its own fresh, isolated BrowserContext instead of a new browser.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from omegaconf import DictConfig
+from playwright.async_api import Browser, BrowserContext
+
+from .env import WebAgentEnv
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserPool:
+    """
+    Keeps up to `size` Chromium processes running and hands out new contexts from
+    the least-loaded one. Browsers are launched lazily, so a batch at concurrency N
+    pays for at most N launches no matter how many agents it runs.
+
+    Usage:
+        pool = BrowserPool(cfg.environment, size=8)
+        env = WebAgentEnv(cfg.environment, browser_pool=pool)
+        await env.setup(task_config)  # new context on a warm browser
+        await env.close()             # closes the context, the browser stays up
+        await pool.close()
+    """
+
+    def __init__(
+        self,
+        environment_config: DictConfig,
+        size: int = 4,
+        headless: Optional[bool] = None,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            environment_config: The `environment` section of the config (launch options, cache dir)
+            size: Maximum number of browser processes to keep warm
+            headless: Override for `browser.launch_options.headless`
+        """
+        self.config = environment_config
+        self.size = max(1, size)
+        self.headless = headless
+        self.launch_count = 0
+        self._playwright = None
+        self._browsers: list[Browser] = []
+        self._leases: dict[Browser, int] = {}
+        self._lock = asyncio.Lock()
+
+    async def _launch(self) -> Browser:
+        if self._playwright is None:
+            self._playwright = await WebAgentEnv._ensure_playwright()
+        launch_options = WebAgentEnv.build_launch_options(self.config, self.headless)
+        browser = await self._playwright.chromium.launch(**launch_options)
+        self.launch_count += 1
+        logger.info(
+            f"BrowserPool launched browser {len(self._browsers) + 1}/{self.size} "
+            f"(total launches: {self.launch_count})"
+        )
+        return browser
+
+    async def _acquire_browser(self) -> Browser:
+        async with self._lock:
+            # Drop browsers that crashed or were closed externally
+            for browser in [b for b in self._browsers if not b.is_connected()]:
+                logger.warning("BrowserPool dropping disconnected browser")
+                self._browsers.remove(browser)
+                self._leases.pop(browser, None)
+
+            if len(self._browsers) < self.size:
+                browser = await self._launch()
+                self._browsers.append(browser)
+                self._leases[browser] = 0
+            else:
+                browser = min(self._browsers, key=lambda b: self._leases[b])
+            self._leases[browser] += 1
+            return browser
+
+    def _release(self, browser: Browser) -> None:
+        if browser in self._leases:
+            self._leases[browser] = max(0, self._leases[browser] - 1)
+
+    async def new_context(self, **context_options) -> BrowserContext:
+        """
+        Create a fresh isolated context on a pooled browser.
+
+        The lease is returned to the pool when the context closes, so callers only
+        need to close the context. Init scripts and tracing are applied per context
+        by WebAgentEnv.setup().
+        """
+        browser = await self._acquire_browser()
+        try:
+            context = await browser.new_context(**context_options)
+        except Exception:
+            self._release(browser)
+            raise
+        context.on("close", lambda _: self._release(browser))
+        return context
+
+    async def close(self) -> None:
+        """Close all pooled browsers and release the shared Playwright driver."""
+        async with self._lock:
+            for browser in self._browsers:
+                try:
+                    await browser.close()
+                except Exception as e:
+                    logger.warning(f"BrowserPool failed to close browser: {e}")
+            self._browsers = []
+            self._leases = {}
+            if self._playwright is not None:
+                await WebAgentEnv._cleanup_playwright()
+                self._playwright = None
+        logger.info(f"BrowserPool closed after {self.launch_count} browser launch(es)")
@@ -0,0 +1,138 @@
+"""
+Structural diff between two parser.js outputs.
+
+The simplified HTML is split into blocks: every outermost element carrying a
+parser-semantic-id is one block keyed by that id, and text outside such elements is
+grouped into blocks keyed by its content. Comparing the block maps of two
+observations yields the regions that were added, changed or removed, which is what
+the agent needs to re-perceive a page that did not navigate. dom_hash() identifies a
+page state whose perception can be reused outright.
+"""
+import hashlib
+import re
+from dataclasses import dataclass, field
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+SEMANTIC_ID_ATTR = "parser-semantic-id"
+# Attributes that change without any visible change to the page
+VOLATILE_ATTRS = ("parser-selection-start", "parser-selection-end", "parser-is-focused")
+_START_TAG_RE = re.compile(
+    r"<([A-Za-z][\w:-]*)((?:\s+[^\s=>/]+(?:\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s>]*))?)*)\s*(/?)>"
+)
+_ATTR_RE = re.compile(r"([^\s=>/]+)(?:\s*=\s*(\"[^\"]*\"|'[^']*'|[^\s>]*))?")
+_BETWEEN_TAGS_RE = re.compile(r">\s+<")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@dataclass
+class DomDelta:
+    added: dict[str, str] = field(default_factory=dict)
+    changed: dict[str, str] = field(default_factory=dict)
+    removed: list[str] = field(default_factory=list)
+    unchanged: int = 0
+    # size of added + changed fragments relative to the full current page
+    ratio: float = 0.0
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.changed or self.removed)
+
+    def to_prompt(self) -> dict:
+        """Compact representation sent to the perceive prompt."""
+        return {
+            "added": list(self.added.values()),
+            "changed": list(self.changed.values()),
+            "removed_ids": self.removed,
+            "unchanged_regions": self.unchanged,
+        }
+
+
+def _normalize_start_tag(match: re.Match) -> str:
+    attrs = sorted(
+        (name, value)
+        for name, value in _ATTR_RE.findall(match.group(2))
+        if name not in VOLATILE_ATTRS
+    )
+    rendered = "".join(f" {name}={value}" if value else f" {name}" for name, value in attrs)
+    return f"<{match.group(1)}{rendered}{match.group(3)}>"
+
+
+def dom_hash(html: str) -> str:
+    """
+    Hash of the simplified HTML with volatile attributes dropped, the remaining
+    attributes sorted and insignificant whitespace removed, so a page that only
+    differs by focus or caret position, attribute order or re-rendered
+    whitespace hashes the same.
+    """
+    normalized = _START_TAG_RE.sub(_normalize_start_tag, html or "")
+    normalized = _BETWEEN_TAGS_RE.sub("><", normalized)
+    normalized = _WHITESPACE_RE.sub(" ", normalized).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _fragment(tag: Tag) -> str:
+    for attr in VOLATILE_ATTRS:
+        for el in [tag, *tag.find_all(attrs={attr: True})]:
+            if attr in el.attrs:
+                del el.attrs[attr]
+    return str(tag)
+
+
+def segment(html: str) -> dict[str, str]:
+    """Map block key -> HTML fragment, in document order."""
+    soup = BeautifulSoup(html or "", "html.parser")
+    blocks: dict[str, str] = {}
+    text_run: list[str] = []
+
+    def flush_text():
+        if text_run:
+            text = " ".join(text_run)
+            key = "text:" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+            # identical text blocks get an occurrence suffix
+            n = 1
+            while (key if n == 1 else f"{key}#{n}") in blocks:
+                n += 1
+            blocks[key if n == 1 else f"{key}#{n}"] = text
+            text_run.clear()
+
+    def walk(node):
+        for child in node.children:
+            if isinstance(child, NavigableString):
+                text = child.strip()
+                if text:
+                    text_run.append(text)
+            elif isinstance(child, Tag):
+                semantic_id = child.get(SEMANTIC_ID_ATTR)
+                if semantic_id:
+                    flush_text()
+                    blocks[semantic_id] = _fragment(child)
+                else:
+                    walk(child)
+
+    walk(soup)
+    flush_text()
+    return blocks
+
+
+def diff(previous_html: str, current_html: str) -> DomDelta:
+    """Blocks added, changed and removed going from `previous_html` to `current_html`."""
+    previous = segment(previous_html)
+    current = segment(current_html)
+    delta = DomDelta()
+    for key, fragment in current.items():
+        if key not in previous:
+            delta.added[key] = fragment
+        elif previous[key] != fragment:
+            delta.changed[key] = fragment
+        else:
+            delta.unchanged += 1
+    # removed text blocks are implied by added/changed ones; only report ids
+    delta.removed = [
+        key for key in previous if key not in current and not key.startswith("text:")
+    ]
+    changed_size = sum(len(f) for f in delta.added.values()) + sum(
+        len(f) for f in delta.changed.values()
+    )
+    delta.ratio = changed_size / max(1, len(current_html or ""))
+    return delta
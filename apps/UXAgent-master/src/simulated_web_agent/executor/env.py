@@ -1,23 +1,83 @@
 import asyncio
 import base64
 import contextlib
+import hashlib
 import inspect
 import logging
 import os
+import re
 import time
 import uuid
 from pathlib import Path
 from typing import Any, Awaitable, Callable, ClassVar, Optional, TYPE_CHECKING
+from urllib.parse import urlparse
 
 import numpy
 from omegaconf import DictConfig, OmegaConf
 from playwright.async_api import Playwright, async_playwright
 from playwright._impl._errors import TargetClosedError
 
+from .page_settle import PageSettleDetector, settle_options
+from .request_policy import RequestPolicy
+
+HAR_MODES = ("off", "record", "replay")
+
+
+def har_path_for(har_dir: str | Path, url: str) -> Path:
+    """One HAR file per start_url: readable host/path slug plus a hash of the full URL."""
+    parsed = urlparse(url)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", f"{parsed.hostname or ''}{parsed.path}").strip("-")
+    digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:10]
+    return Path(har_dir) / f"{slug[:80] or 'page'}-{digest}.har"
+
+
 if TYPE_CHECKING:
+    from .browser_pool import BrowserPool
     from .browserbase_connector import BrowserBaseConnector
 
 
+# Pacing profiles selected by `environment.pacing`.
+# - cinematic: highlight overlays, smooth scrolling and human-like pauses (for recordings)
+# - human: human-like pauses without the visual highlight effects
+# - fast: only the waits that matter for correctness; observation() still waits for the page to settle
+# "auto" resolves to "fast" for headless runs without recording and to "cinematic" otherwise.
+PACING_PROFILES: dict[str, dict[str, Any]] = {
+    "cinematic": {
+        "highlight": True,
+        "scroll_behavior": "smooth",
+        "scroll_settle": 1.0,
+        "highlight_shrink_ms": 2000,
+        "action_sleep_scale": 1.0,
+        "scroll_delay": 0.3,
+        "key_delay": 0.1,
+        "dwell": True,
+        "sleep_after_action": True,
+    },
+    "human": {
+        "highlight": False,
+        "scroll_behavior": "smooth",
+        "scroll_settle": 1.0,
+        "highlight_shrink_ms": 0,
+        "action_sleep_scale": 1.0,
+        "scroll_delay": 0.3,
+        "key_delay": 0.1,
+        "dwell": True,
+        "sleep_after_action": True,
+    },
+    "fast": {
+        "highlight": False,
+        "scroll_behavior": "instant",
+        "scroll_settle": 0,
+        "highlight_shrink_ms": 0,
+        "action_sleep_scale": 0,
+        "scroll_delay": 0,
+        "key_delay": 0,
+        "dwell": False,
+        "sleep_after_action": False,
+    },
+}
+
+
 class ElementHighlight:
     """
     Context manager for highlighting elements using overlay instead of modifying target element.
@@ -40,6 +100,7 @@ class ElementHighlight:
         self.before_hook = before_hook
         self.after_hook = after_hook
         self.center = center
+        self.pacing = self.env.pacing_profile
         self.logger = logging.getLogger(__name__)
 
         # Get headless mode from environment config
@@ -93,8 +154,8 @@ class ElementHighlight:
                         f'Element with parser-semantic-id="{self.semantic_id}" not found, skipping highlight'
                     )
                 else:
-                    # Scroll element into view with smooth behavior
-                    if self.center:
+                    # Scroll element into view (smooth unless the pacing profile says otherwise)
+                    if self.center and self.pacing["scroll_behavior"] == "smooth":
                         await self.page.evaluate(
                             """(sel) => {
                             const el = document.querySelector(sel);
@@ -105,10 +166,20 @@ class ElementHighlight:
                         }""",
                             selector,
                         )
+                    elif self.center:
+                        await self.page.evaluate(
+                            """(sel) => {
+                            const el = document.querySelector(sel);
+                            if (el) el.scrollIntoView({behavior: "instant", block: "center", inline: "center"});
+                        }""",
+                            selector,
+                        )
                     else:
                         await locator.scroll_into_view_if_needed(timeout=2000)
-                    await asyncio.sleep(1)
+                    if self.pacing["scroll_settle"] > 0:
+                        await asyncio.sleep(self.pacing["scroll_settle"])
 
+                if count > 0 and self.pacing["highlight"]:
                     # Create dual overlay highlight - inner (exact) and outer (with gap)
                     await self.page.evaluate(
                         """(sel) => {
@@ -171,9 +242,10 @@ class ElementHighlight:
 
                     self.logger.info("Element highlight applied")
 
-            # Always sleep (whether we have a target or not)
-            if self.sleep_duration > 0:
-                await asyncio.sleep(self.sleep_duration)
+            # Always sleep (whether we have a target or not), scaled by the pacing profile
+            sleep_duration = self.sleep_duration * self.pacing["action_sleep_scale"]
+            if sleep_duration > 0:
+                await asyncio.sleep(sleep_duration)
 
             # Run before hook if provided and we have a target element
             if self.before_hook and self.semantic_id:
@@ -192,8 +264,19 @@ class ElementHighlight:
                     self.env.before_action_hook()
 
             # Run this after the first snippet
-            await self.page.evaluate(
-                """() => {
+            if self.pacing["highlight_shrink_ms"] > 0:
+                await self._shrink_highlight(self.pacing["highlight_shrink_ms"])
+
+        except Exception as e:
+            self.logger.error(f"Failed to apply element highlight: {e}")
+            # Continue without highlighting rather than failing
+
+        return self
+
+    async def _shrink_highlight(self, duration_ms: int) -> None:
+        """Animate the outer highlight box onto the element and wait for the transition to end."""
+        await self.page.evaluate(
+            """(durationMs) => {
                 const refs = document.highlightedElements;
                 if (!refs || refs.length < 2) return Promise.resolve();
 
@@ -205,15 +288,10 @@ class ElementHighlight:
                 const tWidth = parseFloat(innerDiv.style.width || '0');
                 const tHeight = parseFloat(innerDiv.style.height || '0');
 
-                // Prepare CSS transition for a smooth 2s shrink
+                // Prepare CSS transition for a smooth shrink
                 outerDiv.style.transition = [
-                    'top 2000ms ease',
-                    'left 2000ms ease',
-                    'width 2000ms ease',
-                    'height 2000ms ease',
-                    'outline-width 2000ms ease',
-                    'outline-color 2000ms ease'
-                ].join(', ');
+                    'top', 'left', 'width', 'height', 'outline-width', 'outline-color'
+                ].map(prop => `${prop} ${durationMs}ms ease`).join(', ');
                 outerDiv.style.willChange = 'top,left,width,height,outline-width,outline-color';
 
                 // Force reflow so transition reliably applies
@@ -236,14 +314,9 @@ class ElementHighlight:
                     outerDiv.addEventListener('transitionend', handler);
                 });
             }
-            """
-            )
-
-        except Exception as e:
-            self.logger.error(f"Failed to apply element highlight: {e}")
-            # Continue without highlighting rather than failing
-
-        return self
+            """,
+            duration_ms,
+        )
 
     async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any):
         try:
@@ -312,8 +385,10 @@ class WebAgentEnv:
         after_action_hook: Callable[[], None] = None,
         wait_hook: Callable[[], None] = None,
         browser_mode: str | None = None,  # "local" or "browserbase"
+        browser_pool: Optional["BrowserPool"] = None,
     ):
         self.config = environment_config
+        self.browser_pool = browser_pool  # shared warm browsers (local mode only)
         self.before_action_hook = before_action_hook
         self.after_action_hook = after_action_hook
         self.wait_hook = wait_hook
@@ -322,6 +397,13 @@ class WebAgentEnv:
         self.context = None
         self.page = None  # current active page
         # note: pages are managed by self.context.pages
+        self._settle_detectors: dict[Any, PageSettleDetector] = {}
+        # blocks trackers/fonts/media (and images in text mode), see setup()
+        self.request_policy: RequestPolicy | None = None
+        # (recording path, final path) of a HAR being recorded, see _setup_har()
+        self._har_recording: tuple[Path, Path] | None = None
+        # (page, DOM stamp, html) of the last page.content() call, see raw_html()
+        self._raw_html_cache: tuple[Any, dict, str] | None = None
         self.uuid = (
             environment_config.uuid
             if hasattr(environment_config, "uuid")
@@ -344,6 +426,45 @@ class WebAgentEnv:
                 "Recording is enabled - evaluation disabled to avoid interference"
             )
 
+    @property
+    def pacing_profile(self) -> dict[str, Any]:
+        """Resolve `environment.pacing` to one of PACING_PROFILES."""
+        pacing = str(self.config.get("pacing", None) or "cinematic").lower()
+        if pacing == "auto":
+            try:
+                headless = bool(self.config.browser.launch_options.headless)
+            except Exception:
+                headless = False
+            recording = bool(getattr(self.config, "recording", {}).get("enabled", False))
+            pacing = "fast" if headless and not recording else "cinematic"
+        if pacing not in PACING_PROFILES:
+            self.logger.warning(f"Unknown pacing profile '{pacing}', using 'cinematic'")
+            pacing = "cinematic"
+        return PACING_PROFILES[pacing]
+
+    @staticmethod
+    def build_launch_options(
+        config: DictConfig, headless: Optional[bool] = None
+    ) -> dict[str, Any]:
+        """Build Chromium launch options from the environment config."""
+        logger = logging.getLogger(__name__)
+        # Get launch options from config and convert to dict
+        launch_options = OmegaConf.to_container(
+            config.browser.launch_options, resolve=True
+        )
+        if headless is not None:
+            launch_options["headless"] = bool(headless)
+
+        # Add cache directory if configured
+        if hasattr(config.browser, "cache_dir") and config.browser.cache_dir:
+            # Use absolute path for cache directory
+            cache_dir = Path(config.browser.cache_dir).resolve()
+            cache_dir.mkdir(parents=True, exist_ok=True)  # Ensure directory exists
+            cache_arg = f"--disk-cache-dir={cache_dir}"
+            launch_options["args"] = launch_options.get("args", []) + [cache_arg]
+            logger.info(f"Browser cache configured: {cache_arg}")
+        return launch_options
+
     @classmethod
     async def _ensure_playwright(cls) -> Playwright:
         """Ensure shared Playwright instance exists and return it"""
@@ -388,6 +509,63 @@ class WebAgentEnv:
             finally:
                 self.trace_file_path = None
 
+    async def _setup_har(self, start_url: Optional[str]) -> None:
+        """
+        Record the site to, or replay it from, a HAR file per start_url (`browser.har`).
+
+        record: responses are saved while browsing and written when the context closes.
+        replay: every request is served from the HAR; unmatched requests are aborted
+        (not_found: abort, for network-free runs) or sent to the network (fallback).
+        """
+        har_config = self.config.browser.get("har", None) or {}
+        mode = str(har_config.get("mode", "off") or "off").lower()
+        if mode not in HAR_MODES:
+            self.logger.warning(f"Unknown HAR mode '{mode}', HAR record/replay disabled")
+            return
+        if mode == "off":
+            return
+        if not start_url:
+            self.logger.warning(f"HAR {mode} needs a start_url; HAR record/replay disabled")
+            return
+
+        har_path = har_path_for(har_config.get("dir", None) or "./har", start_url)
+        url_filter = har_config.get("url", None)
+        if mode == "record":
+            har_path.parent.mkdir(parents=True, exist_ok=True)
+            # concurrent recordings of the same site each write their own file, the
+            # last one to close replaces the HAR (see _save_har())
+            recording_path = har_path.with_name(f"{har_path.stem}.{self.uuid}.recording.har")
+            await self.context.route_from_har(
+                recording_path,
+                url=url_filter,
+                update=True,
+                update_content="embed",
+                update_mode="minimal",
+            )
+            self._har_recording = (recording_path, har_path)
+            self.logger.info(f"Recording HAR for {start_url} to {har_path}")
+        else:
+            if not har_path.exists():
+                raise FileNotFoundError(
+                    f"No HAR recorded for {start_url} (expected {har_path}); "
+                    f"run once with browser.har.mode=record"
+                )
+            not_found = str(har_config.get("not_found", "abort") or "abort")
+            await self.context.route_from_har(har_path, url=url_filter, not_found=not_found)
+            self.logger.info(f"Replaying {start_url} from {har_path} (not found: {not_found})")
+
+    def _save_har(self) -> None:
+        """Move a recorded HAR into place; Playwright writes it when the context closes."""
+        if not self._har_recording:
+            return
+        recording_path, har_path = self._har_recording
+        self._har_recording = None
+        if recording_path.exists():
+            os.replace(recording_path, har_path)
+            self.logger.info(f"HAR saved to: {har_path}")
+        else:
+            self.logger.warning(f"HAR recording was not written: {recording_path}")
+
     async def _start_recording(self) -> None:
         """Start screen recording using QuickRecorder"""
         try:
@@ -501,28 +679,14 @@ class WebAgentEnv:
         # LOCAL MODE: Launch local Chromium browser
         # =====================================================================
         else:
-            # Get launch options from config and convert to dict
-            launch_options = OmegaConf.to_container(
-                self.config.browser.launch_options, resolve=True
-            )
-
             if headless is not None:
-                # update both the runtime options AND the config object,
-                # so other code (like highlight_element's "respect_headless") reads the same value.
-                launch_options["headless"] = bool(headless)
+                # update the config object so other code (like highlight_element's
+                # "respect_headless") reads the same value as the launch options.
                 try:
                     self.config.browser.launch_options.headless = bool(headless)
                 except Exception:
                     pass
-
-            # Add cache directory if configured
-            if hasattr(self.config.browser, "cache_dir") and self.config.browser.cache_dir:
-                # Use absolute path for cache directory
-                cache_dir = Path(self.config.browser.cache_dir).resolve()
-                cache_dir.mkdir(parents=True, exist_ok=True)  # Ensure directory exists
-                cache_arg = f"--disk-cache-dir={cache_dir}"
-                launch_options["args"] = launch_options.get("args", []) + [cache_arg]
-                self.logger.info(f"Browser cache configured: {cache_arg}")
+            launch_options = self.build_launch_options(self.config, headless)
 
             # Get context options from config and convert to dict
             context_options = OmegaConf.to_container(
@@ -557,6 +721,9 @@ class WebAgentEnv:
                 self.logger.info(
                     f"Using persistent context with cache in user data dir: {user_data_dir}"
                 )
+            elif self.browser_pool is not None:
+                # Fresh isolated context on a warm browser; the pool owns the browser process
+                self.context = await self.browser_pool.new_context(**context_options)
             else:
                 # Regular launch without persistent context
                 self.browser = await self.context_manager.chromium.launch(**launch_options)
@@ -568,6 +735,18 @@ class WebAgentEnv:
         # Set default timeout for all locator actions
         self.context.set_default_timeout(self.config.browser.timeouts.default)
 
+        start_url = (self.task_config or {}).get("start_url")
+
+        # HAR record/replay; routed before the request policy so blocked requests never reach it
+        await self._setup_har(start_url)
+
+        # Request interception; installed before any page exists so the first load is covered
+        self.request_policy = RequestPolicy.from_config(
+            self.config.browser.get("request_policy", None), start_url
+        )
+        if self.request_policy is not None:
+            await self.request_policy.install(self.context)
+
         # Add init script if it exists
         init_script_path = Path(self.config.init_script_path)
         if init_script_path.exists():
@@ -576,6 +755,15 @@ class WebAgentEnv:
         else:
             self.logger.warning(f"Init script not found: {init_script_path}")
 
+        # Persistent incremental parser; parser.js delegates to it when installed
+        if self.config.get("incremental_parser", False):
+            incremental_parser_path = Path(self.config.incremental_parser_path)
+            if incremental_parser_path.exists():
+                with open(incremental_parser_path) as f:
+                    await self.context.add_init_script(f.read())
+            else:
+                self.logger.warning(f"Incremental parser not found: {incremental_parser_path}")
+
         # Create initial page (or use existing one from persistent context)
         if self.context.pages:
             # Use existing page from persistent context
@@ -841,8 +1029,11 @@ class WebAgentEnv:
                 self.logger.error(f"Unknown action: {action_name}")
                 raise ValueError(f"Unknown action: {action_name}")
 
-            # Sleep after action if configured
-            if self.config.browser.sleep_after_action > 0:
+            # Sleep after action if configured (observation() below still waits for the page to settle)
+            if (
+                self.pacing_profile["sleep_after_action"]
+                and self.config.browser.sleep_after_action > 0
+            ):
                 await asyncio.sleep(self.config.browser.sleep_after_action)
 
             # Return the next observation after executing the action
@@ -1006,10 +1197,15 @@ class WebAgentEnv:
         elif direction == "left":
             scroll_x = -amount
             
-        await self.page.evaluate(f"window.scrollBy({scroll_x}, {scroll_y})")
-        
-        # Small delay to let the scroll complete
-        await asyncio.sleep(0.3)
+        pacing = self.pacing_profile
+        await self.page.evaluate(
+            "([left, top, behavior]) => window.scrollBy({left, top, behavior})",
+            [scroll_x, scroll_y, "instant" if pacing["scroll_behavior"] == "instant" else "auto"],
+        )
+
+        # Small delay to let the scroll complete (instant scrolls are applied synchronously)
+        if pacing["scroll_delay"] > 0:
+            await asyncio.sleep(pacing["scroll_delay"])
 
         self.logger.info(f"Scrolled the page {direction} by {amount}px")
 
@@ -1198,7 +1394,9 @@ class WebAgentEnv:
             except Exception:
                 pass  # Continue even if element not found
         
-        await asyncio.sleep(duration_ms / 1000)
+        # Dwell time is purely cosmetic, so the fast pacing profile skips it
+        if self.pacing_profile["dwell"]:
+            await asyncio.sleep(duration_ms / 1000)
         self.logger.info(f"Simulated reading for {duration_ms}ms" + 
                         (f" on element: {semantic_id}" if semantic_id else ""))
 
@@ -1216,9 +1414,11 @@ class WebAgentEnv:
         """
         times = max(1, min(20, times))  # Limit to reasonable range
         
+        key_delay = self.pacing_profile["key_delay"]
         for i in range(times):
             await self.page.keyboard.press("Tab")
-            await asyncio.sleep(0.1)  # Small delay between tabs
+            if key_delay > 0:
+                await asyncio.sleep(key_delay)  # Small delay between tabs
         
         # Get currently focused element info
         focused_info = await self.page.evaluate("""
@@ -1250,9 +1450,11 @@ class WebAgentEnv:
         """
         times = max(1, min(20, times))
         
+        key_delay = self.pacing_profile["key_delay"]
         for i in range(times):
             await self.page.keyboard.press("Shift+Tab")
-            await asyncio.sleep(0.1)
+            if key_delay > 0:
+                await asyncio.sleep(key_delay)
         
         focused_info = await self.page.evaluate("""
             () => {
@@ -1412,10 +1614,38 @@ class WebAgentEnv:
                 self.logger.warning(f"Custom network idle fallback check failed: {e}")
                 break
 
+    async def _wait_for_page_settle(self) -> dict | None:
+        """
+        Wait until network and DOM are quiet using the page's PageSettleDetector.
+        Returns the settle timing, or None when `browser.settle` is disabled for this site.
+        """
+        options = settle_options(self.config.browser.get("settle", None), self.page.url)
+        if not options["enabled"]:
+            return None
+        page = self.page
+        detector = self._settle_detectors.get(page)
+        if detector is None:
+            detector = PageSettleDetector(page)
+            await detector.attach()
+            self._settle_detectors[page] = detector
+            page.on("close", lambda _: self._settle_detectors.pop(page, None))
+        timing = await detector.wait(
+            int(options["idle_ms"]),
+            int(options["timeout_ms"]),
+            int(options["max_request_ms"]),
+        )
+        if timing["settled"]:
+            self.logger.info(f"Page settled in {timing['settle_ms']}ms ({timing['detector']})")
+        else:
+            self.logger.info(f"Page did not settle within {options['timeout_ms']}ms")
+        return timing
+
     async def observation(self):
         """Get parsed page content using the parser script"""
         parser_script_path = Path(self.config.parser_script_path)
         content = {}
+        settle_timing = None
+        wait_start = time.monotonic()
 
         # Wait for page to be fully loaded and stable
         try:
@@ -1425,22 +1655,24 @@ class WebAgentEnv:
                 timeout=self.config.browser.timeouts.page_load_domcontent,
             )
 
-            # Use both original networkidle (for page loads) and custom detection (for XHR/fetch)
-            try:
-                # First wait for Playwright's networkidle (handles initial page loads well)
-                await self.page.wait_for_load_state(
-                    "networkidle",
-                    timeout=self.config.browser.timeouts.page_load_networkidle,
-                )  # Shorter timeout
-                self.logger.info("Playwright networkidle detected")
-            except Exception as e:
-                self.logger.info(f"Playwright networkidle timeout (normal): {e}")
+            settle_timing = await self._wait_for_page_settle()
+            if settle_timing is None:
+                # Legacy waits: Playwright networkidle (page loads) + custom detection (XHR/fetch)
+                try:
+                    # First wait for Playwright's networkidle (handles initial page loads well)
+                    await self.page.wait_for_load_state(
+                        "networkidle",
+                        timeout=self.config.browser.timeouts.page_load_networkidle,
+                    )  # Shorter timeout
+                    self.logger.info("Playwright networkidle detected")
+                except Exception as e:
+                    self.logger.info(f"Playwright networkidle timeout (normal): {e}")
 
-            # Then wait for custom network idle detection (handles XHR/fetch after interactions)
-            await self._wait_for_custom_network_idle(
-                timeout_ms=self.config.browser.timeouts.page_load_networkidle,
-                idle_time_ms=self.config.browser.timeouts.custom_network_idle,
-            )
+                # Then wait for custom network idle detection (handles XHR/fetch after interactions)
+                await self._wait_for_custom_network_idle(
+                    timeout_ms=self.config.browser.timeouts.page_load_networkidle,
+                    idle_time_ms=self.config.browser.timeouts.custom_network_idle,
+                )
             if self.wait_hook:
                 await self.wait_hook(self.page)
 
@@ -1453,42 +1685,70 @@ class WebAgentEnv:
             await self.page.wait_for_selector(
                 "body", timeout=self.config.browser.timeouts.element_wait
             )
-            # Wait a bit for JavaScript frameworks (React, Vue, etc.) to render
-            await asyncio.sleep(1)
+            if settle_timing is None:
+                # Wait a bit for JavaScript frameworks (React, Vue, etc.) to render;
+                # the settle detector already waited for the DOM to be quiet
+                await asyncio.sleep(1)
         except Exception as e:
             self.logger.warning(f"Body element not found: {e}")
+        wait_ms = int((time.monotonic() - wait_start) * 1000)
         
-        # Debug: Log raw HTML length before parsing
-        raw_html = await self.page.content()
-        self.logger.info(f"Raw HTML length before parsing: {len(raw_html)}")
-        if len(raw_html) < 500:
-            self.logger.warning(f"Page appears empty. Raw HTML: {raw_html[:200]}")
-
+        # Stamp the DOM state before parsing; any later mutation marks this observation stale
+        dom_version = await self._dom_version()
 
         if parser_script_path.exists():
             with open(parser_script_path) as f:
                 parser_code = f.read()
             try:
                 content = await self.page.evaluate(parser_code)
-                # Check if parser returned too little content (likely visibility filtering issue)
+                # Check if parser returned too little content (likely visibility filtering issue).
+                # The parser's size stats tell whether the page itself has content without
+                # serializing the whole DOM.
                 parsed_html_len = len(content.get("html", ""))
-                if parsed_html_len < 100 and len(raw_html) > 500:
-                    self.logger.warning(
-                        f"Parser returned only {parsed_html_len} chars but raw HTML is {len(raw_html)} chars. "
-                        "Using raw HTML fallback."
+                stats = content.get("stats") or {}
+                self.logger.info(
+                    f"Parsed HTML length: {parsed_html_len} "
+                    f"(page: {stats.get('elementCount')} elements, {stats.get('textLength')} text chars)"
+                )
+                if content.get("parser"):
+                    parser_info = content["parser"]
+                    self.logger.info(
+                        f"Incremental parse v{parser_info.get('version')}: "
+                        f"{parser_info.get('stripped')} elements stripped, "
+                        f"{parser_info.get('reused')} subtrees reused"
                     )
-                    content["html"] = raw_html
+                if parsed_html_len < 100 and self._page_has_content(stats):
+                    raw_html = await self.raw_html(dom_version)
+                    if len(raw_html) > 500:
+                        self.logger.warning(
+                            f"Parser returned only {parsed_html_len} chars but raw HTML is {len(raw_html)} chars. "
+                            "Using raw HTML fallback."
+                        )
+                        content["html"] = raw_html
             except Exception as e:
                 self.logger.error(f"Parser script failed: {e}")
                 # Fallback to basic HTML content
-                content = {"html": raw_html}
+                content = {"html": await self.raw_html(dom_version)}
         else:
             self.logger.warning(f"Parser script not found: {parser_script_path}")
-            content = {"html": raw_html}
+            content = {"html": await self.raw_html(dom_version)}
+        if len(content.get("html", "")) < 100:
+            self.logger.warning(f"Page appears empty. HTML: {content.get('html', '')[:200]}")
 
         # Add tabs information to the observation
         content["tabs"] = await self._get_tabs_info()
 
+        # Add DOM version stamp for is_observation_current()
+        content["dom_version"] = dom_version
+
+        # How long the observation waited for the page to settle
+        content["timing"] = {
+            **(settle_timing or {"detector": "legacy", "settled": None}),
+            "wait_ms": wait_ms,
+        }
+        if self.request_policy is not None:
+            content["timing"]["requests"] = self.request_policy.take_counts()
+
         # Add model answer if available
         content["model_answer"] = self.model_answer
 
@@ -1509,12 +1769,93 @@ class WebAgentEnv:
 
         return content
 
+    @staticmethod
+    def _page_has_content(stats: dict) -> bool:
+        """Whether parser.js size stats describe a non-trivial page (unknown counts as yes)."""
+        if not stats:
+            return True
+        return (stats.get("elementCount") or 0) > 20 or (stats.get("textLength") or 0) > 200
+
+    async def raw_html(self, dom_version: dict | None = None) -> str:
+        """
+        The serialized DOM of the current page (page.content()).
+
+        Serializing a large page is expensive, so the result is cached against the DOM
+        stamp: within a step, the parser fallback and raw-HTML archiving share one
+        page.content() call. Pass the stamp read at observation time to skip re-reading it.
+        """
+        if dom_version is None:
+            dom_version = await self._dom_version()
+        cached = self._raw_html_cache
+        if (
+            dom_version is not None
+            and cached is not None
+            and cached[0] is self.page
+            and cached[1] == dom_version
+        ):
+            return cached[2]
+        html = await self.page.content()
+        self._raw_html_cache = (self.page, dom_version, html) if dom_version else None
+        return html
+
+    async def parser_changes(self, since_version: int) -> dict | None:
+        """
+        Fragments of semantic-id elements that changed after incremental parse
+        `since_version` (see observation()["parser"]["version"]), as
+        {"version", "full", "changed": {id: html}, "removed": [ids]}. "full" is True
+        when the version is too old and a full observation() is needed. Returns None
+        when the incremental parser is not installed.
+        """
+        try:
+            return await self.page.evaluate(
+                "(since) => window.__parser ? window.__parser.changesSince(since) : null",
+                since_version,
+            )
+        except Exception as e:
+            self.logger.debug(f"Incremental parser changes unavailable: {e}")
+            return None
+
+    async def _dom_version(self) -> dict | None:
+        """Read the DOM mutation stamp maintained by initscript.js, or None if unavailable."""
+        try:
+            return await self.page.evaluate(
+                "() => window.__domMutations ? window.__domMutations.version() : null"
+            )
+        except Exception as e:
+            self.logger.debug(f"DOM version check failed: {e}")
+            return None
+
+    async def is_observation_current(self, observation: dict | None) -> bool:
+        """
+        Cheap staleness check for an observation previously returned by observation() or step().
+
+        Compares the observation's DOM stamp (document id, mutation count, URL) against the
+        live page. Returns False whenever the stamp is missing or cannot be read, so callers
+        can safely fall back to a fresh observation().
+
+        Example:
+            obs = await env.step(action)
+            if not await env.is_observation_current(obs):
+                obs = await env.observation()
+        """
+        if not observation or not observation.get("dom_version") or not self.page:
+            return False
+        current = await self._dom_version()
+        return current is not None and current == observation["dom_version"]
+
     async def close(self):
         """Clean up pages/contexts/browsers deterministically, then shrink PW refcount."""
         # 1) Stop tracing/recording scoped to this context
         with contextlib.suppress(Exception):
             await self._stop_tracing()
 
+        if self.request_policy is not None and self.request_policy.total_blocked:
+            self.logger.info(
+                f"Request policy '{self.request_policy.profile}' blocked "
+                f"{sum(self.request_policy.total_blocked.values())} requests: "
+                f"{dict(self.request_policy.total_blocked)}"
+            )
+
         # 2) Close per-env resources (these are always safe to close)
         with contextlib.suppress(Exception):
             if self.page:
@@ -1522,8 +1863,11 @@ class WebAgentEnv:
         with contextlib.suppress(Exception):
             if self.context:
                 await self.context.close()
+        with contextlib.suppress(Exception):
+            self._save_har()
 
-        # 3) Close this env's browser (you launch a new browser per env in setup)
+        # 3) Close this env's browser (you launch a new browser per env in setup;
+        #    pooled envs leave self.browser unset so the warm browser stays up)
         with contextlib.suppress(Exception):
             if self.browser:
                 await self.browser.close()
@@ -0,0 +1,224 @@
+"""
+Event-driven page-settle detection.
+
+observation() used to stack Playwright's networkidle (which usually times out), a JS
+network-idle wait and a fixed sleep. PageSettleDetector instead follows the page's
+requests through CDP Network events and waits for the initscript.js MutationObserver
+to report a quiet DOM, resolving as soon as both network and DOM have been quiet for
+the idle window. Browsers without CDP fall back to the initscript.js request tracker.
+"""
+import asyncio
+import fnmatch
+import logging
+import time
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Requests that stay open by design and must not keep a page from settling
+_LONG_LIVED_TYPES = {"WebSocket", "EventSource"}
+
+DEFAULT_SETTLE = {
+    "enabled": True,
+    "idle_ms": 300,
+    "timeout_ms": 3000,
+    # requests in flight for longer than this (long polling, streaming) are ignored
+    "max_request_ms": 5000,
+}
+
+
+def settle_options(config: Optional[Any], url: str) -> dict:
+    """
+    Resolve the `browser.settle` config for `url`: defaults, then the section's
+    values, then the first `sites` entry whose hostname pattern matches.
+    """
+    options = dict(DEFAULT_SETTLE)
+    if not config:
+        return options
+    sites = config.get("sites") or {}
+    for key in DEFAULT_SETTLE:
+        if config.get(key) is not None:
+            options[key] = config.get(key)
+    host = urlparse(url or "").hostname or ""
+    for pattern, override in sites.items():
+        if host == pattern or host.endswith("." + pattern) or fnmatch.fnmatch(host, pattern):
+            for key in DEFAULT_SETTLE:
+                if override.get(key) is not None:
+                    options[key] = override.get(key)
+            break
+    return options
+
+
+class PageSettleDetector:
+    """
+    Tracks in-flight requests of one page and waits for network + DOM quiescence.
+
+    Usage:
+        detector = PageSettleDetector(page)
+        await detector.attach()
+        timing = await detector.wait(idle_ms=300, timeout_ms=3000)
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.cdp = None
+        self._inflight: dict[str, float] = {}
+        self._last_activity = time.monotonic()
+        self._changed = asyncio.Event()
+
+    @property
+    def uses_cdp(self) -> bool:
+        return self.cdp is not None
+
+    async def attach(self) -> None:
+        """Subscribe to CDP Network/Page events; keeps the JS fallback when CDP is unavailable."""
+        try:
+            cdp = await self.page.context.new_cdp_session(self.page)
+            cdp.on("Network.requestWillBeSent", self._on_request)
+            cdp.on("Network.loadingFinished", self._on_request_done)
+            cdp.on("Network.loadingFailed", self._on_request_done)
+            cdp.on("Page.frameStartedLoading", self._on_activity)
+            cdp.on("Page.frameNavigated", self._on_navigated)
+            await cdp.send("Network.enable")
+            await cdp.send("Page.enable")
+            self.cdp = cdp
+        except Exception as e:
+            logger.info(f"CDP unavailable, settling with the JS network tracker: {e}")
+
+    def _touch(self) -> None:
+        self._last_activity = time.monotonic()
+        self._changed.set()
+
+    def _on_request(self, event: dict) -> None:
+        if event.get("type") in _LONG_LIVED_TYPES:
+            return
+        if str(event.get("request", {}).get("url", "")).startswith("data:"):
+            return
+        self._inflight[event["requestId"]] = time.monotonic()
+        self._touch()
+
+    def _on_request_done(self, event: dict) -> None:
+        if self._inflight.pop(event.get("requestId"), None) is not None:
+            self._touch()
+
+    def _on_activity(self, event: dict) -> None:
+        self._touch()
+
+    def _on_navigated(self, event: dict) -> None:
+        # requests of the previous document of the main frame will never finish
+        if not event.get("frame", {}).get("parentId"):
+            self._inflight.clear()
+        self._touch()
+
+    def _busy(self, now: float, max_request_s: float) -> bool:
+        return any(now - started < max_request_s for started in self._inflight.values())
+
+    async def _network_quiet(self, idle_s: float, max_request_s: float, deadline: float) -> bool:
+        """Wait for `idle_s` without network activity, woken by CDP events."""
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                return False
+            if self._busy(now, max_request_s):
+                # re-check when the oldest request turns stale at the latest
+                oldest = min(t for t in self._inflight.values() if now - t < max_request_s)
+                wait = min(deadline, oldest + max_request_s) - now
+            else:
+                quiet_for = now - self._last_activity
+                if quiet_for >= idle_s:
+                    return True
+                wait = min(deadline - now, idle_s - quiet_for)
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=max(wait, 0.01))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _js_network_quiet(self, idle_ms: int, timeout_ms: int) -> bool:
+        return bool(
+            await self.page.evaluate(
+                """([idleMs, timeoutMs]) => window.__networkActivity
+                    ? window.__networkActivity.waitForIdle(idleMs, timeoutMs)
+                    : true""",
+                [idle_ms, timeout_ms],
+            )
+        )
+
+    async def _dom_quiet(self, idle_ms: int, timeout_ms: int) -> bool:
+        result = await self.page.evaluate(
+            """([quietMs, timeoutMs]) => window.__domMutations && window.__domMutations.waitForQuiet
+                ? window.__domMutations.waitForQuiet(quietMs, timeoutMs)
+                : {quiet: true}""",
+            [idle_ms, max(0, timeout_ms)],
+        )
+        return bool(result and result.get("quiet"))
+
+    async def _settle_round(self, idle_ms: int, max_request_ms: int, deadline: float) -> Optional[bool]:
+        """
+        One network-then-DOM quiet check: True when settled, False when the deadline
+        passed first, None when the DOM wait let new requests start (check again).
+        """
+        remaining_ms = int((deadline - time.monotonic()) * 1000)
+        if self.uses_cdp:
+            if not await self._network_quiet(idle_ms / 1000, max_request_ms / 1000, deadline):
+                return False
+        elif not await self._js_network_quiet(idle_ms, remaining_ms):
+            return False
+        activity_before_dom = self._last_activity
+        remaining_ms = int((deadline - time.monotonic()) * 1000)
+        if not await self._dom_quiet(idle_ms, remaining_ms):
+            return False
+        # the DOM wait may have let new requests start
+        if not self.uses_cdp or (
+            self._last_activity == activity_before_dom
+            and not self._busy(time.monotonic(), max_request_ms / 1000)
+        ):
+            return True
+        return None
+
+    async def wait(self, idle_ms: int, timeout_ms: int, max_request_ms: int = 5000) -> dict:
+        """
+        Resolve once network and DOM have both been quiet for `idle_ms`, or after
+        `timeout_ms`. Returns the timing for the observation.
+        """
+        start = time.monotonic()
+        deadline = start + timeout_ms / 1000
+        settled = False
+        rounds = 0
+        navigations = 0
+        while time.monotonic() < deadline:
+            rounds += 1
+            try:
+                outcome = await self._settle_round(idle_ms, max_request_ms, deadline)
+                if outcome is not None:
+                    settled = outcome
+                    break
+            except Exception as e:
+                # the page navigated mid-wait (redirect, form submit, meta refresh) and
+                # destroyed the execution context; wait for the new document and go on
+                navigations += 1
+                logger.info(f"Page navigated while settling, waiting for the new document: {e}")
+                remaining_ms = int((deadline - time.monotonic()) * 1000)
+                if remaining_ms <= 0:
+                    break
+                try:
+                    await self.page.wait_for_load_state("domcontentloaded", timeout=remaining_ms)
+                except Exception as load_error:
+                    logger.info(f"New document did not load while settling: {load_error}")
+                    break
+        return {
+            "settle_ms": int((time.monotonic() - start) * 1000),
+            "settled": settled,
+            "rounds": rounds,
+            "navigations": navigations,
+            "detector": "cdp" if self.uses_cdp else "js",
+        }
+
+    async def detach(self) -> None:
+        if self.cdp is not None:
+            try:
+                await self.cdp.detach()
+            except Exception:
+                pass
+            self.cdp = None
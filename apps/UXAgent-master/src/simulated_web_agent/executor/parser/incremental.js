@@ -0,0 +1,487 @@
+/* =========================================================================
+ *  Incremental DOM "stripper" — persistent version of parser.js
+ *
+ *  Installed as an init script next to initscript.js. Keeps the simplified
+ *  clone of every element cached and only re-strips subtrees that changed
+ *  since the last parse (MutationObserver records + form/focus/hover/load/
+ *  scroll events). Elements that were invisible are never cached, and a cached
+ *  subtree is only reused while its root is still visible.
+ *  Semantic ids are assigned once per element and never reused, so they
+ *  stay stable while elements are inserted around them.
+ *
+ *  window.__parser.parse()                -> same result shape as parser.js
+ *  window.__parser.changesSince(version)  -> semantic-id fragments changed since a parse
+ *  window.__parser.reset()                -> next parse re-strips the whole page
+ * ========================================================================= */
+
+(() => {
+  if (window.__parser) return;
+
+  /* ---------- globals (same rules as parser.js) ------------------------ */
+  const BLACKLISTED_TAGS = new Set([
+    'script', 'style', 'link', 'meta', 'noscript', 'template',
+    'iframe', 'svg', 'canvas', 'picture', 'video', 'audio',
+    'object', 'embed'
+  ]);
+
+  const ALLOWED_ATTR = new Set([
+    'id', 'type', 'name', 'value', 'placeholder',
+    'checked', 'disabled', 'readonly', 'required', 'maxlength',
+    'min', 'max', 'step', 'role', 'tabindex', 'alt', 'title',
+    'for', 'action', 'method', 'contenteditable', 'selected',
+    'multiple', 'autocomplete'
+  ]);
+
+  const PRESERVE_EMPTY_TAGS = new Set([
+    'input', 'select', 'textarea', 'button', 'img', 'head', 'title', 'form'
+  ]);
+
+  // number of past parses whose changes can be requested with changesSince()
+  const HISTORY = 20;
+
+  /* ---------- persistent state ----------------------------------------- */
+  const usedIds = new Set();
+  const ids = new WeakMap();       // element -> semantic id, assigned once
+  const cache = new WeakMap();     // element -> { clone, parentName, parentIsClickable }
+  let dirty = new WeakSet();       // element or a descendant changed since the last parse
+  let restyled = new WeakSet();    // element's own attributes changed: re-strip its whole subtree
+  let invalidateAll = true;
+  let version = 0;
+  const fragments = new Map();     // semantic id -> { version, html } (html null = removed)
+
+  /* ---------- change tracking ------------------------------------------ */
+  const markDirty = (el) => {
+    while (el && !dirty.has(el)) {
+      dirty.add(el);
+      el = el.parentElement;
+    }
+  };
+
+  const touchesStyles = (node) =>
+    node.nodeType === 1 && ['style', 'link'].includes(node.tagName.toLowerCase());
+
+  new MutationObserver((records) => {
+    for (const record of records) {
+      // parser-* attributes are written by the parsers themselves
+      if (record.type === 'attributes' && record.attributeName &&
+          record.attributeName.startsWith('parser-')) continue;
+      const target = record.target.nodeType === 1
+        ? record.target : record.target.parentElement;
+      if (!target) continue;
+      if (record.type === 'attributes') restyled.add(target);
+      if (record.type === 'childList') {
+        // stylesheet changes can affect the visibility of anything
+        if ((document.head && document.head.contains(target)) ||
+            Array.from(record.addedNodes).some(touchesStyles) ||
+            Array.from(record.removedNodes).some(touchesStyles)) {
+          invalidateAll = true;
+        }
+      }
+      markDirty(target);
+    }
+  }).observe(document, {
+    subtree: true,
+    childList: true,
+    attributes: true,
+    characterData: true
+  });
+
+  // form state and focus are properties, not attributes
+  for (const type of ['input', 'change', 'select', 'focusin', 'focusout']) {
+    document.addEventListener(type, (e) => {
+      if (e.target && e.target.nodeType === 1) markDirty(e.target);
+    }, true);
+  }
+  // visibility changes without a mutation: :hover menus, images that gained a size
+  // when they loaded ('load' does not bubble, so it is captured)
+  for (const type of ['mouseover', 'mouseout', 'load']) {
+    document.addEventListener(type, (e) => {
+      if (e.target && e.target.nodeType === 1) markDirty(e.target);
+    }, true);
+  }
+  // scrolling an inner container moves its whole subtree
+  document.addEventListener('scroll', (e) => {
+    if (e.target && e.target.nodeType === 1) {
+      restyled.add(e.target);
+      markDirty(e.target);
+    }
+  }, true);
+  window.addEventListener('resize', () => { invalidateAll = true; });
+
+  /* ---------- helpers (same as parser.js) ------------------------------ */
+  const copyAllowed = (src, dst) => {
+    for (const a of src.attributes) {
+      if (
+        ALLOWED_ATTR.has(a.name) ||
+        a.name.startsWith('aria-') ||
+        a.name.startsWith('parser-')
+      ) {
+        dst.setAttribute(a.name, a.value);
+      }
+    }
+  };
+
+  const slug = (t) =>
+    t.toLowerCase().replace(/\s+/g, ' ').trim()
+      .replace(/[^\w]+/g, '_').replace(/^_+|_+$/g, '').slice(0, 20);
+
+  const uniqueName = (base) => {
+    let name = base || 'item';
+    if (!usedIds.has(name)) {
+      usedIds.add(name);
+      return name;
+    }
+    let i = 1;
+    while (usedIds.has(name + i)) i++;
+    usedIds.add(name + i);
+    return name + i;
+  };
+
+  // the element keeps the first id it was given
+  const stableName = (el, base) => {
+    let name = ids.get(el);
+    if (!name) {
+      name = uniqueName(base);
+      ids.set(el, name);
+    }
+    return name;
+  };
+
+  const targetRow = (el) => {
+    const tag = el.tagName.toLowerCase();
+    const role = el.getAttribute('role') ||
+      (tag === 'input' ? 'input:' + (el.getAttribute('type') || 'text') : tag);
+    const label = (
+      el.getAttribute('aria-label') || el.getAttribute('placeholder') ||
+      el.getAttribute('title') || el.getAttribute('alt') ||
+      (tag === 'select' ? '' : el.textContent) || el.getAttribute('name') || ''
+    ).replace(/\s+/g, ' ').trim().slice(0, 60);
+    return { id: el.getAttribute('parser-semantic-id'), role, label };
+  };
+
+  const isEmpty = (el) => {
+    if (PRESERVE_EMPTY_TAGS.has(el.tagName.toLowerCase())) return false;
+    for (const n of el.childNodes) {
+      if (n.nodeType === 3 && n.textContent.trim()) return false;
+      if (n.nodeType === 1 && !isEmpty(n)) return false;
+    }
+    return true;
+  };
+
+  const isVisible = (el) => {
+    const style = window.getComputedStyle(el);
+    const hidden =
+      style.display === 'none' ||
+      style.visibility === 'hidden' ||
+      parseFloat(style.opacity) === 0;
+
+    const zeroSize = el.offsetWidth === 0 && el.offsetHeight === 0;
+
+    const rect = el.getBoundingClientRect();
+    const scrollLeft = window.scrollX || document.documentElement.scrollLeft;
+    const right = rect.right;
+    const top = rect.top;
+    const outOfPort = (right + scrollLeft < 0);
+
+    let belowPortNotScrollable = false;
+    if (top > window.innerHeight && !(document.documentElement.scrollHeight > window.innerHeight)) {
+      let hasScrollableAncestor = false;
+      for (let p = el?.parentElement; p; p = p.parentElement) {
+        const cs = getComputedStyle(p);
+        const canScrollY = /(auto|scroll)/.test(cs.overflowY) && p.scrollHeight > p.clientHeight;
+        if (canScrollY) { hasScrollableAncestor = true; break; }
+      }
+      belowPortNotScrollable = !hasScrollableAncestor;
+    }
+    if (hidden || zeroSize || outOfPort || belowPortNotScrollable) return false;
+    return true;
+  };
+
+  const replaceElement = (el, newTag, child) => {
+    const r = document.createElement(newTag);
+    for (const a of el.attributes) r.setAttribute(a.name, a.value);
+    copyAllowed(child, r);
+    r.innerHTML = child.innerHTML;
+    return r;
+  };
+
+  const pullUpChild = (parent, child) => {
+    copyAllowed(child, parent);
+    parent.innerHTML = child.innerHTML;
+  };
+
+  const flatten = (el) => {
+    while (el.children.length === 1) {
+      const child = el.children[0];
+      const p = el.tagName.toLowerCase();
+      const c = child.tagName.toLowerCase();
+      if (p !== 'div' && c !== 'div') break;
+      el = (p === 'div' && c !== 'div')
+        ? replaceElement(el, child.tagName, child)
+        : (pullUpChild(el, child), el);
+    }
+    return el;
+  };
+
+  const clearParserAttrs = (el) => {
+    for (const a of Array.from(el.attributes)) {
+      if (a.name.startsWith('parser-')) el.removeAttribute(a.name);
+    }
+  };
+
+  /* ==================================================================== */
+  let counters = { stripped: 0, reused: 0 };
+
+  function strip(original, parentName, parentIsClickable, force) {
+    if (!original || original.nodeType !== 1) return null;
+
+    const cached = cache.get(original);
+    if (
+      !force && cached && !dirty.has(original) &&
+      cached.parentName === parentName &&
+      cached.parentIsClickable === parentIsClickable
+    ) {
+      // visibility can change without marking anything dirty (CSS states, layout)
+      if (isVisible(original)) {
+        counters.reused++;
+        return cached.clone;
+      }
+      cache.delete(original);
+      return null;
+    }
+    const clone = stripElement(original, parentName, parentIsClickable,
+      force || restyled.has(original));
+    // invisible elements are not cached, so they are re-checked on every parse
+    if (clone) cache.set(original, { clone, parentName, parentIsClickable });
+    else cache.delete(original);
+    return clone;
+  }
+
+  // parser.js automaticStripElement, re-stripping only what changed below it
+  function stripElement(original, parentName, parentIsClickable, force) {
+    counters.stripped++;
+    const tag = original.tagName.toLowerCase();
+    if (BLACKLISTED_TAGS.has(tag)) return null;
+    clearParserAttrs(original);
+    if (!isVisible(original)) return null;
+
+    let clone = document.createElement(original.tagName);
+    copyAllowed(original, clone);
+
+    const computedStyle = window.getComputedStyle(original);
+    if (computedStyle.pointerEvents !== 'auto') {
+      clone.setAttribute('parser-pointer-events', computedStyle.pointerEvents);
+    }
+    if (document.activeElement === original) {
+      clone.setAttribute('parser-is-focused', 'true');
+    }
+
+    const isDisabled = original.disabled ||
+      original.hasAttribute('disabled') ||
+      computedStyle.pointerEvents === 'none';
+
+    const probablyClickable = (() => {
+      if (['button', 'select', 'summary', 'area', 'input'].includes(tag)) return true;
+      if (tag === 'a' && original.hasAttribute('href')) return true;
+      if (original.hasAttribute('onclick')) return true;
+      const r = original.getAttribute('role');
+      if (['button', 'link', 'checkbox', 'radio', 'option'].includes(r)) return true;
+      return computedStyle.cursor === 'pointer';
+    })();
+
+    const isClickable = !parentIsClickable && probablyClickable && !isDisabled;
+
+    let thisName = '';
+    if (isClickable) {
+      const base = slug((original.innerText || '').trim() ||
+        original.getAttribute('title') ||
+        original.getAttribute('placeholder') ||
+        tag);
+      thisName = stableName(original, parentName ? `${parentName}.${base}` : base);
+      for (const e of [clone, original]) {
+        e.setAttribute('parser-semantic-id', thisName);
+        e.setAttribute('parser-clickable', 'true');
+      }
+    }
+
+    if (original.closest('[parser-maybe-hoverable="true"]')) {
+      clone.setAttribute('parser-maybe-hoverable', 'true');
+      original.setAttribute('parser-maybe-hoverable', 'true');
+    }
+
+    if (tag === 'input' || tag === 'textarea' || original.hasAttribute('contenteditable')) {
+      const t = original.getAttribute('type') || 'text';
+      const inputIsDisabled = original.disabled || original.readOnly;
+      if (!inputIsDisabled && !thisName) {
+        const base = slug((original.getAttribute('placeholder') ||
+          original.getAttribute('name') ||
+          original.value || '').trim() || tag);
+        thisName = stableName(original, parentName ? `${parentName}.${base}` : base);
+      }
+      if (!inputIsDisabled && thisName) {
+        clone.setAttribute('parser-semantic-id', thisName);
+        clone.setAttribute('value', original.value || '');
+        clone.setAttribute('parser-input-disabled', 'false');
+        clone.setAttribute('parser-can-edit', !original.readOnly ? 'true' : 'false');
+        original.setAttribute('parser-semantic-id', thisName);
+      }
+      if (!inputIsDisabled && thisName && t === 'number') {
+        clone.setAttribute('parser-numeric-value', original.valueAsNumber || '');
+      }
+      if (!inputIsDisabled && thisName && original.selectionStart !== undefined) {
+        clone.setAttribute('parser-selection-start', original.selectionStart);
+        clone.setAttribute('parser-selection-end', original.selectionEnd);
+      }
+    }
+
+    if (tag === 'select') {
+      const selectIsDisabled = original.disabled || original.hasAttribute('disabled');
+      if (!selectIsDisabled) {
+        if (!thisName) {
+          const base = slug((original.getAttribute('name') || tag));
+          thisName = stableName(original, parentName ? `${parentName}.${base}` : base);
+        }
+        clone.setAttribute('parser-semantic-id', thisName);
+        clone.setAttribute('parser-value', original.value);
+        clone.setAttribute('parser-selected-index', original.selectedIndex);
+        clone.setAttribute('parser-has-multiple', original.multiple ? 'true' : 'false');
+        const selectedOptions = Array.from(original.selectedOptions).map(opt => opt.value).join(',');
+        clone.setAttribute('parser-selected-values', selectedOptions);
+        original.setAttribute('parser-semantic-id', thisName);
+        for (const opt of original.querySelectorAll('option')) {
+          const o = document.createElement('option');
+          o.textContent = opt.textContent.trim();
+          o.setAttribute('value', opt.value);
+          o.setAttribute('parser-selected', opt.selected ? 'true' : 'false');
+          const optName = stableName(opt, `${thisName}.${slug(opt.textContent)}`);
+          o.setAttribute('parser-semantic-id', optName);
+          opt.setAttribute('parser-semantic-id', optName);
+          clone.appendChild(o);
+        }
+      }
+    }
+
+    for (const child of original.children) {
+      const cleaned = strip(
+        child,
+        thisName || parentName,
+        parentIsClickable || isClickable,
+        force
+      );
+      if (cleaned && (!isEmpty(cleaned))) {
+        clone.appendChild(cleaned);
+      }
+    }
+
+    for (const n of original.childNodes) {
+      if (n.nodeType === 3 && n.textContent.trim()) {
+        clone.appendChild(document.createTextNode(n.textContent.trim()));
+      }
+    }
+
+    clone = flatten(clone);
+    for (let i = clone.children.length - 1; i >= 0; i--) {
+      const c = clone.children[i];
+      if (!PRESERVE_EMPTY_TAGS.has(c.tagName.toLowerCase()) && isEmpty(c)) {
+        clone.removeChild(c);
+      }
+    }
+
+    return clone;
+  }
+
+  const recordFragments = (result) => {
+    const seen = new Set();
+    for (const el of result.querySelectorAll('[parser-semantic-id]')) {
+      const id = el.getAttribute('parser-semantic-id');
+      seen.add(id);
+      const html = el.outerHTML;
+      const known = fragments.get(id);
+      if (!known || known.html !== html) fragments.set(id, { version, html });
+    }
+    for (const [id, known] of fragments) {
+      if (known.html === null) {
+        if (known.version < version - HISTORY) fragments.delete(id);
+      } else if (!seen.has(id)) {
+        fragments.set(id, { version, html: null });
+      }
+    }
+  };
+
+  window.__parser = {
+    get version() { return version; },
+
+    parse: function() {
+      const full = invalidateAll;
+      invalidateAll = false;
+      counters = { stripped: 0, reused: 0 };
+      const result = strip(document.documentElement, '', false, full);
+      dirty = new WeakSet();
+      restyled = new WeakSet();
+      version++;
+      // clones are reused by the next parse, so the result is serialized from a copy
+      const tree = result.cloneNode(true);
+      recordFragments(tree);
+      const html = tree.outerHTML;
+      return {
+        html: html,
+        clickable_elements: Array.from(tree.querySelectorAll('[parser-clickable="true"]'))
+          .map(el => el.getAttribute('parser-semantic-id')),
+        hoverable_elements: Array.from(tree.querySelectorAll('[parser-maybe-hoverable="true"]'))
+          .map(el => el.getAttribute('parser-semantic-id')),
+        input_elements: Array.from(tree.querySelectorAll('input[parser-semantic-id], textarea[parser-semantic-id], [contenteditable][parser-semantic-id]'))
+          .map(el => ({
+            id: el.getAttribute('parser-semantic-id'),
+            disabled: el.getAttribute('parser-input-disabled') === 'true',
+            type: el.getAttribute('type') || (el.tagName.toLowerCase() === 'textarea' ? 'textarea' : 'contenteditable'),
+            value: el.value || el.textContent,
+            canEdit: el.getAttribute('parser-can-edit') === 'true',
+            isFocused: el.getAttribute('parser-is-focused') === 'true'
+          })),
+        select_elements: Array.from(tree.querySelectorAll('select[parser-semantic-id]'))
+          .map(el => ({
+            id: el.getAttribute('parser-semantic-id'),
+            value: el.getAttribute('parser-value'),
+            selectedIndex: Number(el.getAttribute('parser-selected-index')),
+            multiple: el.getAttribute('parser-has-multiple') === 'true',
+            selectedValues: (el.getAttribute('parser-selected-values') || '').split(',').filter(v => v)
+          })),
+        // textLength needs a full traversal, so it is only measured when the parse looks empty
+        stats: {
+          elementCount: document.getElementsByTagName('*').length,
+          textLength: html.length < 100 && document.body ? document.body.textContent.length : null,
+        },
+        targets: Array.from(tree.querySelectorAll(
+          '[parser-clickable="true"], [parser-maybe-hoverable="true"], ' +
+          'input[parser-semantic-id], textarea[parser-semantic-id], ' +
+          '[contenteditable][parser-semantic-id], select[parser-semantic-id]'
+        )).map(targetRow),
+        parser: {
+          incremental: true,
+          version: version,
+          full: full,
+          stripped: counters.stripped,
+          reused: counters.reused,
+        },
+      };
+    },
+
+    // Fragments of semantic-id elements that changed after parse `since`; full=true when
+    // `since` is older than the retained history and the caller needs parse() instead
+    changesSince: function(since) {
+      if (since < version - HISTORY) return { version: version, full: true };
+      const changed = {};
+      const removed = [];
+      for (const [id, known] of fragments) {
+        if (known.version <= since) continue;
+        if (known.html === null) removed.push(id);
+        else changed[id] = known.html;
+      }
+      return { version: version, full: false, changed: changed, removed: removed };
+    },
+
+    reset: function() {
+      invalidateAll = true;
+    },
+  };
+})();
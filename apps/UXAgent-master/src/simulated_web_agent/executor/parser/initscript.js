@@ -225,6 +225,63 @@
     }
   };
 
+  // DOM mutation counter for cheap observation staleness checks and settle detection.
+  // Mutations to parser-* attributes are written by parser.js itself and are ignored.
+  window.__domMutations = {
+    documentId: Math.random().toString(36).slice(2) + Date.now().toString(36),
+    count: 0,
+    lastMutation: performance.now(),
+
+    _isParserMutation: function(record) {
+      return record.type === 'attributes' &&
+             record.attributeName &&
+             record.attributeName.startsWith('parser-');
+    },
+
+    // Stamp identifying the current DOM state of this document
+    version: function() {
+      return {
+        documentId: this.documentId,
+        mutations: this.count,
+        url: window.location.href
+      };
+    },
+
+    // Resolves {quiet, quietFor} once no mutation happened for quietMs, or at timeoutMs.
+    // Only wakes up when the quiet window could have elapsed.
+    waitForQuiet: function(quietMs, timeoutMs) {
+      const start = performance.now();
+      return new Promise((resolve) => {
+        const check = () => {
+          const now = performance.now();
+          const quietFor = now - this.lastMutation;
+          if (quietFor >= quietMs) {
+            resolve({ quiet: true, quietFor: quietFor });
+          } else if (now - start >= timeoutMs) {
+            resolve({ quiet: false, quietFor: quietFor });
+          } else {
+            setTimeout(check, Math.min(quietMs - quietFor, timeoutMs - (now - start)));
+          }
+        };
+        check();
+      });
+    }
+  };
+
+  new MutationObserver((records) => {
+    for (const record of records) {
+      if (!window.__domMutations._isParserMutation(record)) {
+        window.__domMutations.count++;
+        window.__domMutations.lastMutation = performance.now();
+      }
+    }
+  }).observe(document, {
+    subtree: true,
+    childList: true,
+    attributes: true,
+    characterData: true
+  });
+
   // Initialize tracking
   window.__networkActivity.trackXHR();
   window.__networkActivity.trackFetch();
@@ -4,6 +4,16 @@
  * ========================================================================= */
 
 const parse = () => {
+  // Persistent incremental parser installed by incremental.js (environment.incremental_parser)
+  if (window.__parser) {
+    try {
+      return window.__parser.parse();
+    } catch (e) {
+      console.warn('Incremental parser failed, running a full parse', e);
+      window.__parser.reset();
+    }
+  }
+
   /* ---------- globals --------------------------------------------------- */
   const BLACKLISTED_TAGS = new Set([
     'script', 'style', 'link', 'meta', 'noscript', 'template',
@@ -54,6 +64,19 @@ const parse = () => {
     return name + i;
   };
 
+  /* one row of the compact target table: id, role and a short label */
+  const targetRow = (el) => {
+    const tag = el.tagName.toLowerCase();
+    const role = el.getAttribute('role') ||
+      (tag === 'input' ? 'input:' + (el.getAttribute('type') || 'text') : tag);
+    const label = (
+      el.getAttribute('aria-label') || el.getAttribute('placeholder') ||
+      el.getAttribute('title') || el.getAttribute('alt') ||
+      (tag === 'select' ? '' : el.textContent) || el.getAttribute('name') || ''
+    ).replace(/\s+/g, ' ').trim().slice(0, 60);
+    return { id: el.getAttribute('parser-semantic-id'), role, label };
+  };
+
   const isEmpty = (el) => {
     if (PRESERVE_EMPTY_TAGS.has(el.tagName.toLowerCase())) return false;
     for (const n of el.childNodes) {
@@ -281,7 +304,7 @@ const parse = () => {
     input_elements: Array.from(result.querySelectorAll('input[parser-semantic-id], textarea[parser-semantic-id], [contenteditable][parser-semantic-id]'))
       .map(el => ({
         id: el.getAttribute('parser-semantic-id'),
-        disabled: el.hasAttribute('parser-input-disabled'),
+        disabled: el.getAttribute('parser-input-disabled') === 'true',
         type: el.getAttribute('type') || (el.tagName.toLowerCase() === 'textarea' ? 'textarea' : 'contenteditable'),
         value: el.value || el.textContent,
         canEdit: el.getAttribute('parser-can-edit') === 'true',
@@ -295,6 +318,16 @@ const parse = () => {
         multiple: el.multiple,
         selectedValues: Array.from(el.selectedOptions).map(opt => opt.value)
       })),
+    // cheap size of the live page, so an empty parse can be told apart from an empty page
+    stats: {
+      elementCount: document.getElementsByTagName('*').length,
+      textLength: document.body ? document.body.textContent.length : 0,
+    },
+    targets: Array.from(result.querySelectorAll(
+      '[parser-clickable="true"], [parser-maybe-hoverable="true"], ' +
+      'input[parser-semantic-id], textarea[parser-semantic-id], ' +
+      '[contenteditable][parser-semantic-id], select[parser-semantic-id]'
+    )).map(targetRow),
   };
 }
 
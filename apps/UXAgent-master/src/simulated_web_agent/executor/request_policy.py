@@ -0,0 +1,173 @@
+"""
+Request interception profiles for agent browsing.
+
+A RequestPolicy is installed on the browser context with context.route() and blocks
+requests the agent does not need (trackers, ad networks, analytics beacons, web
+fonts, media, and images in text mode) while never blocking the site under test by
+domain. Blocked images are answered with a 1x1 transparent GIF instead of an error,
+so <img> elements keep a box and the parsed page the agent perceives is unchanged.
+"""
+import base64
+import logging
+import os
+from collections import Counter
+from typing import Any, Iterable, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Third-party trackers, ad networks and analytics/beacon endpoints
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "fullstory.com",
+    "mixpanel.com",
+    "amplitude.com",
+    "cdn.segment.com",
+    "api.segment.io",
+    "scorecardresearch.com",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "outbrain.com",
+    "adnxs.com",
+    "nr-data.net",
+    "bat.bing.com",
+    "ads.linkedin.com",
+    "analytics.tiktok.com",
+)
+
+FONT_DOMAINS = ("fonts.googleapis.com", "fonts.gstatic.com", "use.typekit.net")
+
+# Profiles selected by `environment.browser.request_policy.profile`
+REQUEST_POLICY_PROFILES: dict[str, dict[str, Any]] = {
+    "off": {"block_types": (), "block_domains": ()},
+    # what no agent needs: trackers, beacons, fonts and audio/video
+    "lean": {
+        "block_types": ("font", "media", "ping"),
+        "block_domains": TRACKER_DOMAINS + FONT_DOMAINS,
+    },
+    # text (non-CUA) agents additionally don't need images
+    "text": {
+        "block_types": ("font", "media", "ping", "image"),
+        "block_domains": TRACKER_DOMAINS + FONT_DOMAINS,
+    },
+}
+
+_PIXEL_GIF = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+
+def _host(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+def _matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+class RequestPolicy:
+    """
+    Decides per request whether to block it and counts what was blocked.
+
+    Usage:
+        policy = RequestPolicy.from_config(config.browser.get("request_policy"), start_url)
+        if policy is not None:
+            await policy.install(context)
+        ...
+        policy.take_counts()  # blocked requests since the last call
+    """
+
+    def __init__(
+        self,
+        profile: str,
+        block_types: Iterable[str] = (),
+        block_domains: Iterable[str] = (),
+        allow_domains: Iterable[str] = (),
+    ):
+        self.profile = profile
+        self.block_types = frozenset(block_types)
+        self.block_domains = tuple(d.lower() for d in block_domains)
+        self.allow_domains = tuple(d.lower() for d in allow_domains if d)
+        self.total_blocked: Counter = Counter()
+        self._blocked: Counter = Counter()
+        self._allowed = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Any], start_url: Optional[str] = None) -> Optional["RequestPolicy"]:
+        """
+        Build the policy from the `request_policy` config section:
+            profile: off | lean | text
+            block_types / block_domains: added to the profile's lists
+            allow_domains: never blocked by domain (the start_url host is always included)
+        Returns None when nothing would be blocked.
+        """
+        config = config or {}
+        profile = str(config.get("profile", "off") or "off").lower()
+        if profile not in REQUEST_POLICY_PROFILES:
+            logger.warning(f"Unknown request policy profile '{profile}', using 'off'")
+            profile = "off"
+        # computer-use agents act on screenshots, so images must load
+        if profile == "text" and os.getenv("USE_CUA", "false").lower() == "true":
+            logger.info("USE_CUA is enabled; using the 'lean' request policy instead of 'text'")
+            profile = "lean"
+        base = REQUEST_POLICY_PROFILES[profile]
+        block_types = set(base["block_types"]) | set(config.get("block_types") or [])
+        block_domains = tuple(base["block_domains"]) + tuple(config.get("block_domains") or [])
+        if not block_types and not block_domains:
+            return None
+        allow_domains = list(config.get("allow_domains") or [])
+        if start_url and _host(start_url):
+            allow_domains.append(_host(start_url))
+        return cls(profile, block_types, block_domains, allow_domains)
+
+    def decide(self, url: str, resource_type: str) -> Optional[str]:
+        """Reason to block the request ("type:<type>" or "domain"), or None to let it through."""
+        if resource_type == "document":
+            return None
+        if resource_type in self.block_types:
+            return f"type:{resource_type}"
+        host = _host(url)
+        if self.block_domains and not _matches(host, self.allow_domains) and _matches(host, self.block_domains):
+            return "domain"
+        return None
+
+    async def install(self, context) -> None:
+        await context.route("**/*", self._handle)
+        logger.info(
+            f"Request policy '{self.profile}' installed "
+            f"(types: {sorted(self.block_types)}, {len(self.block_domains)} blocked domains, "
+            f"allowed: {list(self.allow_domains)})"
+        )
+
+    async def _handle(self, route, request) -> None:
+        reason = self.decide(request.url, request.resource_type)
+        if reason is None:
+            self._allowed += 1
+            # let later handlers (e.g. HAR replay) or the network serve it
+            await route.fallback()
+            return
+        self._blocked[reason] += 1
+        self.total_blocked[reason] += 1
+        if request.resource_type == "image":
+            await route.fulfill(status=200, content_type="image/gif", body=_PIXEL_GIF)
+        else:
+            await route.abort("blockedbyclient")
+
+    def take_counts(self) -> dict:
+        """Blocked/allowed request counts since the last call, for the observation timing."""
+        counts = {
+            "profile": self.profile,
+            "blocked_requests": sum(self._blocked.values()),
+            "blocked_by_reason": dict(self._blocked),
+            "allowed_requests": self._allowed,
+        }
+        self._blocked.clear()
+        self._allowed = 0
+        return counts
@@ -293,6 +293,17 @@ class StagehandEnv:
             self._last_observation_time = time.time()
             return obs
     
+    async def is_observation_current(self, observation: dict | None) -> bool:
+        """
+        Check whether an observation returned by observation() or step() still describes
+        the page. Stagehand has no DOM hooks, so this holds until the next step() call.
+        """
+        return (
+            observation is not None
+            and observation is self._last_observation
+            and self._last_observation_step == self._step_count
+        )
+
     async def step(
         self,
         action: str,
@@ -16,6 +16,7 @@ from werkzeug.exceptions import BadRequest
 from flask_cors import CORS
 
 from .run import run  # your run() from the module you showed
+from .screenshots import load_screenshot_base64
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -135,28 +136,59 @@ def log_progress(evt: dict):
         print(f"[PROGRESS] {evt}", flush=True)
 
 
-async def send_results_to_callback(callback_url: str, api_key: str, run_data: dict):
-    """Send run results to the callback URL (main API)"""
+async def send_results_to_callback(
+    callback_url: str, api_key: str, run_data: dict | None = None, body=None
+):
+    """
+    Send run results to the callback URL (main API). `body` is an async iterable of
+    JSON bytes, sent with chunked transfer encoding, for results too large to
+    build in memory; otherwise `run_data` is sent as JSON.
+    """
+    if body is not None:
+        request = {"data": body}
+        # large runs take longer to upload; only bound the wait for each read
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)
+    else:
+        request = {"json": run_data}
+        timeout = aiohttp.ClientTimeout(total=60)
     try:
         async with aiohttp.ClientSession() as session:
             async with session.post(
                 callback_url,
-                json=run_data,
+                **request,
                 headers={
                     "Content-Type": "application/json",
                     "X-API-Key": api_key,
                 },
-                timeout=aiohttp.ClientTimeout(total=60),
+                timeout=timeout,
             ) as response:
                 if response.status != 200:
                     text = await response.text()
                     print(f"[CALLBACK] Failed to send results: {response.status} - {text}", flush=True)
                 else:
-                    print(f"[CALLBACK] Results sent successfully", flush=True)
+                    print("[CALLBACK] Results sent successfully", flush=True)
     except Exception as e:
         print(f"[CALLBACK] Error sending results: {e}", flush=True)
 
 
+async def _agent_result_body(payload: dict, screenshots: list):
+    """
+    Yield `payload` as JSON with a "screenshots" array appended, reading one
+    screenshot from disk at a time so at most one image is held in memory.
+    """
+    head = json.dumps(payload)
+    yield (head[:-1] + ', "screenshots": [').encode("utf-8")
+    first = True
+    for s in screenshots:
+        data = await asyncio.to_thread(load_screenshot_base64, s)
+        if data is None:
+            continue
+        item = json.dumps({"stepNumber": s.get("step"), "base64Data": data})
+        yield (item if first else ", " + item).encode("utf-8")
+        first = False
+    yield b"]}"
+
+
 async def send_agent_result(callback_url: str, api_key: str, agent_data: dict, test_run_id: str = None):
     """Send a single agent's result to the callback URL"""
     memories = agent_data.get("memories", []) or []
@@ -190,17 +222,15 @@ async def send_agent_result(callback_url: str, api_key: str, agent_data: dict, t
         "observationTrace": agent_data.get("observations", []),
         "logContent": agent_data.get("final_memory_text"),
         "stepsTaken": agent_data.get("steps_taken"),
-        "screenshots": [
-            {
-                "stepNumber": s.get("step"),
-                "base64Data": s.get("base64"),
-            }
-            for s in agent_data.get("screenshots", [])
-        ],
         "error": agent_data.get("error"),
     }
     
-    await send_results_to_callback(callback_url, api_key, payload)
+    # Screenshots are stored as files; stream them into the body instead of building it in memory
+    await send_results_to_callback(
+        callback_url,
+        api_key,
+        body=_agent_result_body(payload, agent_data.get("screenshots", []) or []),
+    )
 
 
 @app.post("/run")
@@ -238,6 +268,7 @@ def run_endpoint():
     stagehand_skip_observe = payload.get("stagehand_skip_observe")
     stagehand_use_extract = payload.get("stagehand_use_extract")
     stagehand_observe_timeout = payload.get("stagehand_observe_timeout_seconds")
+    combine_perceive_feedback = payload.get("combine_perceive_feedback")
     
     # Generate a unique run ID for tracking
     import uuid
@@ -261,6 +292,8 @@ def run_endpoint():
                 os.environ["STAGEHAND_USE_EXTRACT"] = "true" if stagehand_use_extract else "false"
             if stagehand_observe_timeout is not None:
                 os.environ["STAGEHAND_OBSERVE_TIMEOUT_SECONDS"] = str(stagehand_observe_timeout)
+            if combine_perceive_feedback is not None:
+                os.environ["COMBINE_PERCEIVE_FEEDBACK"] = "true" if combine_perceive_feedback else "false"
             
             # Call the pipeline
             result = run(
@@ -1,5 +1,4 @@
 import asyncio
-import base64
 import json
 import logging
 import os
@@ -16,9 +15,14 @@ from hydra import compose, initialize_config_dir
 from omegaconf import DictConfig
 
 from ..agent import context, gpt
+from ..agent.agent import perception_cache
+from ..agent.budget import PromptBudget, Section
 from ..agent.gpt import async_chat
+from ..executor.browser_pool import BrowserPool
 from ..executor.env import WebAgentEnv  # Playwright env
 from .model import AgentPolicy  # noqa
+from .screenshots import ScreenshotPipeline
+from .trace_writer import TraceWriter
 
 # Try to import StagehandEnv (optional)
 try:
@@ -84,10 +88,14 @@ async def evaluate_ux_score(
     """Run a final LLM evaluation to generate UX scores."""
     try:
         # Format memories for the prompt
-        memory_text = "\n".join([
+        memory_lines = [
             f"- {m.get('content', str(m))}" if isinstance(m, dict) else f"- {m}"
             for m in memories[-30:]  # Last 30 memories to fit context
-        ])
+        ]
+        memory_lines = PromptBudget("ux_evaluation", fixed=FINAL_EVALUATION_PROMPT).fit(
+            [Section("memories", memory_lines, priority=1)]
+        )["memories"]
+        memory_text = "\n".join(memory_lines)
         
         # Extract persona summary (first 200 chars)
         persona_summary = persona[:200] + "..." if len(persona) > 200 else persona
@@ -136,6 +144,7 @@ async def _run_for_persona_and_intent(
     wait_for_login: bool = False,
     env_setup_hook: Callable = None,
     env_wait_hook: Callable = None,
+    browser_pool: Optional[BrowserPool] = None,
 ) -> Dict[str, Any]:
     """Run a single agent and return all collected data."""
     persona = persona_info["persona"]
@@ -163,6 +172,15 @@ async def _run_for_persona_and_intent(
     # Save persona and intent locally
     (trace_dir / "basic_info.json").write_text(json.dumps(persona_info))
     context.run_path.set(trace_dir)
+    # All per-step trace files go through the background writer
+    trace_cfg = cfg.get("trace", None) or {}
+    trace_writer = TraceWriter(
+        trace_dir, compress_html=trace_cfg.get("compress_html", "gzip")
+    )
+    context.trace_writer.set(trace_writer)
+    screenshots = ScreenshotPipeline(trace_writer, trace_cfg.get("screenshots", None))
+    archive_raw_html = bool(trace_cfg.get("raw_html", False))
+    memories_traced = 0
     
     # ============ Data collectors (in-memory) ============
     steps_taken = 0
@@ -186,7 +204,7 @@ async def _run_for_persona_and_intent(
         "actions": [],
         "memories": [],
         "observations": [],
-        "screenshots": [],  # Each: {"step": int, "base64": str, "full_page_base64": str}
+        "screenshots": [],  # Each: {"step", "url", "format", "path", "full_page_path"}; see load_screenshot_base64
         "terminated": False,
         "score": None,
         "steps_taken": 0,
@@ -213,24 +231,10 @@ async def _run_for_persona_and_intent(
         if use_stagehand:
             return
         
-        # Capture screenshots as base64 (Playwright only)
+        # Capture screenshots once; only file references are kept in memory
         try:
-            screenshot_bytes = await env.page.screenshot()
-            full_page_bytes = await env.page.screenshot(full_page=True)
-            
-            collected_data["screenshots"].append({
-                "step": steps_taken,
-                "base64": base64.b64encode(screenshot_bytes).decode("utf-8"),
-                "full_page_base64": base64.b64encode(full_page_bytes).decode("utf-8"),
-            })
-            
-            # Also save to disk for backwards compatibility
-            await env.page.screenshot(
-                path=trace_dir / "screenshot" / f"screenshot_{steps_taken}_full_page.png",
-                full_page=True,
-            )
-            await env.page.screenshot(
-                path=trace_dir / "screenshot" / f"screenshot_{steps_taken}.png",
+            collected_data["screenshots"].append(
+                await screenshots.capture(env.page, steps_taken)
             )
         except Exception as e:
             log.warning(f"Failed to capture screenshot at step {steps_taken}: {e}")
@@ -248,7 +252,10 @@ async def _run_for_persona_and_intent(
             log.warning("USE_STAGEHAND=true but stagehand not installed, falling back to WebAgentEnv")
         log.info(f"[{run_uid}] Using WebAgentEnv (Playwright mode)")
         env = WebAgentEnv(
-            cfg.environment, before_action_hook=before_action_hook, wait_hook=env_wait_hook
+            cfg.environment,
+            before_action_hook=before_action_hook,
+            wait_hook=env_wait_hook,
+            browser_pool=browser_pool,
         )
 
     log.info(f"[{run_uid}] env created")
@@ -286,44 +293,41 @@ async def _run_for_persona_and_intent(
             })
             
             # Save to disk (backwards compatibility)
-            with open(trace_dir / "observation_trace.jsonl", "a") as f:
-                json.dump(obs, f)
+            trace_writer.append_jsonl("observation_trace.jsonl", obs)
             
             # Save simplified HTML (from observation)
             simp_html = obs.get("html", "")
             if simp_html:
-                with open(trace_dir / "simp_html" / f"simp_html_{steps_taken}.html", "w") as f:
-                    f.write(simp_html)
+                trace_writer.write_html(f"simp_html/simp_html_{steps_taken}.html", simp_html)
             
-            # Save raw HTML (Playwright only - Stagehand Session doesn't have content())
-            if not use_stagehand and hasattr(env, 'page') and hasattr(env.page, 'content'):
+            # Save raw HTML when archiving is enabled (Playwright only - Stagehand Session
+            # doesn't have content()); shares the observation's page.content() if it made one
+            if archive_raw_html and not use_stagehand and hasattr(env, "raw_html"):
                 try:
-                    raw_html = await env.page.content()
-                    with open(trace_dir / "raw_html" / f"raw_html_{steps_taken}.html", "w") as f:
-                        f.write(raw_html)
+                    raw_html = await env.raw_html(obs.get("dom_version"))
+                    trace_writer.write_html(f"raw_html/raw_html_{steps_taken}.html", raw_html)
                 except Exception as e:
                     log.warning(f"Failed to get raw HTML at step {steps_taken}: {e}")
 
             # Get action from policy
-            action = await policy.forward(env)
+            action = await policy.forward(env, obs)
             collected_data["actions"].append(action)
             
-            # Save action trace
-            with open(trace_dir / "action_trace.json", "w") as f:
-                json.dump(collected_data["actions"], f, indent=2)
+            # Save action trace (action_trace.json is written once at the end)
+            trace_writer.append_jsonl("action_trace.jsonl", action)
             
             # Save observation text
-            with open(trace_dir / "observation_trace" / f"observation_trace_{steps_taken}.txt", "w") as f:
-                obs_data = policy.agent.observation
-                if isinstance(obs_data, dict):
-                    f.write(json.dumps(obs_data, indent=2))
-                else:
-                    f.write(str(obs_data))
+            obs_data = policy.agent.observation
+            trace_writer.write_text(
+                f"observation_trace/observation_trace_{steps_taken}.txt",
+                json.dumps(obs_data, indent=2) if isinstance(obs_data, dict) else str(obs_data),
+            )
             
-            # Collect memory trace
+            # Collect memory trace (memory_trace.json is written once at the end)
             collected_data["memories"] = policy.agent.memory.memories.copy()
-            with open(trace_dir / "memory_trace.json", "w") as f:
-                json.dump(collected_data["memories"], f)
+            for memory in collected_data["memories"][memories_traced:]:
+                trace_writer.append_jsonl("memory_trace.jsonl", memory)
+            memories_traced = len(collected_data["memories"])
 
             log.info(f"Taking action {action}")
             log.info(f"Action: {steps_taken + 1} out of {max_steps}")
@@ -398,6 +402,7 @@ async def _run_for_persona_and_intent(
             "hesitation_moments": hesitations,
             "backtrack_count": backtrack_count,
             "average_action_interval_ms": total_duration_ms // max(steps_taken, 1),
+            "perception_cache": policy.agent.perception_cache_stats(),
         })
         
         collected_data["steps_taken"] = steps_taken
@@ -410,9 +415,10 @@ async def _run_for_persona_and_intent(
         )
 
         # Save final memory trace
+        collected_data["memories"] = policy.agent.memory.memories.copy()
         final_memories_str = policy.get_formatted_memories()
         trace_file = trace_dir / f"{run_id}.txt"
-        trace_file.write_text(final_memories_str, encoding="utf-8")
+        trace_writer.write_text(trace_file.name, final_memories_str)
         collected_data["final_memory_text"] = final_memories_str
 
         log.info(f"Saved memory trace to {trace_file}")
@@ -465,6 +471,13 @@ async def _run_for_persona_and_intent(
             log.info(f"[{run_uid}] env.close() completed")
         except Exception as e:
             log.exception(f"[{run_uid}] env.close() raised: {e!r}")
+        # Full traces are written once per run; make sure everything queued is on disk
+        try:
+            trace_writer.write_json("action_trace.json", collected_data["actions"], indent=2)
+            trace_writer.write_json("memory_trace.json", collected_data["memories"])
+        except Exception as e:
+            log.warning(f"[{run_uid}] failed to serialize final traces: {e!r}")
+        await trace_writer.close()
     
     return collected_data
 
@@ -497,6 +510,24 @@ async def experiment_async(
 
     sem = asyncio.Semaphore(concurrency)
 
+    # Share warm local browsers across agents instead of launching one per persona
+    browser_pool = None
+    use_stagehand = os.environ.get("USE_STAGEHAND", "").lower() in ("true", "1", "yes")
+    pool_cfg = cfg.environment.browser.get("pool", None)
+    if (
+        pool_cfg is not None
+        and pool_cfg.get("enabled", False)
+        and os.getenv("BROWSER_MODE", "local") == "local"
+        and not (use_stagehand and STAGEHAND_AVAILABLE)
+    ):
+        pool_size = pool_cfg.get("size", None) or min(concurrency or 1, max(len(agents), 1))
+        browser_pool = BrowserPool(
+            cfg.environment,
+            size=pool_size,
+            headless=cfg.environment.browser.launch_options.headless,
+        )
+        log.info(f"Using browser pool with {pool_size} browser(s)")
+
     total = len(agents)
     done = 0
     lock = asyncio.Lock()
@@ -509,6 +540,7 @@ async def experiment_async(
                 persona_info=entry,
                 start_url=start_url,
                 max_steps=max_steps,
+                browser_pool=browser_pool,
             )
 
         # Progress tick
@@ -522,7 +554,17 @@ async def experiment_async(
         return result
 
     tasks = [asyncio.create_task(run_one(e)) for e in agents]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    try:
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        if browser_pool is not None:
+            await browser_pool.close()
+    if gpt.cache_stats():
+        log.info(f"LLM cache stats: {gpt.cache_stats()}")
+    if gpt.limiter_stats():
+        log.info(f"LLM rate limiter stats: {gpt.limiter_stats()}")
+    if perception_cache is not None:
+        log.info(f"Perception cache stats: {perception_cache.stats()}")
     
     # Convert exceptions to error dicts
     processed_results = []
@@ -15,6 +15,7 @@ import openai
 from typing_extensions import override
 
 from ..agent import Agent, context
+from ..executor import dom_diff
 from ..executor.env import WebAgentEnv
 from .profiler import TokenProfiler
 
@@ -26,12 +27,16 @@ class BasePolicy(ABC):
         pass
 
     @abstractmethod
-    async def forward(self, playwright_env: WebAgentEnv):
+    async def forward(self, playwright_env: WebAgentEnv, observation: dict | None = None):
         """
         Args:
             playwright_env:
                 WebAgentEnv object representing the current playwright environment from which
                 observation can be drawn.
+            observation:
+                Optional observation already produced by `playwright_env.step()` or
+                `playwright_env.observation()`. It is reused when the environment reports it
+                is still current, instead of re-parsing the page.
 
         Returns:
             action (`str`):
@@ -114,7 +119,7 @@ class HumanPolicy(BasePolicy):
 
 
 class AgentPolicy(BasePolicy):
-    def __init__(self, persona, intent, output=None):
+    def __init__(self, persona, intent, output=None, combine_perceive_feedback=None):
         logger.info(f"Creating AgentPolicy with persona: {persona}, intent: {intent}")
         self.agent = Agent(persona, intent)
         logger.info("Initializing step profiler...")
@@ -139,6 +144,19 @@ class AgentPolicy(BasePolicy):
         self.use_background_slow_loop = self._read_bool_env(
             "ENABLE_BACKGROUND_SLOW_LOOP", False
         )
+        # One LLM call for perceive + feedback instead of two (A/B switch per run)
+        if combine_perceive_feedback is None:
+            combine_perceive_feedback = self._read_bool_env(
+                "COMBINE_PERCEIVE_FEEDBACK", False
+            )
+        self.combine_perceive_feedback = combine_perceive_feedback
+        # Perceive only what changed while the page stays the same; the full page is
+        # sent again after a navigation or when more than the max ratio changed
+        self.perceive_dom_diff = self._read_bool_env("PERCEIVE_DOM_DIFF", False)
+        self.perceive_diff_max_ratio = self._read_float_env(
+            "PERCEIVE_DIFF_MAX_RATIO", 0.4
+        )
+        self._last_perceived = None
         # self.agent.add_thought(f"I want to {intent}")
         # lets' have a run name with current time and random string to save agent checkpoints
         # 2024-02-02_05:05:05
@@ -169,6 +187,55 @@ class AgentPolicy(BasePolicy):
         except ValueError:
             return default
 
+    @staticmethod
+    def _read_float_env(key: str, default: float) -> float:
+        try:
+            return float(os.getenv(key, str(default)))
+        except ValueError:
+            return default
+
+    @staticmethod
+    def _page_state_key(observation: dict) -> str | None:
+        """URL plus normalized DOM hash, used to reuse the perception of a seen page state."""
+        html = observation.get("html")
+        if not html:
+            return None
+        url = (observation.get("dom_version") or {}).get("url") or observation.get("url", "")
+        return f"{url}#{dom_diff.dom_hash(html)}"
+
+    def _perception_delta(self, observation: dict) -> dict | None:
+        """
+        Changes since the last perceived observation, or None when the full page
+        has to be perceived (first step, navigation, or too much of the page changed).
+        """
+        previous, self._last_perceived = self._last_perceived, observation
+        if not self.perceive_dom_diff or previous is None:
+            return None
+        before, after = previous.get("dom_version"), observation.get("dom_version")
+        if not before or not after:
+            return None
+        if (before.get("documentId"), before.get("url")) != (
+            after.get("documentId"),
+            after.get("url"),
+        ):
+            logger.info("Page navigated, perceiving the full page")
+            return None
+        try:
+            delta = dom_diff.diff(previous.get("html", ""), observation.get("html", ""))
+        except Exception as e:
+            logger.warning(f"DOM diff failed, perceiving the full page: {e}")
+            return None
+        if delta.ratio > self.perceive_diff_max_ratio:
+            logger.info(
+                f"DOM delta is {delta.ratio:.0%} of the page, perceiving the full page"
+            )
+            return None
+        logger.info(
+            f"Perceiving DOM delta: {len(delta.added)} added, {len(delta.changed)} changed, "
+            f"{len(delta.removed)} removed, {delta.unchanged} unchanged ({delta.ratio:.0%} of the page)"
+        )
+        return delta.to_prompt()
+
     async def slow_loop(self):
         """
         Background loop for reflect/wonder. Throttled to avoid excessive LLM calls.
@@ -216,8 +283,21 @@ class AgentPolicy(BasePolicy):
             return True
         return (self.step_count - self.last_plan_step) >= self.plan_every_steps
 
-    async def forward(self, playwright_env):
-        observation = await playwright_env.observation()
+    @staticmethod
+    async def _is_observation_current(playwright_env, observation) -> bool:
+        if observation is None or not hasattr(playwright_env, "is_observation_current"):
+            return False
+        try:
+            return await playwright_env.is_observation_current(observation)
+        except Exception as e:
+            logger.warning(f"Observation staleness check failed: {e}")
+            return False
+
+    async def forward(self, playwright_env, observation=None):
+        if await self._is_observation_current(playwright_env, observation):
+            logger.info("Reusing observation from the last step")
+        else:
+            observation = await playwright_env.observation()
         observation_str = json.dumps(observation)
         available_actions = observation.get("clickable_elements")
 
@@ -232,13 +312,17 @@ class AgentPolicy(BasePolicy):
         #             f"length of {k} = {self.profiler.count_tokens(json.dumps(v))}"
         #         )
 
-        if self.agent.memory.timestamp != 0:
+        delta = self._perception_delta(observation)
+        state_key = self._page_state_key(observation)
+        if self.combine_perceive_feedback:
+            await self.agent.perceive_with_feedback(observation["html"], delta, state_key)
+        elif self.agent.memory.timestamp != 0:
             await asyncio.gather(
                 self.agent.feedback(observation["html"]),
-                self.agent.perceive(observation["html"]),
+                self.agent.perceive(observation["html"], delta, state_key),
             )
         else:
-            await self.agent.perceive(observation["html"])
+            await self.agent.perceive(observation["html"], delta, state_key)
         if self.use_background_slow_loop and self.slow_loop_task is None:
             self.slow_loop_task = asyncio.create_task(self.slow_loop())
         # if self.agent.memory.timestamp != 0:
@@ -1,14 +1,14 @@
-import tiktoken
+from ..agent import budget
+
 
 class TokenProfiler:
     """
-    Counts the number of tokens of individual chats. Uses gpt-5-mini by default.
+    Counts the number of tokens of individual chats with the tokenizer shared by the
+    prompt budgets (see agent/budget.py).
     """
-    def __init__(self, model: str = "gpt-5-mini"):
-        self.encoding = tiktoken.encoding_for_model(model)
 
     def count_tokens(self, text: str):
         """
-        Counts the number of tokens in a given string determined by the model. Uses gpt-5-mini by default
+        Counts the number of tokens in a given string.
         """
-        return len(self.encoding.encode(text))
+        return budget.count_tokens(text)
@@ -0,0 +1,145 @@
+"""
+Per-step screenshot capture for experiment runs.
+
+Each image is captured once and queued to the trace writer. Run results only keep
+file references; load_screenshot_base64() reads an image back when it is needed.
+"""
+import asyncio
+import base64
+import io
+import logging
+import pathlib
+from typing import Any, Optional
+
+from .trace_writer import TraceWriter
+
+try:
+    from PIL import Image
+
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+FULL_PAGE_POLICIES = ("never", "always", "on_navigation", "every_n")
+
+
+class ScreenshotPipeline:
+    """
+    Captures the viewport every step and the full page according to `full_page`:
+    never, always, on_navigation (first step and whenever the URL changes) or
+    every_n (every `full_page_every` steps).
+
+    Playwright only encodes PNG and JPEG; WebP is converted from PNG with Pillow
+    in a worker thread, falling back to JPEG when Pillow is not installed.
+    """
+
+    def __init__(self, trace_writer: TraceWriter, config: Optional[Any] = None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            trace_writer: Writer for the run directory; files go to screenshot/
+            config: The `trace.screenshots` config section (format, quality, full_page, full_page_every)
+        """
+        config = config or {}
+        self.trace_writer = trace_writer
+        self.format = str(config.get("format", "png")).lower()
+        if self.format == "jpg":
+            self.format = "jpeg"
+        if self.format == "webp" and not PIL_AVAILABLE:
+            logger.warning("Pillow is not installed; saving screenshots as JPEG instead of WebP")
+            self.format = "jpeg"
+        if self.format not in ("png", "jpeg", "webp"):
+            logger.warning(f"Unknown screenshot format '{self.format}'; using png")
+            self.format = "png"
+        self.quality = config.get("quality", None)
+        self.full_page = str(config.get("full_page", "on_navigation")).lower()
+        if self.full_page not in FULL_PAGE_POLICIES:
+            logger.warning(f"Unknown full_page policy '{self.full_page}'; using on_navigation")
+            self.full_page = "on_navigation"
+        self.full_page_every = max(1, int(config.get("full_page_every", 5) or 1))
+        self._last_full_page_url: Optional[str] = None
+
+    @property
+    def extension(self) -> str:
+        return "jpg" if self.format == "jpeg" else self.format
+
+    def _capture_options(self) -> dict:
+        if self.format == "jpeg":
+            options = {"type": "jpeg"}
+            if self.quality is not None:
+                options["quality"] = int(self.quality)
+            return options
+        # webp is converted from a lossless capture
+        return {"type": "png"}
+
+    def _wants_full_page(self, step: int, url: Optional[str]) -> bool:
+        if self.full_page == "always":
+            return True
+        if self.full_page == "every_n":
+            return step % self.full_page_every == 0
+        if self.full_page == "on_navigation":
+            return url != self._last_full_page_url
+        return False
+
+    def _to_webp(self, data: bytes) -> bytes:
+        """Convert a PNG capture to WebP; runs in a worker thread."""
+        buffer = io.BytesIO()
+        options = {"quality": int(self.quality)} if self.quality is not None else {}
+        Image.open(io.BytesIO(data)).save(buffer, format="WEBP", **options)
+        return buffer.getvalue()
+
+    async def _save(self, data: bytes, name: str) -> str:
+        if self.format == "webp":
+            data = await asyncio.to_thread(self._to_webp, data)
+        relative = pathlib.Path("screenshot") / f"{name}.{self.extension}"
+        self.trace_writer.write_bytes(relative, data)
+        return str(self.trace_writer.trace_dir / relative)
+
+    async def capture(self, page, step: int) -> dict:
+        """
+        Capture the screenshots for `step`, queue them to disk and return the
+        screenshot entry for the run result. The entry holds file paths, which are
+        readable once the trace writer has been flushed.
+        """
+        url = page.url
+        options = self._capture_options()
+        viewport = await page.screenshot(**options)
+        full_page = None
+        if self._wants_full_page(step, url):
+            full_page = await page.screenshot(full_page=True, **options)
+            self._last_full_page_url = url
+
+        entry = {
+            "step": step,
+            "url": url,
+            "format": self.format,
+            "path": await self._save(viewport, f"screenshot_{step}"),
+            "full_page_path": None,
+        }
+        if full_page is not None:
+            entry["full_page_path"] = await self._save(
+                full_page, f"screenshot_{step}_full_page"
+            )
+        return entry
+
+
+def load_screenshot_base64(entry: dict, full_page: bool = False) -> Optional[str]:
+    """
+    Read a screenshot referenced by a run-result entry and return it base64-encoded,
+    or None if it was not captured or cannot be read. Blocking; call it from a
+    worker thread inside async code.
+    """
+    legacy_key = "full_page_base64" if full_page else "base64"
+    if entry.get(legacy_key):
+        return entry[legacy_key]
+    path = entry.get("full_page_path" if full_page else "path")
+    if not path:
+        return None
+    try:
+        return base64.b64encode(pathlib.Path(path).read_bytes()).decode("utf-8")
+    except OSError as e:
+        logger.warning(f"Failed to read screenshot {path}: {e}")
+        return None
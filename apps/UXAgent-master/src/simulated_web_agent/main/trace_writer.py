@@ -0,0 +1,198 @@
+"""
+Background writer for run traces.
+
+Trace files are written by one process-wide thread fed by a queue, so agents sharing
+an event loop never block on disk I/O. JSON is serialized by the caller (the trace
+reflects the state at the time of the call); the writer thread only compresses and
+writes. Consecutive appends to the same JSONL file are batched into a single write.
+"""
+import asyncio
+import atexit
+import gzip
+import json
+import logging
+import pathlib
+import queue
+import threading
+from typing import Any, Callable, Optional
+
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Drain at most this many queued operations before writing pending appends
+_MAX_BATCH = 256
+
+
+class _WriterThread:
+    """Single daemon thread executing queued write operations in order."""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="trace-writer", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, op: tuple) -> None:
+        self._queue.put(op)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < _MAX_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch: list[tuple]) -> None:
+        appends: dict[pathlib.Path, list[str]] = {}
+        for op in batch:
+            kind = op[0]
+            if kind == "append":
+                _, path, line = op
+                appends.setdefault(path, []).append(line)
+                continue
+            # writes and barriers must observe every append queued before them
+            self._flush_appends(appends)
+            if kind == "write":
+                _, path, data = op
+                self._safe(lambda: path.write_bytes(data), path)
+            elif kind == "call":
+                _, path, fn = op
+                self._safe(fn, path)
+            elif kind == "barrier":
+                op[1]()
+        self._flush_appends(appends)
+
+    def _flush_appends(self, appends: dict[pathlib.Path, list[str]]) -> None:
+        for path, lines in appends.items():
+
+            def write(path=path, lines=lines):
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+
+            self._safe(write, path)
+        appends.clear()
+
+    @staticmethod
+    def _safe(fn: Callable[[], Any], path: pathlib.Path) -> None:
+        try:
+            fn()
+        except Exception as e:
+            logger.warning(f"Trace writer failed to write {path}: {e}")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far is on disk."""
+        done = threading.Event()
+        self.put(("barrier", done.set))
+        return done.wait(timeout)
+
+
+_writer: Optional[_WriterThread] = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer() -> _WriterThread:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = _WriterThread()
+            # don't lose queued traces when the process exits normally
+            atexit.register(_writer.flush, 30)
+        return _writer
+
+
+class TraceWriter:
+    """
+    Writes the trace files of one run directory through the shared writer thread.
+
+    Usage:
+        writer = TraceWriter(trace_dir, compress_html="gzip")
+        writer.append_jsonl("action_trace.jsonl", action)
+        writer.write_html("simp_html/simp_html_0.html", html)
+        await writer.close()  # returns once everything is on disk
+    """
+
+    def __init__(self, trace_dir: pathlib.Path, compress_html: str = "gzip"):
+        """
+        Initialize the writer.
+
+        Args:
+            trace_dir: Run directory; relative paths passed to the writer resolve against it
+            compress_html: "gzip", "zstd" (needs the zstandard package) or "none"
+        """
+        self.trace_dir = pathlib.Path(trace_dir)
+        compress_html = (compress_html or "none").lower()
+        if compress_html == "zstd" and not ZSTD_AVAILABLE:
+            logger.warning("zstandard is not installed; compressing HTML traces with gzip")
+            compress_html = "gzip"
+        if compress_html not in ("gzip", "zstd", "none"):
+            logger.warning(f"Unknown trace compression '{compress_html}'; using gzip")
+            compress_html = "gzip"
+        self.compress_html = compress_html
+        self._writer = _get_writer()
+        self._closed = False
+
+    def _path(self, relative: str | pathlib.Path) -> pathlib.Path:
+        return self.trace_dir / relative
+
+    def _put(self, op: tuple) -> None:
+        if self._closed:
+            logger.warning(f"TraceWriter for {self.trace_dir} used after close()")
+        self._writer.put(op)
+
+    def append_jsonl(self, relative: str | pathlib.Path, record: Any) -> None:
+        """Append one JSON record as a line."""
+        self._put(("append", self._path(relative), json.dumps(record) + "\n"))
+
+    def write_json(self, relative: str | pathlib.Path, obj: Any, **dump_kwargs) -> None:
+        """Write (or replace) a JSON file."""
+        data = json.dumps(obj, **dump_kwargs).encode("utf-8")
+        self._put(("write", self._path(relative), data))
+
+    def write_text(self, relative: str | pathlib.Path, text: str) -> None:
+        self._put(("write", self._path(relative), text.encode("utf-8")))
+
+    def write_bytes(self, relative: str | pathlib.Path, data: bytes) -> None:
+        self._put(("write", self._path(relative), data))
+
+    def write_html(self, relative: str | pathlib.Path, html: str) -> None:
+        """
+        Write an HTML snapshot, compressed in the writer thread according to
+        `compress_html` (which appends .gz or .zst to the file name).
+        """
+        path = self._path(relative)
+        compression = self.compress_html
+        if compression == "gzip":
+            path = path.with_name(path.name + ".gz")
+        elif compression == "zstd":
+            path = path.with_name(path.name + ".zst")
+
+        def write():
+            data = html.encode("utf-8")
+            if compression == "gzip":
+                data = gzip.compress(data, compresslevel=6)
+            elif compression == "zstd":
+                data = zstandard.ZstdCompressor(level=3).compress(data)
+            path.write_bytes(data)
+
+        self._put(("call", path, write))
+
+    async def flush(self) -> None:
+        """Wait until everything queued so far has been written."""
+        await asyncio.to_thread(self._writer.flush)
+
+    async def close(self) -> None:
+        """Flush pending writes; the writer must not be used afterwards."""
+        if self._closed:
+            return
+        await self.flush()
+        self._closed = True
@@ -0,0 +1,96 @@
+import pytest
+
+from simulated_web_agent.agent import budget
+from simulated_web_agent.agent.budget import PromptBudget, Section
+
+
+@pytest.fixture
+def length_tokenizer(monkeypatch):
+    """Make token counts deterministic: the length estimate instead of tiktoken."""
+    monkeypatch.setattr(budget, "get_encoding", lambda: None)
+
+
+def _memories(n: int) -> list[str]:
+    # oldest first, as the agent passes them
+    return [f"memory {i:02d} " + "x" * 36 for i in range(n)]
+
+
+def test_within_budget_nothing_is_trimmed(length_tokenizer):
+    fitted = PromptBudget("act", budget=10_000).fit(
+        [
+            Section("persona", "a shopper"),
+            Section("memories", _memories(5), priority=2),
+        ]
+    )
+    assert fitted["memories"] == _memories(5)
+
+
+def test_over_budget_drops_oldest_memories_first(length_tokenizer):
+    persona = "p" * 400
+    html = "<div>" + "h" * 400 + "</div>"
+    memories = _memories(20)
+    fitted = PromptBudget("act", budget=400).fit(
+        [
+            Section("persona", persona),
+            Section("html", html, priority=1),
+            Section("memories", memories, priority=2),
+        ]
+    )
+    # 44 tokens over: four 12-token memories go, the oldest ones
+    assert fitted["memories"] == memories[4:]
+    # the html is not touched while memories can be dropped, the persona never
+    assert fitted["html"] == html
+    assert fitted["persona"] == persona
+
+
+def test_lower_priority_sections_are_trimmed_before_higher_ones(length_tokenizer):
+    html = "h" * 2000
+    memories = _memories(10)
+    fitted = PromptBudget("act", budget=450).fit(
+        [
+            Section("html", html, priority=1),
+            Section("memories", memories, priority=2),
+        ]
+    )
+    # memories (priority 2) go first; the html is only cut for what remains
+    assert fitted["memories"] == []
+    assert fitted["html"].endswith(budget.TRUNCATION_MARKER)
+    assert fitted["html"].startswith("h" * 100)
+
+
+def test_min_tokens_is_kept(length_tokenizer):
+    fitted = PromptBudget("act", budget=10).fit(
+        [Section("html", "h" * 4000, priority=1, min_tokens=200)]
+    )
+    assert len(fitted["html"]) >= 200 * 4
+
+
+def test_budget_from_env(monkeypatch):
+    monkeypatch.setenv("PROMPT_BUDGET", "1000")
+    assert budget.budget_for("reflect") == 1000
+    monkeypatch.setenv("PROMPT_BUDGET_REFLECT", "200")
+    assert budget.budget_for("reflect") == 200
+    monkeypatch.setenv("PROMPT_BUDGET_REFLECT", "lots")
+    assert budget.budget_for("reflect") == 1000
+
+
+def test_unlimited_budget_never_trims(length_tokenizer):
+    fitted = PromptBudget("act", budget=0).fit(
+        [Section("memories", _memories(50), priority=2)]
+    )
+    assert len(fitted["memories"]) == 50
+
+
+def test_count_tokens_falls_back_to_length_estimate_offline(monkeypatch):
+    def offline(name):
+        raise ConnectionError("cannot download the encoding")
+
+    if budget.TIKTOKEN_AVAILABLE:
+        monkeypatch.setattr(budget.tiktoken, "get_encoding", offline)
+    budget.get_encoding.cache_clear()
+    try:
+        assert budget.get_encoding() is None
+        assert budget.count_tokens("x" * 400) == 101
+        assert budget.truncate_tokens("x" * 400, 10) == "x" * 40
+    finally:
+        budget.get_encoding.cache_clear()
@@ -0,0 +1,113 @@
+import asyncio
+
+from simulated_web_agent.agent import cache
+from simulated_web_agent.agent.cache import LRUCache, SQLiteCache, TieredCache
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    lru.set("a", b"1")
+    lru.set("b", b"2")
+    assert lru.get("a") == b"1"  # "b" is now the least recently used
+    lru.set("c", b"3")
+    assert lru.get("b") is None
+    assert lru.get("a") == b"1"
+    assert lru.get("c") == b"3"
+    assert len(lru) == 2
+
+
+def test_lru_overwrite_refreshes_entry():
+    lru = LRUCache(max_entries=2)
+    lru.set("a", b"1")
+    lru.set("b", b"2")
+    lru.set("a", b"updated")
+    lru.set("c", b"3")
+    assert lru.get("a") == b"updated"
+    assert lru.get("b") is None
+
+
+def test_sqlite_ttl_expiry(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    store = SQLiteCache(tmp_path / "cache.sqlite", ttl_seconds=60)
+    store.set_many({"k": b"value"})
+    now[0] += 30
+    assert store.get_many(["k"]) == {"k": b"value"}
+    now[0] += 61
+    assert store.get_many(["k"]) == {}
+    # the expired row is purged, not only hidden
+    count = store._conn.execute(f"SELECT COUNT(*) FROM {store.table}").fetchone()[0]
+    assert count == 0
+    store.close()
+
+
+def test_sqlite_size_cap_evicts_least_recently_accessed(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    store = SQLiteCache(tmp_path / "cache.sqlite", max_bytes=25)
+    store.set_many({"a": b"x" * 10})
+    now[0] += 1
+    store.set_many({"b": b"x" * 10})
+    now[0] += 1
+    store.get_many(["a"])  # "b" is now the least recently accessed
+    now[0] += 1
+    store.set_many({"c": b"x" * 10})
+    assert store.get_many(["a", "b", "c"]) == {"a": b"x" * 10, "c": b"x" * 10}
+    store.close()
+
+
+def test_sqlite_persists_across_connections(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    store = SQLiteCache(path, table="responses")
+    store.set_many({"k": b"value"})
+    store.close()
+    reopened = SQLiteCache(path, table="responses")
+    assert reopened.get_many(["k"]) == {"k": b"value"}
+    reopened.close()
+
+
+def test_tiered_cache_promotes_disk_hits_to_memory(tmp_path):
+    tiered = TieredCache(LRUCache(max_entries=1), SQLiteCache(tmp_path / "cache.sqlite"))
+
+    async def scenario():
+        await tiered.set("a", b"1")
+        await tiered.set("b", b"2")  # pushes "a" out of the memory tier
+        assert tiered.memory.get("a") is None
+        assert await tiered.get("a") == b"1"  # served from disk ...
+        assert tiered.memory.get("a") == b"1"  # ... and promoted to memory
+        assert await tiered.get("a") == b"1"
+        assert await tiered.get("missing") is None
+
+    asyncio.run(scenario())
+    assert tiered.stats()["disk_hits"] == 1
+    assert tiered.stats()["memory_hits"] == 1
+    assert tiered.stats()["misses"] == 1
+    tiered.disk.close()
+
+
+def test_tiered_cache_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("TEST_CACHE", "off")
+    assert TieredCache.from_env("TEST_CACHE", table="t") is None
+
+    monkeypatch.setenv("TEST_CACHE", "memory")
+    monkeypatch.setenv("TEST_CACHE_MAX_ENTRIES", "3")
+    memory_only = TieredCache.from_env("TEST_CACHE", table="t")
+    assert memory_only.disk is None
+    assert memory_only.memory.max_entries == 3
+
+    monkeypatch.setenv("TEST_CACHE", "disk")
+    monkeypatch.setenv("TEST_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    monkeypatch.setenv("TEST_CACHE_TTL_SECONDS", "5")
+    with_disk = TieredCache.from_env("TEST_CACHE", table="t")
+    assert with_disk.disk.table == "t"
+    assert with_disk.disk.ttl_seconds == 5
+    with_disk.disk.close()
+
+    monkeypatch.delenv("TEST_CACHE")
+    assert TieredCache.from_env("TEST_CACHE", table="t") is None
+    assert TieredCache.from_env("TEST_CACHE", table="t", default_mode="memory") is not None
+
+
+def test_content_key_is_order_independent_for_dicts():
+    assert cache.content_key("chat", {"a": 1, "b": 2}) == cache.content_key("chat", {"b": 2, "a": 1})
+    assert cache.content_key("chat", "x") != cache.content_key("chat", "y")
@@ -0,0 +1,125 @@
+import pytest
+
+from simulated_web_agent.executor import dom_diff
+from simulated_web_agent.main.model import AgentPolicy
+
+PAGE = (
+    '<body><h1>Shop</h1>'
+    '<button parser-semantic-id="add_to_cart" parser-clickable="true">Add to cart</button>'
+    '<input parser-semantic-id="search" value="" parser-is-focused="true">'
+    '<div parser-semantic-id="banner">Free shipping</div>'
+    '<p>Footer text</p></body>'
+)
+
+
+def test_segment_keys_blocks_by_semantic_id_and_text():
+    blocks = dom_diff.segment(PAGE)
+    assert [k for k in blocks if not k.startswith("text:")] == [
+        "add_to_cart",
+        "search",
+        "banner",
+    ]
+    assert "Shop" in blocks.values()
+    assert "Footer text" in blocks.values()
+    # volatile attributes are not part of a block
+    assert "parser-is-focused" not in blocks["search"]
+
+
+def test_diff_of_identical_pages_is_empty():
+    delta = dom_diff.diff(PAGE, PAGE)
+    assert delta.empty
+    assert delta.ratio == 0
+    assert delta.unchanged == len(dom_diff.segment(PAGE))
+
+
+def test_diff_reports_added_changed_and_removed_blocks():
+    current = (
+        PAGE.replace('value=""', 'value="shoes"')
+        .replace('<div parser-semantic-id="banner">Free shipping</div>', "")
+        .replace("</body>", '<div parser-semantic-id="cart_count">1 item</div></body>')
+    )
+    delta = dom_diff.diff(PAGE, current)
+    assert list(delta.added) == ["cart_count"]
+    assert "1 item" in delta.added["cart_count"]
+    assert list(delta.changed) == ["search"]
+    assert 'value="shoes"' in delta.changed["search"]
+    assert delta.removed == ["banner"]
+    assert 0 < delta.ratio < 1
+    prompt = delta.to_prompt()
+    assert prompt["removed_ids"] == ["banner"]
+    assert prompt["unchanged_regions"] == delta.unchanged
+
+
+def test_diff_ignores_focus_and_caret_changes():
+    current = PAGE.replace(' parser-is-focused="true"', "").replace(
+        'value=""', 'value="" parser-selection-start="0" parser-selection-end="0"'
+    )
+    assert dom_diff.diff(PAGE, current).empty
+
+
+def test_dom_hash_ignores_whitespace_and_attribute_order():
+    reformatted = (
+        '<body>\n  <h1>Shop</h1>\n'
+        '  <button parser-clickable="true" parser-semantic-id="add_to_cart">Add to cart</button>\n'
+        '  <input value=""   parser-semantic-id="search">\n'
+        '  <div parser-semantic-id="banner">Free   shipping</div>\n'
+        '  <p>Footer text</p>\n</body>'
+    )
+    assert dom_diff.dom_hash(reformatted) == dom_diff.dom_hash(PAGE)
+
+
+def test_dom_hash_changes_with_content():
+    assert dom_diff.dom_hash(PAGE) != dom_diff.dom_hash(PAGE.replace("Free", "Paid"))
+    assert dom_diff.dom_hash(PAGE) != dom_diff.dom_hash(
+        PAGE.replace('value=""', 'value="shoes"')
+    )
+
+
+def _policy(max_ratio: float) -> AgentPolicy:
+    # only the state _perception_delta reads; no agent or browser needed
+    policy = AgentPolicy.__new__(AgentPolicy)
+    policy.perceive_dom_diff = True
+    policy.perceive_diff_max_ratio = max_ratio
+    policy._last_perceived = None
+    return policy
+
+
+def _observation(html: str, url: str = "https://shop.example.com/", document_id: str = "doc1"):
+    return {"html": html, "dom_version": {"url": url, "documentId": document_id}}
+
+
+def test_perception_delta_for_a_small_change():
+    policy = _policy(max_ratio=0.9)
+    assert policy._perception_delta(_observation(PAGE)) is None  # first step
+    delta = policy._perception_delta(_observation(PAGE.replace('value=""', 'value="shoes"')))
+    assert list(delta) == ["added", "changed", "removed_ids", "unchanged_regions"]
+    assert len(delta["changed"]) == 1
+
+
+@pytest.mark.parametrize(
+    "max_ratio, url, document_id",
+    [
+        (0.0, "https://shop.example.com/", "doc1"),  # change larger than PERCEIVE_DIFF_MAX_RATIO
+        (0.9, "https://shop.example.com/cart", "doc1"),  # navigated
+        (0.9, "https://shop.example.com/", "doc2"),  # new document
+    ],
+)
+def test_perception_delta_falls_back_to_full_perceive(max_ratio, url, document_id):
+    policy = _policy(max_ratio)
+    policy._perception_delta(_observation(PAGE))
+    changed = _observation(PAGE.replace('value=""', 'value="shoes"'), url, document_id)
+    assert policy._perception_delta(changed) is None
+
+
+def test_perception_delta_ratio_from_env(monkeypatch):
+    monkeypatch.setenv("PERCEIVE_DIFF_MAX_RATIO", "0.25")
+    assert AgentPolicy._read_float_env("PERCEIVE_DIFF_MAX_RATIO", 0.4) == 0.25
+    monkeypatch.setenv("PERCEIVE_DIFF_MAX_RATIO", "not a number")
+    assert AgentPolicy._read_float_env("PERCEIVE_DIFF_MAX_RATIO", 0.4) == 0.4
+
+
+def test_perception_delta_disabled():
+    policy = _policy(max_ratio=0.9)
+    policy.perceive_dom_diff = False
+    policy._perception_delta(_observation(PAGE))
+    assert policy._perception_delta(_observation(PAGE)) is None
@@ -0,0 +1,143 @@
+import asyncio
+import pickle
+
+import numpy as np
+import pytest
+
+from simulated_web_agent.agent.memory import Action, Memory, Observation, Thought
+from simulated_web_agent.agent.memory_index import (
+    ExactIndex,
+    GrowableArray,
+    create_index,
+    top_k,
+)
+
+
+def test_top_k_returns_best_first():
+    scores = np.array([0.1, 0.9, 0.5, 0.7])
+    assert top_k(scores, 2).tolist() == [1, 3]
+
+
+def test_top_k_with_k_at_least_n_sorts_everything():
+    scores = np.array([0.1, 0.9, 0.5])
+    assert top_k(scores, 3).tolist() == [1, 2, 0]
+    assert top_k(scores, 10).tolist() == [1, 2, 0]
+
+
+def test_top_k_with_k_zero_or_no_scores_is_empty():
+    assert top_k(np.array([0.1, 0.9]), 0).size == 0
+    assert top_k(np.array([]), 3).size == 0
+
+
+def test_exact_index_matches_brute_force():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 16)).astype(np.float32)
+    query = rng.normal(size=16).astype(np.float32)
+    index = ExactIndex()
+    # added in several batches, as Memory.update does
+    for batch in np.array_split(vectors, 7):
+        index.add(batch)
+
+    assert len(index) == 200
+    assert index.candidates(query, 10) is None
+    scores = index.similarities(query)
+    np.testing.assert_allclose(scores, vectors @ query, rtol=1e-5)
+    expected = np.argsort(-(vectors @ query))[:10]
+    assert top_k(scores, 10).tolist() == expected.tolist()
+    subset = np.array([5, 17, 42])
+    np.testing.assert_allclose(
+        index.similarities(query, subset), vectors[subset] @ query, rtol=1e-5
+    )
+
+
+def test_exact_index_ignores_empty_batches():
+    index = ExactIndex()
+    index.add(np.array([]))
+    assert len(index) == 0
+    assert index.vectors.shape == (0, 0)
+
+
+def test_create_index_defaults_to_exact(monkeypatch):
+    monkeypatch.delenv("MEMORY_INDEX", raising=False)
+    assert isinstance(create_index(), ExactIndex)
+    assert isinstance(create_index("unknown"), ExactIndex)
+
+
+def test_growable_array_grows_and_pickles_filled_rows():
+    array = GrowableArray(np.float32, row_shape=(2,), capacity=2)
+    for i in range(5):
+        array.append([i, i])
+    assert len(array) == 5
+    assert array.view[:, 0].tolist() == [0, 1, 2, 3, 4]
+    restored = pickle.loads(pickle.dumps(array))
+    assert restored._data.shape == (5, 2)
+    restored.append([5, 5])
+    assert restored.view[:, 0].tolist() == [0, 1, 2, 3, 4, 5]
+
+
+def _memory_with_pieces() -> Memory:
+    memory = Memory(agent=None)
+
+    async def fill():
+        await memory.add_memory_piece(Observation("page", memory, "<html/>"))
+        memory.timestamp += 1
+        await memory.add_memory_piece(Action("click", memory, '{"action": "click"}'))
+        await memory.add_memory_piece(Thought("hmm", memory))
+
+    asyncio.run(fill())
+    memory.index.add(np.eye(3, dtype=np.float32))
+    memory._importance.extend([0.1, 0.5, 0.9])
+    return memory
+
+
+def test_memory_pickle_round_trip():
+    memory = _memory_with_pieces()
+    restored = pickle.loads(pickle.dumps(memory))
+
+    assert [m.content for m in restored.memories] == ["page", "click", "hmm"]
+    assert restored.memories[0].original == "<html/>"
+    assert all(m.memory is restored for m in restored.memories)
+    np.testing.assert_array_equal(restored.embeddings, memory.embeddings)
+    np.testing.assert_array_equal(restored.importance, memory.importance)
+    assert restored.timestamps.tolist() == [0, 1, 1]
+    assert restored.kinds.tolist() == memory.kinds.tolist()
+    assert restored.kind_positions == {"observation": [0], "action": [1], "thought": [2]}
+    assert restored.recent_indices("action", 1) == [1]
+    assert isinstance(restored.read_lock, asyncio.Lock)
+    assert isinstance(restored.write_lock, asyncio.Lock)
+
+
+def test_memory_setstate_upgrades_legacy_pickles():
+    memory = _memory_with_pieces()
+    # layout written before the index and the columnar store existed
+    legacy = {
+        "memories": memory.memories,
+        "embeddings": np.eye(3, dtype=np.float32),
+        "importance": np.array([0.1, 0.5, 0.9]),
+        "timestamp": memory.timestamp,
+        "agent": None,
+        "added_since_last_update": 0,
+        "add_count_history": [],
+    }
+    restored = Memory.__new__(Memory)
+    restored.__setstate__(legacy)
+
+    assert len(restored.index) == 3
+    np.testing.assert_allclose(restored.importance, [0.1, 0.5, 0.9])
+    assert restored.timestamps.tolist() == [0, 1, 1]
+    assert restored.kind_positions == {"observation": [0], "action": [1], "thought": [2]}
+    assert isinstance(restored.read_lock, asyncio.Lock)
+
+
+def test_hnsw_index_survives_pickling():
+    pytest.importorskip("hnswlib")
+    from simulated_web_agent.agent.memory_index import HNSWIndex
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 8)).astype(np.float32)
+    index = HNSWIndex(min_size=10)
+    index.add(vectors)
+    restored = pickle.loads(pickle.dumps(index))
+    assert len(restored) == 50
+    assert restored._graph is not None
+    assert len(restored.candidates(vectors[0], 5)) == 5
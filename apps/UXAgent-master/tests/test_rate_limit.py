@@ -0,0 +1,84 @@
+import asyncio
+
+from simulated_web_agent.agent.rate_limit import (
+    RateLimiter,
+    backoff_delay,
+    priority_value,
+    retry_after_seconds,
+)
+
+
+class _RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("rate limited")
+        self.retry_after = retry_after
+
+
+def test_higher_priority_waiters_are_served_first(monkeypatch):
+    monkeypatch.setenv("LLM_MAX_IN_FLIGHT_TEST", "1")
+    limiter = RateLimiter()
+    key = ("test", "small")
+    order = []
+
+    async def worker(name):
+        await limiter.acquire(key, 1, name)
+        order.append(name)
+        limiter.release(key, 1)
+
+    async def scenario():
+        await limiter.acquire(key, 1, "act")  # holds the only slot
+        low = asyncio.create_task(worker("reflect"))
+        await asyncio.sleep(0.05)
+        high = asyncio.create_task(worker("act"))
+        await asyncio.sleep(0.05)
+        assert limiter.stats()["test/small"]["queued"] == 2
+        limiter.release(key, 1)
+        await asyncio.gather(low, high)
+
+    asyncio.run(scenario())
+    # "reflect" queued first but waits for the higher-priority "act"
+    assert order == ["act", "reflect"]
+    assert limiter.stats()["test/small"]["granted"] == 3
+
+
+def test_priority_classes():
+    assert priority_value("act") < priority_value("perceive") < priority_value("reflect")
+    assert priority_value(None) == priority_value("default")
+    assert priority_value("unknown") == priority_value("default")
+    assert priority_value(5) == 5
+
+
+def test_backoff_is_bounded_and_jittered():
+    for attempt in range(8):
+        delays = [backoff_delay(attempt, base=1.0, cap=10.0) for _ in range(200)]
+        assert all(0 <= d <= min(10.0, 2**attempt) for d in delays)
+        assert len(set(delays)) > 1
+    # the cap holds however many attempts were made
+    assert max(backoff_delay(50, base=1.0, cap=10.0) for _ in range(200)) <= 10.0
+
+
+def test_backoff_respects_retry_after():
+    exc = _RateLimitError(retry_after=4)
+    assert retry_after_seconds(exc) == 4.0
+    delays = [backoff_delay(0, exc) for _ in range(200)]
+    assert all(4.0 <= d <= 4.0 + 0.25 * 4.0 + 0.1 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_rate_limit_error_pauses_the_key():
+    limiter = RateLimiter()
+    key = ("test", "large")
+
+    async def scenario():
+        try:
+            async with limiter.slot(key, 10):
+                raise _RateLimitError(retry_after=0.2)
+        except _RateLimitError:
+            pass
+
+    asyncio.run(scenario())
+    stats = limiter.stats()["test/large"]
+    assert stats["throttled"] == 1
+    assert stats["in_flight"] == 0
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from simulated_web_agent.executor.request_policy import RequestPolicy
+
+START_URL = "https://shop.example.com/products?page=1"
+
+
+@pytest.fixture(autouse=True)
+def no_cua(monkeypatch):
+    monkeypatch.delenv("USE_CUA", raising=False)
+
+
+class _Request:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class _Route:
+    """Records how the policy answered a request."""
+
+    def __init__(self):
+        self.outcome = None
+
+    async def fallback(self):
+        self.outcome = "fallback"
+
+    async def fulfill(self, status, content_type, body):
+        self.outcome = ("fulfill", content_type)
+
+    async def abort(self, error_code):
+        self.outcome = ("abort", error_code)
+
+
+def test_off_profile_installs_nothing():
+    assert RequestPolicy.from_config(None, START_URL) is None
+    assert RequestPolicy.from_config({"profile": "off"}, START_URL) is None
+    assert RequestPolicy.from_config({"profile": "unknown"}, START_URL) is None
+
+
+def test_documents_are_never_blocked():
+    policy = RequestPolicy.from_config(
+        {"profile": "text", "block_types": ["document"], "block_domains": ["ads.example.net"]},
+        START_URL,
+    )
+    assert policy.decide("https://www.google-analytics.com/landing", "document") is None
+    assert policy.decide("https://ads.example.net/frame", "document") is None
+
+
+def test_blocks_by_type_and_domain():
+    policy = RequestPolicy.from_config({"profile": "lean"}, START_URL)
+    assert policy.decide("https://shop.example.com/font.woff2", "font") == "type:font"
+    assert policy.decide("https://www.google-analytics.com/g/collect", "xhr") == "domain"
+    assert policy.decide("https://fonts.googleapis.com/css2", "stylesheet") == "domain"
+    assert policy.decide("https://cdn.other.com/app.js", "script") is None
+    # lean keeps images
+    assert policy.decide("https://shop.example.com/logo.png", "image") is None
+
+
+def test_start_url_host_and_subdomains_are_exempt_from_domain_blocking():
+    policy = RequestPolicy.from_config(
+        {"profile": "lean", "block_domains": ["example.com"], "allow_domains": ["cdn.partner.io"]},
+        START_URL,
+    )
+    assert policy.decide("https://shop.example.com/api/cart", "fetch") is None
+    assert policy.decide("https://img.shop.example.com/a.js", "script") is None
+    assert policy.decide("https://cdn.partner.io/lib.js", "script") is None
+    # the rest of the blocked domain is still blocked
+    assert policy.decide("https://tracker.example.com/pixel", "script") == "domain"
+    # type blocking still applies to the site under test
+    assert policy.decide("https://shop.example.com/intro.mp4", "media") == "type:media"
+
+
+def test_text_blocks_images_but_falls_back_to_lean_under_cua(monkeypatch):
+    text = RequestPolicy.from_config({"profile": "text"}, START_URL)
+    assert text.profile == "text"
+    assert text.decide("https://shop.example.com/logo.png", "image") == "type:image"
+
+    monkeypatch.setenv("USE_CUA", "true")
+    cua = RequestPolicy.from_config({"profile": "text"}, START_URL)
+    assert cua.profile == "lean"
+    assert cua.decide("https://shop.example.com/logo.png", "image") is None
+
+
+def test_blocked_images_get_a_placeholder_and_counts_reset():
+    policy = RequestPolicy.from_config({"profile": "text"}, START_URL)
+    requests = [
+        ("https://shop.example.com/logo.png", "image"),
+        ("https://www.google-analytics.com/g/collect", "ping"),
+        ("https://connect.facebook.net/sdk.js", "script"),
+        ("https://shop.example.com/app.js", "script"),
+    ]
+
+    async def handle_all():
+        routes = []
+        for url, resource_type in requests:
+            route = _Route()
+            await policy._handle(route, _Request(url, resource_type))
+            routes.append(route.outcome)
+        return routes
+
+    outcomes = asyncio.run(handle_all())
+    assert outcomes == [
+        ("fulfill", "image/gif"),
+        ("abort", "blockedbyclient"),
+        ("abort", "blockedbyclient"),
+        "fallback",
+    ]
+
+    counts = policy.take_counts()
+    assert counts["profile"] == "text"
+    assert counts["blocked_requests"] == 3
+    assert counts["blocked_by_reason"] == {"type:image": 1, "type:ping": 1, "domain": 1}
+    assert counts["allowed_requests"] == 1
+
+    # counts are per observation; totals keep accumulating
+    assert policy.take_counts() == {
+        "profile": "text",
+        "blocked_requests": 0,
+        "blocked_by_reason": {},
+        "allowed_requests": 0,
+    }
+    assert sum(policy.total_blocked.values()) == 3
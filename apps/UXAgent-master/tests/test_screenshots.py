@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from simulated_web_agent.main.screenshots import (
+    ScreenshotPipeline,
+    load_screenshot_base64,
+)
+from simulated_web_agent.main.trace_writer import TraceWriter
+
+
+class _Page:
+    """Stands in for a Playwright page: a URL per step and fixed image bytes."""
+
+    def __init__(self, urls):
+        self.url = urls[0]
+
+    async def screenshot(self, full_page=False, **options):
+        return b"full" if full_page else b"viewport"
+
+
+def _full_page_steps(tmp_path, config, urls):
+    (tmp_path / "screenshot").mkdir(exist_ok=True)
+    writer = TraceWriter(tmp_path, compress_html="none")
+    pipeline = ScreenshotPipeline(writer, config)
+    page = _Page(urls)
+
+    async def run():
+        steps = []
+        for step, url in enumerate(urls):
+            page.url = url
+            entry = await pipeline.capture(page, step)
+            if entry["full_page_path"]:
+                steps.append(step)
+        await writer.close()
+        return steps
+
+    return asyncio.run(run())
+
+
+URLS = ["/home", "/home", "/search", "/search", "/search", "/product", "/home"]
+
+
+@pytest.mark.parametrize(
+    "config, expected",
+    [
+        ({"full_page": "never"}, []),
+        ({"full_page": "always"}, [0, 1, 2, 3, 4, 5, 6]),
+        # first step, then whenever the URL differs from the last full-page capture
+        ({"full_page": "on_navigation"}, [0, 2, 5, 6]),
+        ({"full_page": "every_n", "full_page_every": 3}, [0, 3, 6]),
+        ({"full_page": "bogus"}, [0, 2, 5, 6]),  # unknown policies use on_navigation
+        ({}, [0, 2, 5, 6]),
+    ],
+)
+def test_full_page_policies(tmp_path, config, expected):
+    assert _full_page_steps(tmp_path, config, URLS) == expected
+
+
+def test_entries_reference_files_readable_after_flush(tmp_path):
+    (tmp_path / "screenshot").mkdir()
+    writer = TraceWriter(tmp_path, compress_html="none")
+    pipeline = ScreenshotPipeline(writer, {"format": "jpg", "quality": 70})
+    page = _Page(["/home"])
+
+    async def run():
+        entry = await pipeline.capture(page, 0)
+        await writer.flush()
+        return entry
+
+    entry = asyncio.run(run())
+    assert entry["format"] == "jpeg"
+    assert entry["path"].endswith("screenshot_0.jpg")
+    assert load_screenshot_base64(entry) == "dmlld3BvcnQ="  # b"viewport"
+    assert load_screenshot_base64(entry, full_page=True) == "ZnVsbA=="  # b"full"
+    assert load_screenshot_base64({"step": 1, "path": None}) is None
@@ -0,0 +1,72 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from simulated_web_agent.main import trace_writer
+from simulated_web_agent.main.trace_writer import TraceWriter
+
+
+def _write_trace(writer: TraceWriter) -> None:
+    for step in range(3):
+        writer.append_jsonl("action_trace.jsonl", {"step": step, "action": "click"})
+    writer.write_json("memory_trace.json", [{"kind": "observation"}], indent=2)
+    writer.write_text("persona.txt", "a careful shopper")
+    writer.write_html("simp_html/simp_html_0.html", "<html><body>café</body></html>")
+
+
+def test_queued_writes_are_on_disk_after_close(tmp_path):
+    (tmp_path / "simp_html").mkdir()
+    writer = TraceWriter(tmp_path, compress_html="gzip")
+    _write_trace(writer)
+    asyncio.run(writer.close())
+
+    lines = (tmp_path / "action_trace.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["step"] for line in lines] == [0, 1, 2]
+    assert json.loads((tmp_path / "memory_trace.json").read_text()) == [{"kind": "observation"}]
+    assert (tmp_path / "persona.txt").read_text(encoding="utf-8") == "a careful shopper"
+    html_path = tmp_path / "simp_html" / "simp_html_0.html.gz"
+    assert gzip.decompress(html_path.read_bytes()).decode("utf-8") == (
+        "<html><body>café</body></html>"
+    )
+    assert not (tmp_path / "simp_html" / "simp_html_0.html").exists()
+
+
+def test_flush_waits_for_appends_queued_before_it(tmp_path):
+    writer = TraceWriter(tmp_path, compress_html="none")
+
+    async def scenario():
+        writer.append_jsonl("trace.jsonl", {"n": 1})
+        await writer.flush()
+        assert (tmp_path / "trace.jsonl").read_text().count("\n") == 1
+        writer.append_jsonl("trace.jsonl", {"n": 2})
+        writer.write_html("page.html", "<p>plain</p>")
+        await writer.close()
+
+    asyncio.run(scenario())
+    assert (tmp_path / "trace.jsonl").read_text().count("\n") == 2
+    assert (tmp_path / "page.html").read_text() == "<p>plain</p>"
+
+
+def test_zstd_html_round_trip(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    writer = TraceWriter(tmp_path, compress_html="zstd")
+    writer.write_html("page.html", "<p>zstd</p>")
+    asyncio.run(writer.close())
+    data = (tmp_path / "page.html.zst").read_bytes()
+    assert zstandard.ZstdDecompressor().decompress(data) == b"<p>zstd</p>"
+
+
+def test_unknown_compression_falls_back_to_gzip(tmp_path):
+    assert TraceWriter(tmp_path, compress_html="brotli").compress_html == "gzip"
+    if not trace_writer.ZSTD_AVAILABLE:
+        assert TraceWriter(tmp_path, compress_html="zstd").compress_html == "gzip"
+
+
+def test_failed_write_does_not_stop_the_writer(tmp_path):
+    writer = TraceWriter(tmp_path, compress_html="none")
+    writer.write_text("missing_dir/file.txt", "lost")
+    writer.write_text("kept.txt", "kept")
+    asyncio.run(writer.close())
+    assert (tmp_path / "kept.txt").read_text() == "kept"